@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+
+import archive
+from helpers import calculate_streak, calculate_xp
+from models import db, DayPlan, Task, AchievementProgress
+from rollover import plan_xp
+
+# Achievements are thresholds on a handful of per-user metrics kept in one
+# AchievementProgress row. Events (tasks completed) add to the counters and
+# raise the high-water marks in a single compare-and-swap write, and every
+# rule is checked against those values in Python, so a new rule costs no
+# query. `flask backfill achievements` computes the metrics from history for
+# users who had it before achievements existed.
+
+METRICS = ("best_streak", "perfect_days", "punctual_tasks", "xp")
+
+# (bit, metric, threshold, title). Bits are what's stored: append new rules,
+# never renumber or reuse a bit.
+RULES = (
+    (0, "best_streak", 3, "🔥 3-Day Streak"),
+    (1, "best_streak", 7, "🔥 Week on Fire"),
+    (2, "best_streak", 30, "🏅 30-Day Streak"),
+    (3, "perfect_days", 1, "💯 Perfect Day"),
+    (4, "perfect_days", 10, "💎 10 Perfect Days"),
+    (5, "punctual_tasks", 10, "⏰ On Time ×10"),
+    (6, "punctual_tasks", 100, "⏱ On Time ×100"),
+    (7, "xp", 300, "⚔️ Warrior"),
+    (8, "xp", 700, "🧠 Strategist"),
+    (9, "xp", 1500, "🔥 Elite"),
+    (10, "xp", 3000, "👑 Legend"),
+)
+
+PUNCTUAL_GRACE = timedelta(minutes=5)
+RECORD_ATTEMPTS = 5
+
+def unlocked(values):
+    bits = 0
+    for bit, metric, threshold, _ in RULES:
+        if values[metric] >= threshold:
+            bits |= 1 << bit
+    return bits
+
+def titles(earned):
+    return [title for bit, _, _, title in RULES if earned & (1 << bit)]
+
+def user_titles(user_id):
+    return titles(earned_by([user_id]).get(user_id, 0))
+
+def earned_by(user_ids):
+    """{user id: earned bits}, one query for any number of users."""
+    if not user_ids:
+        return {}
+    return dict(db.session.query(
+        AchievementProgress.user_id, AchievementProgress.earned
+    ).filter(AchievementProgress.user_id.in_(user_ids)).all())
+
+def is_punctual(expected_start, actual_start):
+    if not expected_start or not actual_start:
+        return False
+    return actual_start <= datetime.combine(actual_start.date(), expected_start) + PUNCTUAL_GRACE
+
+# ---------------- EVENTS ----------------
+def create_progress(user_id):
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(AchievementProgress).values(user_id=user_id))
+    except IntegrityError:
+        pass  # created concurrently
+
+def record(user_id, add=None, high=None):
+    """Apply one event to the user's metrics; newly earned bits, or None.
+
+    `add` increments counters and `high` raises high-water marks. The write
+    is a compare-and-swap on the row's version, retried with a fresh read
+    when a concurrent event got there first; None means it kept racing.
+    """
+    columns = [getattr(AchievementProgress, m) for m in METRICS]
+
+    for _ in range(RECORD_ATTEMPTS):
+        row = db.session.query(
+            AchievementProgress.version, AchievementProgress.earned, *columns
+        ).filter(AchievementProgress.user_id == user_id).first()
+        if row is None:
+            create_progress(user_id)
+            continue
+
+        values = {m: getattr(row, m) for m in METRICS}
+        for metric, n in (add or {}).items():
+            values[metric] += n
+        for metric, value in (high or {}).items():
+            values[metric] = max(values[metric], value)
+        earned = row.earned | unlocked(values)
+
+        updated = AchievementProgress.query.filter(
+            AchievementProgress.user_id == user_id,
+            AchievementProgress.version == row.version
+        ).update(
+            {**values, "earned": earned},
+            synchronize_session=False
+        )
+        if updated:
+            return earned & ~row.earned
+
+    return None
+
+def tasks_completed(user_id, task_ids):
+    """Event: `task_ids` were just completed and their plans re-scored."""
+    rows = db.session.query(
+        Task.dayplan_id, Task.points, Task.expected_start, Task.actual_start,
+        DayPlan.final_score
+    ).join(DayPlan).filter(Task.id.in_(task_ids)).all()
+
+    # a score only rises when a task is completed, so a plan at 100 after
+    # completing one of its tasks just became perfect
+    perfect = {r.dayplan_id for r in rows if r.points and r.final_score >= 100}
+
+    return record(
+        user_id,
+        add={
+            "perfect_days": len(perfect),
+            "punctual_tasks": sum(is_punctual(r.expected_start, r.actual_start) for r in rows)
+        },
+        high={
+            "best_streak": calculate_streak(user_id),
+            "xp": calculate_xp(user_id)
+        }
+    )
+
+# ---------------- BACKFILL ----------------
+def history_metrics(user_ids):
+    """{user id: metrics} computed from every plan and task on record."""
+    metrics = {u: dict.fromkeys(METRICS, 0) for u in user_ids}
+    P, T = archive.all_plans(), archive.all_tasks()
+
+    last = {}
+    streak = dict.fromkeys(user_ids, 0)
+    for user_id, day, score in db.session.query(
+        P.user_id, P.date, P.final_score
+    ).filter(P.user_id.in_(user_ids)).order_by(P.user_id, P.date):
+        m, score = metrics[user_id], score or 0
+
+        if score >= 70:
+            prev = last.get(user_id)
+            streak[user_id] = streak[user_id] + 1 if prev == day - timedelta(days=1) else 1
+            last[user_id] = day
+            m["best_streak"] = max(m["best_streak"], streak[user_id])
+        if score >= 100:
+            m["perfect_days"] += 1
+        m["xp"] += plan_xp(score)
+
+    for user_id, expected_start, actual_start in db.session.query(
+        P.user_id, T.expected_start, T.actual_start
+    ).select_from(T).join(P, T.dayplan_id == P.id).filter(
+        P.user_id.in_(user_ids),
+        T.status == "completed"
+    ):
+        metrics[user_id]["punctual_tasks"] += is_punctual(expected_start, actual_start)
+
+    return metrics
+
+def backfill_chunk(user_ids):
+    # the `achievements` backfill job (registered in backfill.py, which only
+    # the CLI loads)
+    from backfill import Conflict
+
+    metrics = history_metrics(user_ids)
+    progress = {
+        r.user_id: r for r in db.session.query(
+            AchievementProgress.user_id,
+            AchievementProgress.earned,
+            AchievementProgress.version
+        ).filter(AchievementProgress.user_id.in_(user_ids))
+    }
+
+    existing = [
+        {
+            "b_user_id": u, "b_version": progress[u].version,
+            **m, "earned": progress[u].earned | unlocked(m)
+        }
+        for u, m in metrics.items() if u in progress
+    ]
+    missing = [
+        {"user_id": u, **m, "earned": unlocked(m)}
+        for u, m in metrics.items() if u not in progress
+    ]
+
+    # an event recorded since the read above would be overwritten: retry the
+    # chunk with it included
+    if existing:
+        t = AchievementProgress.__table__
+        updated = db.session.execute(
+            update(t).where(
+                t.c.user_id == bindparam("b_user_id"),
+                t.c.version == bindparam("b_version")
+            ),
+            existing
+        ).rowcount
+        if updated != len(existing):
+            raise Conflict("achievement_progress")
+    if missing:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(AchievementProgress), missing)
+        except IntegrityError:
+            raise Conflict("achievement_progress")
+
+    return len(existing) + len(missing)
+
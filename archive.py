@@ -0,0 +1,210 @@
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import click
+import sqlalchemy as sa
+from sqlalchemy import event, insert, delete, select, union_all, inspect, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.pool import Pool
+
+import sync
+from models import db, DayPlan, Task, UserStats
+
+# Cold history store. Finalized plans older than N days (and their tasks) are
+# moved out of the hot tables into an "archive" schema: an attached database
+# file on SQLite, a schema of monthly range partitions on PostgreSQL. Readers
+# that need old data go through all_plans()/all_tasks(), which union both.
+#
+# The hot tables keep their foreign keys and uq_user_day; PostgreSQL cannot
+# enforce those across date partitions, which is why only the cold store is
+# partitioned.
+
+SCHEMA = "archive"
+DEFAULT_DAYS = 90
+MIN_DAYS = 60       # never archive what a leaderboard period can still read
+BATCH_SIZE = 500
+
+metadata = sa.MetaData()
+
+PLAN_COLUMNS = [c.name for c in DayPlan.__table__.columns]
+TASK_COLUMNS = [c.name for c in Task.__table__.columns]
+
+def _copy_columns(table, partition_key):
+    return [
+        sa.Column(c.name, c.type, primary_key=c.primary_key or c.name == partition_key)
+        for c in table.columns
+    ]
+
+archive_plan = sa.Table(
+    "day_plan", metadata,
+    *_copy_columns(DayPlan.__table__, "date"),
+    sa.Index("idx_archive_dayplan_user_date", "user_id", "date"),
+    schema=SCHEMA,
+    postgresql_partition_by="RANGE (date)"
+)
+
+archive_task = sa.Table(
+    "task", metadata,
+    *_copy_columns(Task.__table__, None),
+    sa.Column("plan_date", sa.Date, primary_key=True),
+    sa.Index("idx_archive_task_dayplan", "dayplan_id"),
+    schema=SCHEMA,
+    postgresql_partition_by="RANGE (plan_date)"
+)
+
+# database URLs known to have archive tables; only a positive answer is
+# kept, so a worker started before the first `flask archive` run still
+# finds the archive once it exists
+_enabled = set()
+
+def enabled():
+    """Whether archive tables exist."""
+    url = str(db.engine.url)
+    if url not in _enabled and inspect(db.engine).has_table("day_plan", schema=SCHEMA):
+        _enabled.add(url)
+    return url in _enabled
+
+def ensure_tables():
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}"))
+    metadata.create_all(db.session.connection())
+    db.session.commit()
+    _enabled.add(str(db.engine.url))
+
+def ensure_month_partitions(months):
+    if db.engine.dialect.name != "postgresql":
+        return
+
+    for first in sorted(months):
+        nxt = (first + timedelta(days=32)).replace(day=1)
+        suffix = first.strftime("y%Ym%m")
+        for table in ("day_plan", "task"):
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{table}_{suffix} "
+                f"PARTITION OF {SCHEMA}.{table} "
+                f"FOR VALUES FROM ('{first}') TO ('{nxt}')"
+            ))
+
+# ---------------- READS ----------------
+def all_plans():
+    """DayPlan, or an alias over hot ∪ archived plans once an archive exists."""
+    if not enabled():
+        return DayPlan
+
+    hot = select(*[DayPlan.__table__.c[n] for n in PLAN_COLUMNS])
+    cold = select(*[archive_plan.c[n] for n in PLAN_COLUMNS])
+    return aliased(DayPlan, union_all(hot, cold).subquery("all_day_plan"))
+
+def all_tasks():
+    if not enabled():
+        return Task
+
+    hot = select(*[Task.__table__.c[n] for n in TASK_COLUMNS])
+    cold = select(*[archive_task.c[n] for n in TASK_COLUMNS])
+    return aliased(Task, union_all(hot, cold).subquery("all_task"))
+
+def load_tasks(plan_ids, *criteria):
+    """{plan id: [tasks]} across both stores; criteria take the alias."""
+    if not plan_ids:
+        return {}
+
+    T = all_tasks()
+    q = db.session.query(T).filter(T.dayplan_id.in_(plan_ids))
+    for c in criteria:
+        q = q.filter(c(T))
+
+    by_plan = {}
+    for t in q.order_by(T.expected_start).all():
+        by_plan.setdefault(t.dayplan_id, []).append(t)
+    return by_plan
+
+# ---------------- ARCHIVING ----------------
+def next_batch(cutoff, size):
+    # only finalized plans the user's stats have already folded in, so
+    # XP/streak never need to read the archive
+    return db.session.query(DayPlan.id, DayPlan.date).join(
+        UserStats, UserStats.user_id == DayPlan.user_id
+    ).filter(
+        DayPlan.date < cutoff,
+        DayPlan.date <= UserStats.as_of,
+        DayPlan.finalized_at.isnot(None)
+    ).order_by(DayPlan.id).limit(size).all()
+
+def move_batch(rows):
+    ids = [r.id for r in rows]
+    ensure_month_partitions({r.date.replace(day=1) for r in rows})
+
+    db.session.execute(insert(archive_plan).from_select(
+        PLAN_COLUMNS,
+        select(*[DayPlan.__table__.c[n] for n in PLAN_COLUMNS]).where(
+            DayPlan.id.in_(ids)
+        )
+    ))
+    db.session.execute(insert(archive_task).from_select(
+        TASK_COLUMNS + ["plan_date"],
+        select(
+            *[Task.__table__.c[n] for n in TASK_COLUMNS], DayPlan.__table__.c.date
+        ).join_from(Task.__table__, DayPlan.__table__).where(
+            Task.__table__.c.dayplan_id.in_(ids)
+        )
+    ))
+
+    # sync clients holding these rows are told to drop them
+    sync.tombstone_plans(ids)
+
+    db.session.execute(delete(Task.__table__).where(Task.__table__.c.dayplan_id.in_(ids)))
+    db.session.execute(delete(DayPlan.__table__).where(DayPlan.__table__.c.id.in_(ids)))
+    db.session.commit()
+
+def run(days=DEFAULT_DAYS, batch_size=BATCH_SIZE, echo=None):
+    ensure_tables()
+    cutoff = date.today() - timedelta(days=max(days, MIN_DAYS))
+
+    moved = 0
+    while True:
+        rows = next_batch(cutoff, batch_size)
+        if not rows:
+            break
+
+        move_batch(rows)
+        moved += len(rows)
+        if echo:
+            echo(f"  {moved} plans archived")
+
+    return moved
+
+# ---------------- SETUP ----------------
+# main database file -> archive file; filled from config, so setting up an
+# app never needs its engine
+_attach = {}
+
+@event.listens_for(Pool, "connect")
+def attach_archive(dbapi_connection, connection_record):
+    if not _attach or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    main = dbapi_connection.execute("PRAGMA database_list").fetchone()[2]
+    path = _attach.get(os.path.realpath(main)) if main else None
+    if path:
+        dbapi_connection.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+
+def init_app(app):
+    url = sa.engine.make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    path = app.config.get("ARCHIVE_DATABASE_PATH")
+
+    if url.get_backend_name() == "sqlite" and url.database and path:
+        # Flask-SQLAlchemy puts relative SQLite paths in the instance folder
+        main = os.path.join(app.instance_path, url.database)
+        _attach[os.path.realpath(main)] = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @app.cli.command("archive")
+    @click.option("--days", default=DEFAULT_DAYS, show_default=True,
+                  help="Archive finalized plans older than this many days.")
+    @click.option("--batch-size", default=BATCH_SIZE, show_default=True)
+    def archive_command(days, batch_size):
+        """Move cold plan history into the archive store, prune old sync
+        tombstones."""
+        moved = run(days, batch_size, echo=click.echo)
+        click.echo(f"Archived {moved} plans")
+        click.echo(f"Pruned {sync.prune()} sync tombstones")
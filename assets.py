@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+import click
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are always built
+    brotli = None
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "assets.json")
+SW_SOURCE = os.path.join(STATIC_DIR, "service-worker.js")
+SW_BUILT = os.path.join(DIST_DIR, "service-worker.js")
+
+# Files the service worker and browser must find under a stable URL.
+UNHASHED = {"service-worker.js", "manifest.json"}
+COMPRESSIBLE = {".css", ".js", ".json", ".svg", ".html", ".txt"}
+PRECACHE_PAGES = ["/", "/login"]
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_manifest = None
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+def hashed_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+def source_files():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(root) == STATIC_DIR and "dist" in dirs:
+            dirs.remove("dist")
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            if rel not in UNHASHED:
+                yield rel, path
+
+def write_compressed(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(raw, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(raw))
+
+def build_service_worker(manifest, version):
+    with open(SW_SOURCE, encoding="utf-8") as f:
+        sw = f.read()
+
+    precache = PRECACHE_PAGES + ["/manifest.json"] + [
+        f"/assets/{name}" for name in sorted(manifest.values())
+    ]
+
+    sw = re.sub(
+        r'const CACHE_NAME = "[^"]*";',
+        f'const CACHE_NAME = "daily-goals-{version}";',
+        sw, count=1
+    )
+    sw = re.sub(
+        r"const STATIC_ASSETS = \[[^\]]*\];",
+        "const STATIC_ASSETS = " + json.dumps(precache, indent=4) + ";",
+        sw, count=1
+    )
+
+    with open(SW_BUILT, "w", encoding="utf-8") as f:
+        f.write(sw)
+
+def build():
+    """Fingerprint everything under static/ into static/dist/."""
+    global _manifest
+
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for rel, path in sorted(source_files()):
+        name = hashed_name(rel, file_hash(path))
+        target = os.path.join(DIST_DIR, name)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(path, target)
+
+        if os.path.splitext(rel)[1] in COMPRESSIBLE:
+            write_compressed(target)
+
+        manifest[rel] = name
+
+    version = hashlib.sha256(
+        json.dumps(manifest, sort_keys=True).encode()
+    ).hexdigest()[:12]
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    build_service_worker(manifest, version)
+
+    _manifest = manifest
+    return manifest
+
+def load_manifest():
+    global _manifest
+
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH, encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {}
+
+    return _manifest
+
+def asset_url(path):
+    name = load_manifest().get(path)
+    if name is None:
+        # not built (dev checkout) → plain, revalidated static file
+        return url_for("static", filename=path)
+    return url_for("assets", filename=name)
+
+def serve_asset(filename):
+    accept = request.headers.get("Accept-Encoding", "")
+    mimetype = mimetypes.guess_type(filename)[0]
+
+    response = None
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accept and os.path.isfile(os.path.join(DIST_DIR, filename + ext)):
+            response = send_from_directory(DIST_DIR, filename + ext, mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(DIST_DIR, filename)
+
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+def service_worker_path():
+    if os.path.isfile(SW_BUILT):
+        return SW_BUILT
+    return SW_SOURCE
+
+def init_app(app):
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Fingerprint static files and regenerate the service worker."""
+        manifest = build()
+        click.echo(f"Built {len(manifest)} assets into {DIST_DIR}")
@@ -0,0 +1,73 @@
+from flask import Blueprint, render_template, redirect, request
+from flask_login import login_user, login_required, logout_user, current_user
+
+from extensions import csrf
+from helpers import api_ok, api_error, calculate_xp
+from models import db, User
+
+bp = Blueprint("auth", __name__)
+
+# ---------------- AUTH ----------------
+@csrf.exempt
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        mode = request.form['mode']
+
+        user = User.query.filter_by(username=username).first()
+
+        if mode == "register":
+            if user:
+                return render_template("login.html", error="Username already exists")
+            user = User(username=username)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            login_user(user)
+            return redirect('/')
+
+        # LOGIN MODE
+        if not user or not user.check_password(password):
+            return render_template("login.html", error="Invalid username or password")
+
+        login_user(user)
+        return redirect('/')
+
+    return render_template('login.html')
+
+@csrf.exempt
+@bp.route('/auth/login', methods=['POST'])
+def auth_login():
+    data = request.form
+
+    user = User.query.filter_by(username=data["username"]).first()
+    if not user or not user.check_password(data["password"]):
+        return api_error("Invalid credentials", 401)
+
+    login_user(user)
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@csrf.exempt
+@bp.route('/auth/register', methods=['POST'])
+def auth_register():
+    data = request.get_json()
+
+    if User.query.filter_by(username=data["username"]).first():
+        return api_error("Username exists")
+
+    user = User(username=data["username"])
+    user.set_password(data["password"])
+
+    db.session.add(user)
+    db.session.commit()
+
+    login_user(user)
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect('/login')
@@ -0,0 +1,228 @@
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import achievements
+from models import db, User, DayPlan, Task, Notification, BackfillState
+
+# Online backfills. Migrations only add nullable columns and new tables,
+# which don't rebuild or lock existing tables; the data for them is filled
+# in afterwards by `flask backfill <job>` while the app keeps serving. The
+# exception is c3e8a5d1f7b2, which rebuilds day_plan and task on SQLite to
+# make their ids AUTOINCREMENT and needs a maintenance window.
+#
+# A job walks one table in key order (`key > last_key ORDER BY key LIMIT
+# n`). Each chunk runs in its own short transaction together with the job's
+# checkpoint row, so an interrupted run resumes after the last committed
+# chunk and no chunk is applied twice. The chunk size shrinks whenever a
+# chunk holds its transaction longer than CHUNK_SECONDS, which bounds how
+# long a concurrent request waits on the write lock, and the job pauses
+# between chunks to leave the database to the app. Lock errors and
+# Conflicts roll the chunk back and retry it.
+
+CHUNK_SIZE = 1000
+MIN_CHUNK_SIZE = 50
+CHUNK_SECONDS = 0.2
+PAUSE = 0.05
+CHUNK_ATTEMPTS = 5
+
+# name -> (key column, apply(keys) -> rows changed, description)
+JOBS = {}
+
+class Conflict(Exception):
+    """A concurrent write got to a row first; the chunk is retried."""
+
+def register(name, key, apply, description):
+    """Add a job. `apply` gets one chunk of keys (ascending) and must only
+    write rows in that range, so re-running a chunk is harmless."""
+    JOBS[name] = (key, apply, description)
+
+# ---------------- CHECKPOINT ----------------
+def load_state(name):
+    if db.session.get(BackfillState, name) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(BackfillState).values(name=name))
+        except IntegrityError:
+            pass  # created concurrently
+    return db.session.get(BackfillState, name)
+
+def restart(name):
+    BackfillState.query.filter_by(name=name).delete()
+    db.session.commit()
+
+def advance(name, last_key, keys, changed):
+    # compare-and-swap on last_key: when two runs of one job race, the loser
+    # rolls back and carries on from the winner's checkpoint
+    values = {"finished_at": datetime.utcnow()} if not keys else {
+        "last_key": keys[-1],
+        "rows": BackfillState.rows + len(keys),
+        "changed": BackfillState.changed + changed
+    }
+    updated = BackfillState.query.filter(
+        BackfillState.name == name,
+        BackfillState.last_key == last_key
+    ).update(values, synchronize_session=False)
+
+    if not updated:
+        raise Conflict(name)
+
+# ---------------- RUN ----------------
+def next_keys(key, after, size):
+    return [r[0] for r in db.session.query(key).filter(
+        key > after
+    ).order_by(key).limit(size)]
+
+def run_chunk(name, size):
+    """Apply and checkpoint one chunk in one transaction; keys visited."""
+    key, apply, _ = JOBS[name]
+
+    for attempt in range(CHUNK_ATTEMPTS):
+        try:
+            last_key = db.session.query(BackfillState.last_key).filter(
+                BackfillState.name == name
+            ).scalar()
+            keys = next_keys(key, last_key, size)
+            changed = apply(keys) if keys else 0
+
+            advance(name, last_key, keys, changed)
+            db.session.commit()
+            return len(keys)
+
+        except (OperationalError, Conflict):
+            # "database is locked" or a lost compare-and-swap
+            db.session.rollback()
+            if attempt == CHUNK_ATTEMPTS - 1:
+                raise
+            time.sleep(PAUSE * 2 ** attempt)
+
+def run(name, chunk_size=CHUNK_SIZE, pause=PAUSE, echo=None):
+    """Run (or resume) one job to the end; its BackfillState."""
+    key = JOBS[name][0]
+
+    state = load_state(name)
+    if state.finished_at:
+        db.session.commit()
+        return state
+    if state.started_at is None:
+        state.started_at = datetime.utcnow()
+    resumed_at = state.rows
+    total = resumed_at + db.session.query(func.count(key)).filter(
+        key > state.last_key
+    ).scalar()
+    db.session.commit()
+
+    size, visited, began = chunk_size, resumed_at, time.monotonic()
+    while True:
+        t = time.monotonic()
+        n = run_chunk(name, size)
+        if not n:
+            break
+
+        elapsed = time.monotonic() - t
+        if elapsed > CHUNK_SECONDS:
+            size = max(MIN_CHUNK_SIZE, size // 2)
+        elif elapsed < CHUNK_SECONDS / 4:
+            size = min(chunk_size, size * 2)
+
+        visited += n
+        if echo:
+            rate = (visited - resumed_at) / (time.monotonic() - began)
+            echo(f"  {visited}/{total} rows, {rate:.0f} rows/s, chunk {size}")
+        time.sleep(pause)
+
+    db.session.expire_all()
+    return db.session.get(BackfillState, name)
+
+# ---------------- JOBS ----------------
+def stamp_updated_at(model):
+    # rows written before change tracking existed; stamping them (which also
+    # bumps their version) lets incremental sync and exports pick them up
+    def apply(keys):
+        return db.session.execute(
+            update(model).where(
+                model.id.between(keys[0], keys[-1]),
+                model.updated_at.is_(None)
+            ).values(updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+    return apply
+
+for model in (DayPlan, Task, Notification):
+    table = model.__tablename__
+    register(
+        f"{table.replace('_', '-')}-updated-at", model.id, stamp_updated_at(model),
+        f"Stamp {table} rows that predate change tracking"
+    )
+
+def username_lower(keys):
+    # the column was filled with SQL lower(), which misses non-ASCII case
+    # folding; search compares against str.casefold()
+    stale = [
+        {"b_id": user_id, "b_username": username, "username_lower": username.casefold()}
+        for user_id, username, lowered in db.session.query(
+            User.id, User.username, User.username_lower
+        ).filter(User.id.between(keys[0], keys[-1]))
+        if lowered != username.casefold()
+    ]
+    if not stale:
+        return 0
+
+    user = User.__table__
+    db.session.execute(
+        update(user).where(
+            user.c.id == bindparam("b_id"),
+            user.c.username == bindparam("b_username")
+        ),
+        stale
+    )
+    return len(stale)
+
+register(
+    "username-lower", User.id, username_lower,
+    "Recompute case-folded usernames for search"
+)
+
+register(
+    "achievements", User.id, achievements.backfill_chunk,
+    "Compute achievement progress from each user's full history"
+)
+
+def init_app(app):
+    @app.cli.command("backfill")
+    @click.argument("names", nargs=-1)
+    @click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+    @click.option("--pause", default=PAUSE, show_default=True,
+                  help="Seconds to sleep between chunks.")
+    @click.option("--restart", "from_scratch", is_flag=True,
+                  help="Start over instead of resuming from the checkpoint.")
+    def backfill_command(names, chunk_size, pause, from_scratch):
+        """Run backfill jobs; without NAMES, list jobs and their progress."""
+        unknown = [name for name in names if name not in JOBS]
+        if unknown:
+            raise click.BadParameter(
+                f"unknown job {', '.join(unknown)} (see `flask backfill`)"
+            )
+
+        if not names:
+            states = {s.name: s for s in BackfillState.query.all()}
+            for name, (_, _, description) in JOBS.items():
+                s = states.get(name)
+                if s is None:
+                    progress = "not started"
+                elif s.finished_at:
+                    progress = f"done {s.finished_at:%Y-%m-%d %H:%M}, {s.changed} changed"
+                else:
+                    progress = f"at key {s.last_key}, {s.rows} rows, {s.changed} changed"
+                click.echo(f"{name:28} {progress:44} {description}")
+            return
+
+        for name in names:
+            if from_scratch:
+                restart(name)
+            click.echo(f"{name}:")
+            state = run(name, chunk_size, pause, echo=click.echo)
+            click.echo(f"{name}: {state.rows} rows, {state.changed} changed")
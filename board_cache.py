@@ -0,0 +1,135 @@
+import glob
+import json
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: no cross-process lock, still caches
+    fcntl = None
+
+# File-backed cache shared by every worker process on the host.
+#
+# Entries younger than `ttl` are served as-is. Older entries, up to
+# `ttl + stale_ttl`, are still served to everyone except the single process
+# that wins a non-blocking lock and rebuilds them (stale-while-revalidate).
+# With nothing usable cached, callers queue on the lock and all but the
+# first find the rebuilt entry once they get it (single-flight).
+#
+# Keys are open-ended (per user, per date), so entries nobody asks for again
+# are evicted once they're past any ttl plus stale_ttl, at most every
+# EVICT_INTERVAL seconds by whichever process writes. Locks are a fixed set
+# of LOCK_STRIPES files shared by hashed key, so they never pile up.
+
+LOCK_STRIPES = 64
+EVICT_INTERVAL = 300
+
+class BoardCache:
+    def __init__(self, directory, ttl=60, stale_ttl=300):
+        self.directory = directory
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_ttl = ttl      # longest ttl a caller asked for
+        self._evicted_at = time.time()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None, None
+        return entry["value"], time.time() - entry["at"]
+
+    def _write(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"at": time.time(), "value": value}, f)
+        os.replace(tmp, path)
+
+        if time.time() - self._evicted_at > EVICT_INTERVAL:
+            self.evict()
+
+    def _lock_path(self, key):
+        stripe = zlib.crc32(key.encode("utf-8")) % LOCK_STRIPES
+        return os.path.join(self.directory, "locks", f"{stripe}.lock")
+
+    @contextmanager
+    def _lock(self, key, blocking):
+        if fcntl is None:
+            yield True
+            return
+
+        with open(self._lock_path(key), "a") as f:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(f, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.max_ttl = max(self.max_ttl, ttl)
+        os.makedirs(os.path.join(self.directory, "locks"), exist_ok=True)
+
+        value, age = self._read(key)
+        if value is not None and age < ttl:
+            return value
+
+        if value is not None and age < ttl + self.stale_ttl:
+            with self._lock(key, blocking=False) as acquired:
+                if not acquired:
+                    return value  # someone else is rebuilding
+                value = compute()
+                self._write(key, value)
+                return value
+
+        with self._lock(key, blocking=True):
+            value, age = self._read(key)
+            if value is not None and age < ttl:
+                return value
+            value = compute()
+            self._write(key, value)
+            return value
+
+    def invalidate(self, pattern):
+        """Drop entries whose key matches a glob pattern."""
+        for path in glob.glob(os.path.join(glob.escape(self.directory), pattern + ".json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self, max_age=None):
+        """Remove entries (and stray temp files) older than any ttl plus
+        stale_ttl; the number removed."""
+        max_age = self.max_ttl + self.stale_ttl if max_age is None else max_age
+        cutoff = time.time() - max_age
+        self._evicted_at = time.time()
+
+        removed = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            # per-key .lock files are left over from before lock stripes
+            if not entry.name.endswith((".json", ".tmp", ".lock")):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # rewritten or evicted concurrently
+        return removed
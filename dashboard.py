@@ -0,0 +1,526 @@
+import os
+from datetime import date, time as dtime, timedelta
+from functools import partial
+
+from flask import Blueprint, current_app, render_template, request, jsonify, send_from_directory
+from flask_login import login_required, current_user
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+import achievements
+import archive
+import assets
+import recurring
+import search
+import timezones
+from helpers import (
+    api_ok, api_error, stream_ok, user_today, is_plan_locked, friendships,
+    calculate_streak, calculate_xp, get_rank, scores_changed, player_stats,
+    task_payload, plan_payload, template_payload
+)
+from memo import memoize
+from models import db, User, DayPlan, Task, Notification, PlanTemplate, PlanTemplateTask
+from streaming import stream_json
+from user_cache import cache as user_cache
+
+bp = Blueprint("dashboard", __name__)
+
+# ---------------- DASHBOARD ----------------
+# The heatmap, friend cards and mini leaderboard are fragment-cached in the
+# template; these loaders only run when a fragment has to be rebuilt.
+@memoize
+def friend_progress(user_id):
+    """[(friendship, friend, friend's tasks today, streak)] in a fixed
+    number of queries however many friends there are."""
+    rels = friendships(user_id)
+    if not rels:
+        return []
+
+    ids = [f.friend_id if f.user_id == user_id else f.user_id for f in rels]
+    users = {u.id: u for u in User.query.filter(User.id.in_(ids)).all()}
+
+    # each friend's "today" is the local date of their own timezone
+    by_date = {}
+    for u in users.values():
+        by_date.setdefault(timezones.local_today(u.timezone), []).append(u.id)
+    plan_ids = dict(db.session.query(DayPlan.id, DayPlan.user_id).filter(or_(*[
+        (DayPlan.date == d) & DayPlan.user_id.in_(day_ids)
+        for d, day_ids in by_date.items()
+    ])))
+
+    tasks = {}
+    if plan_ids:
+        for t in Task.query.filter(Task.dayplan_id.in_(plan_ids)).all():
+            tasks.setdefault(plan_ids[t.dayplan_id], []).append(t)
+
+    stats = player_stats(ids)
+    return [
+        (f, users[friend_id], tasks.get(friend_id, []), stats[friend_id][0])
+        for f, friend_id in zip(rels, ids)
+    ]
+
+def todays_plan(today):
+    """Today's plan, materialized from a recurring template on first read."""
+    plan = DayPlan.query.filter_by(
+        user_id=current_user.id,
+        date=today
+    ).first()
+
+    if plan is None and recurring.materialize_for(current_user.id, today):
+        # friends' progress cards now have a plan to show
+        scores_changed(current_user.id)
+        plan = DayPlan.query.filter_by(
+            user_id=current_user.id,
+            date=today
+        ).first()
+
+    return plan
+
+@memoize
+def heatmap_scores(user_id, today):
+    first = today - timedelta(days=29)
+    scores = dict(db.session.query(DayPlan.date, DayPlan.final_score).filter(
+        DayPlan.user_id == user_id,
+        DayPlan.date >= first,
+        DayPlan.date <= today
+    ).all())
+
+    return [scores.get(first + timedelta(days=i)) or 0 for i in range(30)]
+
+@memoize
+def friends_ranking(user_id, username, today_score, my_streak):
+    leaderboard = []
+
+    # You
+    leaderboard.append({
+        "name": username,
+        "streak": my_streak,
+        "score": today_score,
+        "is_me": True
+    })
+
+    # Friends
+    for rel, friend_user, friend_tasks, friend_streak in friend_progress(user_id):
+        friend_score = sum(t.points for t in friend_tasks if t.status == "completed")
+        leaderboard.append({
+            "name": friend_user.username,
+            "streak": friend_streak,
+            "score": friend_score,
+            "is_me": False
+        })
+
+    leaderboard.sort(key=lambda x: (x["streak"], x["score"]), reverse=True)
+    return leaderboard
+
+@bp.route('/')
+@login_required
+def dashboard():
+    today = user_today()
+    return render_dashboard(todays_plan(today), today)
+
+def render_dashboard(plan, today):
+    """The dashboard page around today's `plan` (None if there is none).
+
+    Only reads: warm-up renders it for users who aren't there to fill the
+    fragment cache.
+    """
+    # ---------- TODAY ----------
+    tasks = Task.query.filter_by(
+        dayplan_id=plan.id
+    ).all() if plan else []
+
+    today_score = sum(t.points for t in tasks if t.status == "completed")
+
+    # ---------- YESTERDAY SUMMARY ----------
+    yesterday = today - timedelta(days=1)
+    summary = None
+
+    y_plan = DayPlan.query.filter_by(
+        user_id=current_user.id,
+        date=yesterday
+    ).first()
+
+    if y_plan and y_plan.finalized_at:
+        summary = {
+            "percent": y_plan.completion_percent,
+            "planned": y_plan.planned_minutes,
+            "actual": y_plan.actual_minutes,
+            "saved": y_plan.planned_minutes - y_plan.actual_minutes
+        }
+
+    elif y_plan:
+        y_tasks = Task.query.filter_by(dayplan_id=y_plan.id).all()
+
+        done = len([t for t in y_tasks if t.status == "completed"])
+        total = len(y_tasks)
+
+        planned_time = sum(t.planned_duration_minutes or 0 for t in y_tasks)
+        actual_time = sum(t.actual_duration_minutes or 0 for t in y_tasks)
+
+        summary = {
+            "percent": int((done / total) * 100) if total else 0,
+            "planned": planned_time,
+            "actual": actual_time,
+            "saved": planned_time - actual_time
+        }
+
+    my_streak = calculate_streak(current_user.id)
+
+    locked = is_plan_locked(today + timedelta(days=1))
+
+    xp = calculate_xp(current_user.id)
+    rank = get_rank(xp)
+    notifications = Notification.query.filter_by(
+        user_id=current_user.id,
+        is_read=False
+    ).all()
+
+    return render_template(
+        'dashboard.html',
+        today=today,
+        tasks=tasks,
+        friends_data=partial(friend_progress, current_user.id),
+        plan_exists=bool(plan),
+        locked=locked,
+        summary=summary,
+        today_score=today_score,
+        heatmap=partial(heatmap_scores, current_user.id, today),
+        my_streak=my_streak,
+        leaderboard=partial(
+            friends_ranking, current_user.id, current_user.username,
+            today_score, my_streak
+        ),
+        xp=xp,
+        rank=rank,
+        badges=achievements.user_titles(current_user.id),
+        notifications=notifications
+    )
+
+@bp.route("/api/dashboard")
+@login_required
+def api_dashboard():
+    today = user_today()
+
+    # ---------- TODAY PLAN ----------
+    plan = todays_plan(today)
+
+    tasks = Task.query.filter_by(
+        dayplan_id=plan.id
+    ).all() if plan else []
+
+    today_score = sum(t.points for t in tasks if t.status == "completed")
+
+    # ---------- USER META ----------
+    xp = calculate_xp(current_user.id)
+    streak = calculate_streak(current_user.id)
+    rank = get_rank(xp)
+
+    # ---------- HEATMAP + FRIENDS ----------
+    # the same memoized bulk loaders the dashboard fragments use
+    heatmap = heatmap_scores(current_user.id, today)
+    leaderboard = friends_ranking(
+        current_user.id, current_user.username, today_score, streak
+    )
+
+    # ---------- RESPONSE ----------
+    return stream_json({
+        "user": {
+            "username": current_user.username,
+            "xp": xp,
+            "rank": rank,
+            "streak": streak,
+            "today_score": today_score,
+            "badges": achievements.user_titles(current_user.id)
+        },
+        "tasks": (
+            {
+                "id": t.id,
+                "title": t.title,
+                "desc": t.description,
+                "start": t.expected_start.strftime("%H:%M"),
+                "end": t.expected_end.strftime("%H:%M"),
+                "status": t.status,
+                "points": t.points
+            } for t in tasks
+        ),
+        "heatmap": heatmap,
+        "leaderboard": (row for row in leaderboard)
+    })
+
+# ---------------- PLAN DAY ----------------
+@bp.route('/plan', methods=['GET', 'POST'])
+@login_required
+def plan_day():
+    if request.method == 'POST':
+        plan_date = user_today() + timedelta(days=1)
+
+        if is_plan_locked(plan_date):
+            return jsonify({"error": "Planning is locked for today"}), 400
+
+        # Check if plan already exists for the SAME date
+        existing_plan = DayPlan.query.filter_by(
+            user_id=current_user.id,
+            date=plan_date
+        ).first()
+
+        if existing_plan:
+            return jsonify({"error": "Plan already exists"}), 400
+
+        data = request.get_json()
+        if not data or 'tasks' not in data:
+            return jsonify({"error": "Invalid request data"}), 400
+
+        total_points = sum(t['points'] for t in data['tasks'])
+        if total_points != 100:
+            return jsonify({"error": "Total points must be 100"}), 400
+
+        repeat, error = parse_repeat(data.get('repeat'))
+        if error:
+            return jsonify({"error": error}), 400
+
+        try:
+            plan = DayPlan(
+                user_id=current_user.id,
+                date=plan_date
+            )
+            db.session.add(plan)
+            db.session.flush()  # get plan.id without committing
+
+            for t in data['tasks']:
+                task = Task(
+                    dayplan_id=plan.id,
+                    title=t['title'],
+                    description=t.get('description', ''),
+                    expected_start=dtime.fromisoformat(t['start']),
+                    expected_end=dtime.fromisoformat(t['end']),
+                    points=t['points']
+                )
+                db.session.add(task)
+
+            if repeat:
+                db.session.add(PlanTemplate(
+                    user_id=current_user.id,
+                    starts_on=plan_date,
+                    tasks=[
+                        PlanTemplateTask(
+                            title=t['title'],
+                            description=t.get('description', ''),
+                            expected_start=dtime.fromisoformat(t['start']),
+                            expected_end=dtime.fromisoformat(t['end']),
+                            points=t['points']
+                        ) for t in data['tasks']
+                    ],
+                    **repeat
+                ))
+
+            db.session.commit()
+            return jsonify({"status": "saved"}), 201
+
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"error": "Plan already exists"}), 400
+
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+
+    return render_template('plan_day.html')
+
+def parse_repeat(repeat):
+    """Template recurrence columns for a /plan `repeat` option, or an error."""
+    if not repeat:
+        return None, None
+
+    if "weekdays" in repeat:
+        days = repeat["weekdays"]
+        if not isinstance(days, list) or not days or not all(
+            isinstance(d, int) and 0 <= d <= 6 for d in days
+        ):
+            return None, "Repeat weekdays must be 0 (Mon) to 6 (Sun)"
+        return {"weekdays": sum(1 << d for d in set(days))}, None
+
+    every = repeat.get("every_days")
+    if not isinstance(every, int) or not 1 <= every <= 365:
+        return None, "Repeat every_days must be between 1 and 365"
+    return {"every_days": every}, None
+
+@bp.route("/api/templates")
+@login_required
+def list_templates():
+    templates = PlanTemplate.query.filter_by(
+        user_id=current_user.id,
+        active=True
+    ).order_by(PlanTemplate.id.desc()).all()
+
+    return api_ok(templates=[template_payload(t) for t in templates])
+
+@bp.route("/api/templates/<int:template_id>/stop", methods=["POST"])
+@login_required
+def stop_template(template_id):
+    # plans already materialized from it stay as they are
+    template = PlanTemplate.query.filter_by(
+        id=template_id,
+        user_id=current_user.id
+    ).first_or_404()
+
+    template.active = False
+    db.session.commit()
+    return api_ok(template=template_payload(template))
+
+# ---------------- HISTORY ----------------
+@bp.route('/history')
+@login_required
+def history():
+    date_str = request.args.get("date")
+    selected = date.fromisoformat(date_str) if date_str else user_today()
+
+    P = archive.all_plans()
+    plan = db.session.query(P).filter(
+        P.user_id == current_user.id,
+        P.date == selected
+    ).first()
+    tasks = archive.load_tasks([plan.id]).get(plan.id, []) if plan else []
+
+    return render_template("history.html", tasks=tasks, selected=selected)
+
+HISTORY_PAGE_DAYS = 14
+
+@bp.route('/api/history')
+@login_required
+def api_history():
+    try:
+        start = request.args.get("from")
+        end = request.args.get("to")
+        after = request.args.get("after")
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else user_today()
+        after = date.fromisoformat(after) if after else None
+    except ValueError:
+        return api_error("Invalid date")
+
+    limit = max(1, min(request.args.get("limit", HISTORY_PAGE_DAYS, type=int), 60))
+    status = request.args.get("status")
+    reason = request.args.get("reason")
+
+    # criteria are built against whichever Task entity (hot or hot+archive)
+    task_filter = []
+    if status:
+        task_filter.append(lambda T: T.status == status)
+    if reason:
+        task_filter.append(lambda T: or_(
+            T.cancel_reason == reason,
+            T.incomplete_reason == reason
+        ))
+
+    P = archive.all_plans()
+    q = db.session.query(P).filter(
+        P.user_id == current_user.id,
+        P.date <= end
+    )
+    if start:
+        q = q.filter(P.date >= start)
+    if after:
+        # keyset: pages walk backwards in time
+        q = q.filter(P.date < after)
+
+    if task_filter:
+        T = archive.all_tasks()
+        q = q.filter(
+            db.session.query(T).filter(
+                T.dayplan_id == P.id, *(c(T) for c in task_filter)
+            ).exists()
+        )
+
+    plans = q.order_by(P.date.desc()).limit(limit).all()
+    tasks = archive.load_tasks([p.id for p in plans], *task_filter)
+
+    return stream_ok(
+        days=(
+            {**plan_payload(p), "tasks": [task_payload(t) for t in tasks.get(p.id, [])]}
+            for p in plans
+        ),
+        next=plans[-1].date.isoformat() if len(plans) == limit else None
+    )
+
+@bp.route('/api/search')
+@login_required
+def api_search():
+    q = request.args.get("q", "")
+    page = max(request.args.get("page", 1, type=int), 1)
+    limit = max(1, min(request.args.get("limit", 20, type=int), 50))
+
+    hits = search.search_tasks(
+        current_user.id, q, limit=limit + 1, offset=(page - 1) * limit
+    )
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    tasks = {
+        t.id: t for t in Task.query.filter(Task.id.in_([h.id for h in hits])).all()
+    } if hits else {}
+
+    return stream_ok(
+        page=page,
+        has_more=has_more,
+        results=(
+            {**task_payload(tasks[h.id]), "date": str(h.date), "rank": float(h.rank)}
+            for h in hits if h.id in tasks
+        )
+    )
+
+@bp.route('/analytics')
+@login_required
+def analytics():
+    today = user_today()
+    week_start = today - timedelta(days=7)
+    month_start = today - timedelta(days=30)
+
+    P = archive.all_plans()
+
+    def stats(start):
+        plans = db.session.query(P).filter(
+            P.user_id == current_user.id,
+            P.date >= start
+        ).all()
+
+        total = len(plans)
+        completed = len([p for p in plans if p.final_score >= 70])
+        avg = int(sum(p.final_score for p in plans) / total) if total else 0
+
+        return total, completed, avg
+
+    week = stats(week_start)
+    month = stats(month_start)
+
+    return render_template(
+        "analytics.html",
+        week=week,
+        month=month
+    )
+
+# ---------------- SETTINGS ----------------
+@bp.route('/settings/timezone', methods=['POST'])
+@login_required
+def set_timezone():
+    data = request.get_json(silent=True) or {}
+    name = data.get("timezone")
+
+    if not timezones.is_valid(name):
+        return api_error("Invalid timezone")
+
+    User.query.filter_by(id=current_user.id).update({"timezone": name})
+    db.session.commit()
+    user_cache.invalidate(current_user.id)
+
+    return api_ok(timezone=name)
+
+# ---------------- PWA ----------------
+@bp.route("/service-worker.js")
+def sw():
+    # built copy carries the fingerprinted precache list
+    path = assets.service_worker_path()
+    return send_from_directory(os.path.dirname(path), os.path.basename(path))
+
+@bp.route("/manifest.json")
+def manifest():
+    return current_app.send_static_file("manifest.json")
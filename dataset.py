@@ -0,0 +1,241 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import select
+
+import archive
+import sync
+from models import db, User, DayPlan, Task, Friend
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only `flask export-dataset` needs it
+    pa = pq = None
+
+# Columnar dump of the whole dataset for offline analysis:
+#
+#   OUT/day_plan/month=2026-10/part-<run>.parquet
+#   OUT/task/month=2026-10/part-<run>.parquet      (tasks plus plan_date)
+#   OUT/user/part-<run>.parquet, OUT/friend/part-<run>.parquet
+#
+# Plans and tasks are read through the hot ∪ archive views, one month per
+# job, in worker processes that stream server-side cursor batches straight
+# into the file, so memory stays at one batch per worker. The first run (or
+# --full) writes every month and drops older parts; later runs only append
+# parts holding plans/tasks whose updated_at is past the previous run's
+# start (less sync.OVERLAP), so readers keep the newest row per id. Users and friendships have
+# no change tracking and are rewritten whole each run; deleted tasks only
+# disappear on a full run.
+
+BATCH_SIZE = 10000
+WORKERS = min(4, os.cpu_count() or 1)
+STATE_FILE = "_state.json"
+FORMATS = ("parquet", "arrow")
+
+SNAPSHOT_COLUMNS = {
+    "user": [c for c in User.__table__.columns if c.name != "password_hash"],
+    "friend": list(Friend.__table__.columns),
+}
+
+# ---------------- SCHEMA ----------------
+def arrow_type(column_type):
+    if isinstance(column_type, sa.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sa.Integer):
+        return pa.int64()
+    if isinstance(column_type, sa.DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, sa.Date):
+        return pa.date32()
+    if isinstance(column_type, sa.Time):
+        return pa.time64("us")
+    return pa.string()
+
+def arrow_schema(columns):
+    return pa.schema([(c.name, arrow_type(c.type)) for c in columns])
+
+def partition_query(table, month, since):
+    """Statement and column list for one month of plans or tasks."""
+    P = archive.all_plans()
+    in_month = (P.date >= month, P.date < next_month(month))
+
+    if table == "day_plan":
+        columns = list(DayPlan.__table__.columns)
+        stmt = select(*[getattr(P, c.name) for c in columns]).where(*in_month)
+        changed = P.updated_at
+    else:
+        T = archive.all_tasks()
+        columns = list(Task.__table__.columns) + [sa.Column("plan_date", sa.Date)]
+        stmt = select(
+            *[getattr(T, c.name) for c in columns[:-1]], P.date
+        ).join_from(T, P, T.dayplan_id == P.id).where(*in_month)
+        changed = T.updated_at
+
+    if since:
+        stmt = stmt.where(changed > since)
+    return stmt, columns
+
+def next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+def changed_months(since):
+    """{"day_plan": [first days of months], "task": [...]} with rows to write."""
+    P, T = archive.all_plans(), archive.all_tasks()
+    plans = select(P.date).distinct()
+    tasks = select(P.date).join_from(T, P, T.dayplan_id == P.id).distinct()
+    if since:
+        plans = plans.where(P.updated_at > since)
+        tasks = tasks.where(T.updated_at > since)
+
+    return {
+        table: sorted({d.replace(day=1) for (d,) in db.session.execute(q)})
+        for table, q in (("day_plan", plans), ("task", tasks))
+    }
+
+# ---------------- WRITING ----------------
+def open_writer(path, schema, fmt):
+    if fmt == "arrow":
+        return pa.ipc.new_file(path, schema)
+    return pq.ParquetWriter(path, schema, compression="zstd")
+
+def write_rows(path, stmt, columns, fmt):
+    """Stream a query into one file, BATCH_SIZE rows at a time; row count.
+
+    The file appears under its final name only once complete.
+    """
+    schema = arrow_schema(columns)
+    result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+    rows, writer = 0, None
+    for batch in result.partitions():
+        if writer is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = open_writer(path + ".tmp", schema, fmt)
+
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+            schema=schema
+        ))
+        rows += len(batch)
+
+    if writer is not None:
+        writer.close()
+        os.replace(path + ".tmp", path)
+    return rows
+
+def export_partition(out, table, month, since, fmt, run_id):
+    stmt, columns = partition_query(table, month, since)
+    path = os.path.join(
+        out, table, f"month={month:%Y-%m}", f"part-{run_id}.{fmt}"
+    )
+    return table, month, write_rows(path, stmt, columns, fmt)
+
+def export_snapshot(out, table, fmt, run_id):
+    columns = SNAPSHOT_COLUMNS[table]
+    rows = write_rows(
+        os.path.join(out, table, f"part-{run_id}.{fmt}"),
+        select(*columns), columns, fmt
+    )
+    prune(os.path.join(out, table), run_id)
+    return rows
+
+def prune(directory, run_id):
+    """Drop parts under `directory` that the run `run_id` didn't write."""
+    for path in glob.glob(os.path.join(directory, "**", "part-*"), recursive=True):
+        if not os.path.basename(path).startswith(f"part-{run_id}."):
+            os.remove(path)
+
+# ---------------- WORKERS ----------------
+_worker_app = None
+
+def init_worker(config):
+    global _worker_app
+    from app import create_app
+
+    if has_app_context():
+        # forked from the CLI process: leave its pooled connections alone
+        db.engine.dispose(close=False)
+
+    _worker_app = create_app(config, blueprints=())
+    _worker_app.app_context().push()
+
+# ---------------- RUN ----------------
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def run(out, full=False, fmt="parquet", workers=WORKERS, echo=None):
+    """Export (or refresh) the dataset under `out`; {table: rows written}."""
+    os.makedirs(out, exist_ok=True)
+    state_path = os.path.join(out, STATE_FILE)
+    state = None if full else load_state(state_path)
+    # updated_at is stamped at flush, not commit: re-read sync.OVERLAP before
+    # the last start so rows committed after that run read them are written
+    # (twice at worst, which readers already dedupe by id)
+    since = datetime.fromisoformat(state["started_at"]) - sync.OVERLAP if state else None
+
+    # rows changed while this run reads are picked up by the next one
+    started = datetime.utcnow()
+    run_id = started.strftime("%Y%m%dT%H%M%S")
+
+    counts = {table: export_snapshot(out, table, fmt, run_id) for table in SNAPSHOT_COLUMNS}
+    jobs = [
+        (out, table, month, since, fmt, run_id)
+        for table, months in changed_months(since).items()
+        for month in months
+    ]
+
+    def done(table, month, rows):
+        counts[table] = counts.get(table, 0) + rows
+        if echo:
+            echo(f"  {table} {month:%Y-%m}: {rows} rows")
+
+    if workers <= 1:
+        for job in jobs:
+            done(*export_partition(*job))
+    else:
+        config = {
+            key: current_app.config[key]
+            for key in ("SQLALCHEMY_DATABASE_URI", "ARCHIVE_DATABASE_PATH")
+        }
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(config,)) as pool:
+            for future in as_completed([pool.submit(export_partition, *job) for job in jobs]):
+                done(*future.result())
+
+    if since is None:
+        for table in ("day_plan", "task"):
+            prune(os.path.join(out, table), run_id)
+    save_state(state_path, {"started_at": started.isoformat(), "run": run_id})
+
+    return counts
+
+def init_app(app):
+    @app.cli.command("export-dataset")
+    @click.argument("out", type=click.Path(file_okay=False))
+    @click.option("--full", is_flag=True,
+                  help="Rewrite every partition instead of appending changes.")
+    @click.option("--format", "fmt", type=click.Choice(FORMATS),
+                  default="parquet", show_default=True)
+    @click.option("--workers", default=WORKERS, show_default=True)
+    def export_dataset_command(out, full, fmt, workers):
+        """Dump users, plans, tasks and friendships as partitioned Parquet."""
+        if pa is None:
+            raise click.ClickException("export-dataset needs pyarrow (pip install pyarrow)")
+
+        counts = run(out, full, fmt, workers, echo=click.echo)
+        click.echo(", ".join(f"{rows} {table}" for table, rows in counts.items()))
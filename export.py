@@ -0,0 +1,118 @@
+import csv
+import io
+from datetime import timedelta
+from itertools import islice
+
+from flask import Blueprint, request
+from flask_login import login_required, current_user
+
+import archive
+from helpers import api_ok, api_error, user_today
+from models import db
+from streaming import dumps, stream_response
+
+bp = Blueprint("export", __name__)
+
+EXPORT_BATCH = 500
+
+# ---------------- EXPORT ----------------
+def csv_line(values):
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue()
+
+def with_tasks(plans):
+    # tasks are loaded per batch of plans, across both stores
+    plans = iter(plans)
+    while batch := list(islice(plans, EXPORT_BATCH)):
+        tasks = archive.load_tasks([p.id for p in batch])
+        for p in batch:
+            yield p, tasks.get(p.id, [])
+
+@bp.route('/export')
+@login_required
+def export():
+    # importer (the restore pipeline, with its process pool and the rollover
+    # and recurring code) only loads once a file is exported or imported
+    import importer
+
+    period = request.args.get("period", "day")
+    fmt = request.args.get("format", "csv")
+    include_tasks = fmt == "jsonl" or request.args.get("tasks") == "1"
+    today = user_today()
+
+    if period == "week":
+        start = today - timedelta(days=7)
+    elif period == "month":
+        start = today - timedelta(days=30)
+    elif period == "year":
+        start = today - timedelta(days=365)
+    elif period == "all":
+        start = None
+    else:
+        start = today
+
+    P = archive.all_plans()
+    plans = db.session.query(P).filter(P.user_id == current_user.id)
+    if start:
+        plans = plans.filter(P.date >= start)
+    plans = plans.order_by(P.date).yield_per(EXPORT_BATCH)
+
+    def generate():
+        if not include_tasks:
+            yield "date,score\n"
+            for p in plans:
+                yield f"{p.date},{p.final_score}\n"
+            return
+
+        if fmt == "jsonl":
+            for p, tasks in with_tasks(plans):
+                yield dumps({
+                    "date": p.date.isoformat(),
+                    "score": p.final_score,
+                    "tasks": [importer.task_record(t) for t in tasks]
+                }) + b"\n"
+            return
+
+        # one row per task; a day without tasks still gets a row
+        yield csv_line(importer.CSV_HEADER)
+        for p, tasks in with_tasks(plans):
+            for t in tasks or [None]:
+                record = importer.task_record(t) if t else {}
+                yield csv_line([p.date, p.final_score] + [
+                    record.get(f) for f in importer.TASK_FIELDS
+                ])
+
+    return stream_response(
+        generate(),
+        mimetype="application/x-ndjson" if fmt == "jsonl" else "text/csv",
+        headers={"Content-Disposition": f"attachment; filename={period}.{fmt}"}
+    )
+
+# ---------------- IMPORT ----------------
+@bp.route('/import', methods=['POST'])
+@login_required
+def import_plans():
+    import importer
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return api_error("Choose a file to import")
+
+    # parsed inline: a request shouldn't fork a pool out of a web worker,
+    # large restores go through `flask import-plans`. Only finished days:
+    # today and later are planned in the app, not uploaded
+    try:
+        summary = importer.run(
+            io.TextIOWrapper(upload.stream, encoding="utf-8", newline=""),
+            current_user.id,
+            request.form.get("format") or importer.guess_format(upload.filename),
+            dry_run=request.form.get("dry_run") == "1",
+            workers=1,
+            past_only=True
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return api_error(str(e))
+
+    return api_ok(**summary)
@@ -0,0 +1,34 @@
+from flask_login import LoginManager
+from flask_wtf import CSRFProtect
+from sqlalchemy import event
+
+from models import db, User
+from user_cache import CachedUser, cache as user_cache
+
+# Extension instances live here, unbound, so blueprints can import them
+# without importing the app; create_app() binds them with init_app().
+
+csrf = CSRFProtect()
+
+login_manager = LoginManager()
+login_manager.login_view = "auth.login"
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+
+    user = user_cache.get(user_id)
+    if user is None:
+        row = db.session.query(
+            User.id, User.username, User.show_global, User.timezone
+        ).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = user_cache.put(CachedUser(*row))
+
+    return user
+
+@event.listens_for(User, "after_update")
+def invalidate_cached_user(mapper, connection, target):
+    # covers password changes and any other ORM write to a user row
+    user_cache.invalidate(target.id)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Fragment cache benchmark: renders the dashboard of the most active users
+# against the configured database, first with an empty fragment cache (every
+# {% cache %} block renders and runs its loaders), then again with the
+# fragments filled, and reports time and SQL statements per render. The cache
+# goes to a temporary directory; point DATABASE_URL at a copy, since a first
+# dashboard visit materializes today's recurring plans.
+#
+#   DATABASE_URL=sqlite:////tmp/app-copy.db python fragment_bench.py --users 50
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def render_all(app, rows):
+    from flask_login import login_user
+    from sqlalchemy import event
+
+    import dashboard
+    from models import db
+    from user_cache import CachedUser
+
+    times, queries = [], []
+
+    def count(*args):
+        queries[-1] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        for row in rows:
+            queries.append(0)
+            with app.test_request_context("/"):
+                login_user(CachedUser(*row))
+                start = time.perf_counter()
+                dashboard.dashboard()
+                times.append(time.perf_counter() - start)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return times, queries
+
+def report(label, times, queries):
+    print(
+        f"{label}: median {statistics.median(times) * 1000:7.1f} ms   "
+        f"max {max(times) * 1000:7.1f} ms   "
+        f"{statistics.mean(queries):5.1f} queries/render"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    from app import create_app
+    from models import db, User
+    import warmup
+
+    with tempfile.TemporaryDirectory(prefix="fragment-bench-") as cache_dir:
+        app = create_app({"WARMUP_USERS": args.users, "TEMPLATE_CACHE_DIR": cache_dir})
+        with app.app_context():
+            rows = db.session.query(
+                User.id, User.username, User.show_global, User.timezone
+            ).filter(User.id.in_(warmup.active_users())).all()
+            if not rows:
+                sys.exit("no users with recent plans in this database")
+
+            report("cold fragments", *render_all(app, rows))
+            report("warm fragments", *render_all(app, rows))
+
+            fragment_dir = app.extensions["fragment_cache"].directory
+            entries = [n for n in os.listdir(fragment_dir) if n.endswith(".json")]
+            print(f"{len(rows)} dashboards, {len(entries)} fragments cached")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import re
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from board_cache import BoardCache
+
+# Template fragment cache:
+#
+#   {% cache "friends", current_user.id, today %} ... {% endcache %}
+#   {% cache board_fragment, ttl=board_ttl %} ... {% endcache %}
+#
+# The rendered HTML is stored in a BoardCache directory, so every worker on
+# the host shares it and invalidate() reaches all of them, and per-user keys
+# nobody renders again are evicted once they expire. Whatever the block reads
+# should be loaded lazily (a callable the block invokes), or a hit saves only
+# the rendering and not the queries behind it.
+#
+# Compiled templates are also kept on disk (Jinja bytecode cache), so a
+# fresh worker loads them instead of compiling them.
+
+DEFAULT_TTL = 300
+STALE_TTL = 30
+
+def fragment_key(*parts):
+    # "-" only ever separates parts, so invalidate() patterns can't overmatch;
+    # a tuple or list part is spliced in, so views can pass a prepared key
+    flat = []
+    for p in parts:
+        flat.extend(p if isinstance(p, (tuple, list)) else [p])
+    return "-".join(re.sub(r"[^A-Za-z0-9_.]+", "_", str(p)) for p in flat)
+
+def invalidate(*parts):
+    """Drop the fragment for these key parts and every longer key under it."""
+    cache = current_app.extensions["fragment_cache"]
+    key = fragment_key(*parts)
+    cache.invalidate(key)
+    cache.invalidate(key + "-*")
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        parts = []
+        ttl = nodes.Const(None)
+        while parser.stream.current.type != "block_end":
+            if parts:
+                parser.stream.expect("comma")
+            if parser.stream.current.test("name:ttl") and parser.stream.look().test("assign"):
+                next(parser.stream)
+                next(parser.stream)
+                ttl = parser.parse_expression()
+            else:
+                parts.append(parser.parse_expression())
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(parts), ttl])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, ttl, caller):
+        cache = current_app.extensions["fragment_cache"]
+        html = cache.get_or_compute(fragment_key(*parts), lambda: str(caller()), ttl)
+        return Markup(html)
+
+def init_app(app):
+    cache_dir = app.config["TEMPLATE_CACHE_DIR"]
+    os.makedirs(os.path.join(cache_dir, "bytecode"), exist_ok=True)
+
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+        os.path.join(cache_dir, "bytecode")
+    )
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.extensions["fragment_cache"] = BoardCache(
+        os.path.join(cache_dir, "fragments"), ttl=DEFAULT_TTL, stale_ttl=STALE_TTL
+    )
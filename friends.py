@@ -0,0 +1,188 @@
+from flask import Blueprint, request
+from flask_login import login_required, current_user
+from sqlalchemy import or_
+
+import suggestions
+import typeahead
+from helpers import (
+    api_ok, api_error, calculate_xp, friendships, invalidate_friend_boards
+)
+from models import db, User, Friend, Notification
+from streaming import stream_json
+
+bp = Blueprint("friends", __name__)
+
+# ---------------- FRIENDS ----------------
+@bp.route('/add-friend', methods=['POST'])
+@login_required
+def add_friend():
+    username = request.form['username']
+    receiver = User.query.filter_by(username=username).first()
+
+    if not receiver or receiver.id == current_user.id:
+        return api_error("Invalid user")
+
+    a, b = sorted([current_user.id, receiver.id])
+
+    existing = Friend.query.filter_by(
+        user_id=a,
+        friend_id=b
+    ).first()
+
+    if existing:
+        if existing.status == "pending":
+            return api_error("requested")
+        if existing.status == "accepted":
+            return api_error("following")
+
+    friend_req = Friend(
+        user_id=a,
+        friend_id=b,
+        status="pending"
+    )
+
+    db.session.add(friend_req)
+    db.session.flush()
+
+    db.session.add(Notification(
+        user_id=receiver.id,
+        message=f"{current_user.username} sent you a friend request",
+        type="friend_request",
+        related_id=friend_req.id
+    ))
+
+    db.session.commit()
+    return api_ok(message="sent",xp=calculate_xp(current_user.id))
+
+@bp.route('/api/friends/suggestions')
+@login_required
+def friend_suggestions():
+    limit = max(1, min(request.args.get("limit", 10, type=int), 20))
+    rows = suggestions.for_user(current_user.id, limit)
+
+    return api_ok(suggestions=[
+        {"id": user_id, "username": username, "mutual": mutual}
+        for user_id, username, mutual in rows
+    ])
+
+@bp.route('/api/users/search')
+@login_required
+def user_search():
+    limit = max(1, min(request.args.get("limit", 10, type=int), 20))
+
+    # anyone with a request or friendship either way can't be added again
+    known = db.session.query(Friend.user_id, Friend.friend_id).filter(
+        or_(Friend.user_id == current_user.id, Friend.friend_id == current_user.id)
+    ).all()
+    exclude = {uid for pair in known for uid in pair} | {current_user.id}
+
+    try:
+        rows, after = typeahead.search(
+            request.args.get("q", ""), exclude, request.args.get("after"), limit
+        )
+    except ValueError:
+        return api_error("Invalid cursor")
+
+    return api_ok(
+        users=[{"id": user_id, "username": username} for user_id, username in rows],
+        next=after
+    )
+
+@bp.route('/friend/accept/<int:id>', methods=['POST'])
+@login_required
+def accept_friend(id):
+    req = Friend.query.filter(
+        Friend.id == id,
+        or_(
+            Friend.user_id == current_user.id,
+            Friend.friend_id == current_user.id
+        ),
+        Friend.status == "pending"
+    ).first_or_404()
+
+    # Accept
+    req.status = "accepted"
+
+    # Mark ALL related notifications as read
+    Notification.query.filter_by(
+        related_id=req.id
+    ).update({"is_read": True})
+
+    pair = (req.user_id, req.friend_id)
+    db.session.commit()
+    invalidate_friend_boards(*pair)
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@bp.route('/friend/decline/<int:id>', methods=['POST'])
+@login_required
+def decline_friend(id):
+    req = Friend.query.filter(
+        Friend.id == id,
+        or_(
+            Friend.user_id == current_user.id,
+            Friend.friend_id == current_user.id
+        ),
+        Friend.status == "pending"
+    ).first_or_404()
+
+    Notification.query.filter_by(
+        related_id=req.id
+    ).update({"is_read": True})
+
+    db.session.delete(req)
+    db.session.commit()
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@bp.route('/friend/delete/<int:id>', methods=['POST'])
+@login_required
+def delete_friend(id):
+    f = Friend.query.get_or_404(id)
+
+    if current_user.id not in (f.user_id, f.friend_id):
+        return api_error("Unauthorized", 403)
+
+    pair = (f.user_id, f.friend_id)
+    db.session.delete(f)
+    db.session.commit()
+    invalidate_friend_boards(*pair)
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@bp.route('/followers')
+@login_required
+def followers():
+    # users who follow ME
+    rel_ids = {
+        rel.user_id if rel.friend_id == current_user.id else rel.friend_id: rel.id
+        for rel in friendships(current_user.id)
+    }
+
+    def rows():
+        users = db.session.query(User.id, User.username).filter(
+            User.id.in_(list(rel_ids))
+        ).yield_per(500)
+
+        for user_id, username in users:
+            yield {
+                "rel_id": rel_ids[user_id],
+                "id": user_id,
+                "username": username,
+                # accepted friendships are mutual, so I always follow them back
+                "following_back": True
+            }
+
+    return stream_json(rows())
+
+@bp.route('/follower/remove/<int:rel_id>', methods=['POST'])
+@login_required
+def remove_follower(rel_id):
+    rel = Friend.query.get_or_404(rel_id)
+
+    # only YOU can remove someone who follows YOU
+    if rel.friend_id != current_user.id:
+        return api_error("Unauthorized", 403)
+
+    pair = (rel.user_id, rel.friend_id)
+    db.session.delete(rel)
+    db.session.commit()
+    invalidate_friend_boards(*pair)
+    return api_ok(xp=calculate_xp(current_user.id))
@@ -0,0 +1,202 @@
+from flask import Blueprint, render_template, request
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import ranking
+from helpers import (
+    api_ok, api_error, get_period_range, period_ranges, add_player_stats
+)
+from models import db, User, Group, GroupMember
+
+bp = Blueprint("groups", __name__)
+
+# ---------------- GROUPS ----------------
+# Member boards are the friends/global board restricted to a group, so a
+# page costs the same fixed number of queries for 5 or 5,000 members: one
+# aggregate, one top-100 page, bulk player stats and a keyset neighborhood.
+#
+# Anyone can open a group and join it, but only members see every member;
+# others see the members who show on the global board (User.show_global),
+# like they would there.
+
+PERIODS = ("day", "week", "month")
+
+def request_period():
+    period = request.args.get("period", "week")
+    return period if period in PERIODS else "week"
+
+def members_of(group_id):
+    return select(GroupMember.user_id).where(GroupMember.group_id == group_id)
+
+def member_board_query(group_id, period, global_only=False):
+    tz_names = db.session.query(User.timezone).filter(
+        User.id.in_(members_of(group_id))
+    ).distinct()
+
+    return ranking.score_query(
+        period_ranges([r[0] for r in tz_names], period),
+        user_ids=members_of(group_id),
+        global_only=global_only
+    )
+
+def ranking_ranges(period):
+    tz_names = db.session.query(User.timezone).distinct()
+    return period_ranges([r[0] for r in tz_names], period)
+
+def is_member(group_id):
+    return db.session.query(GroupMember.user_id).filter_by(
+        group_id=group_id,
+        user_id=current_user.id
+    ).first() is not None
+
+@bp.route('/groups')
+@login_required
+def groups():
+    period = request_period()
+    start, end = get_period_range(period)
+
+    mine = Group.query.join(
+        GroupMember, GroupMember.group_id == Group.id
+    ).filter(
+        GroupMember.user_id == current_user.id
+    ).order_by(Group.name).all()
+
+    return render_template(
+        "groups.html",
+        mine=mine,
+        board=ranking.group_board(ranking_ranges(period)),
+        period=period,
+        start=start,
+        end=end
+    )
+
+@bp.route('/groups/<int:group_id>')
+@login_required
+def group_leaderboard(group_id):
+    group = db.get_or_404(Group, group_id)
+    member = is_member(group_id)
+    period = request_period()
+    start, end = get_period_range(period)
+
+    sq = member_board_query(group_id, period, global_only=not member)
+    board = ranking.top(sq, 100)
+    add_player_stats(board)
+
+    my_entry = next(
+        (row for row in board if row["user_id"] == current_user.id), None
+    )
+    around = []
+    if my_entry is None:
+        entry = ranking.entry_for(sq, current_user.id)
+        if entry:
+            around = ranking.neighborhood(sq, entry)
+            add_player_stats(around)
+            my_entry = entry
+
+    summary = ranking.group_board(ranking_ranges(period), group_ids=[group_id], limit=1)
+
+    return render_template(
+        "group.html",
+        group=group,
+        summary=summary[0] if summary else None,
+        member=member,
+        board=board,
+        my_entry=my_entry if around else None,
+        around=around,
+        period=period,
+        start=start,
+        end=end
+    )
+
+@bp.route('/api/groups/ranking')
+@login_required
+def api_group_ranking():
+    period = request_period()
+    start, end = get_period_range(period)
+
+    return api_ok(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        rows=ranking.group_board(ranking_ranges(period))
+    )
+
+@bp.route('/api/groups/<int:group_id>/leaderboard')
+@login_required
+def api_group_leaderboard(group_id):
+    db.get_or_404(Group, group_id)
+    period = request_period()
+    limit = max(1, min(request.args.get("limit", 50, type=int), 100))
+    after = request.args.get("after")
+
+    start, end = get_period_range(period)
+    sq = member_board_query(group_id, period, global_only=not is_member(group_id))
+
+    try:
+        cursor = ranking.decode_cursor(after) if after else None
+    except ValueError:
+        return api_error("Invalid cursor")
+
+    rows = ranking.page_after(sq, cursor, limit)
+    add_player_stats(rows)
+
+    return api_ok(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        rows=rows,
+        next=ranking.encode_cursor(rows[-1]) if len(rows) == limit else None
+    )
+
+@bp.route('/api/groups', methods=['POST'])
+@login_required
+def create_group():
+    data = request.get_json(silent=True) or {}
+    name = (data.get("name") or "").strip()
+
+    if not name or len(name) > 100:
+        return api_error("Group name must be 1-100 characters")
+
+    try:
+        group = Group(name=name, created_by=current_user.id)
+        db.session.add(group)
+        db.session.flush()
+
+        db.session.add(GroupMember(
+            group_id=group.id,
+            user_id=current_user.id,
+            role="owner"
+        ))
+        db.session.commit()
+
+    except IntegrityError:
+        db.session.rollback()
+        return api_error("Group name already taken")
+
+    return api_ok(group_id=group.id, name=group.name)
+
+@bp.route('/api/groups/<int:group_id>/join', methods=['POST'])
+@login_required
+def join_group(group_id):
+    db.get_or_404(Group, group_id)
+
+    try:
+        db.session.add(GroupMember(group_id=group_id, user_id=current_user.id))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return api_error("Already a member")
+
+    return api_ok()
+
+@bp.route('/api/groups/<int:group_id>/leave', methods=['POST'])
+@login_required
+def leave_group(group_id):
+    left = GroupMember.query.filter_by(
+        group_id=group_id,
+        user_id=current_user.id
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    if not left:
+        return api_error("Not a member", 404)
+    return api_ok()
@@ -0,0 +1,41 @@
+import os
+
+# gunicorn -c gunicorn.conf.py
+#
+# The app is built once in the master (preload_app) and forked into workers,
+# which share its imported modules copy-on-write instead of each importing
+# and configuring everything again. The master warms the shared caches
+# before the first fork and every worker warms its own before it takes
+# traffic (see warmup.py); point load-balancer health checks at /ready.
+
+wsgi_app = "app:create_app()"
+preload_app = True
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+def when_ready(server):
+    import warmup
+    from models import db
+
+    app = server.app.wsgi()
+    # forked workers inherit this and report ready once they've warmed up
+    warmup.hold()
+    warmup.warm(app, warmup.SHARED_STEPS)
+
+    # workers must not inherit the connections warm-up opened
+    with app.app_context():
+        db.engine.dispose()
+
+def post_fork(server, worker):
+    import warmup
+    from models import db
+
+    app = server.app.wsgi()
+
+    # connections opened while preloading belong to the master process
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    warmup.warm(app, warmup.WORKER_STEPS, connections=server.cfg.threads)
+    warmup.mark_ready()
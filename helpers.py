@@ -0,0 +1,323 @@
+from datetime import timedelta
+
+from flask import current_app, jsonify
+from flask_login import current_user
+from sqlalchemy import func, or_
+
+import fragments
+import timezones
+from memo import memoize
+from models import db, User, DayPlan, Task, Friend, UserStats
+from rollover import plan_xp
+from streaming import stream_json
+from user_cache import cache as user_cache
+
+# Helpers shared by the route blueprints: JSON envelopes, "today" in the
+# user's timezone, streak/XP/friendship lookups (memoized per request) and
+# leaderboard cache invalidation.
+
+PLAN_SCORE_ATTEMPTS = 5
+
+def update_plan_final_score(plan_id):
+    """Re-sum the plan's completed points; False if it kept racing.
+
+    The write is a compare-and-swap on the plan's version, retried with a
+    fresh read when another transaction re-scored the plan first (under
+    READ COMMITTED a sum read before that commit would miss its task).
+    """
+    for _ in range(PLAN_SCORE_ATTEMPTS):
+        # finalized (past) plans keep the score frozen by the rollover job
+        version = db.session.query(DayPlan.version).filter(
+            DayPlan.id == plan_id,
+            DayPlan.finalized_at.is_(None)
+        ).scalar()
+        if version is None:
+            return True
+
+        score = db.session.query(
+            func.coalesce(func.sum(Task.points), 0)
+        ).filter(
+            Task.dayplan_id == plan_id,
+            Task.status == "completed"
+        ).scalar()
+
+        updated = DayPlan.query.filter(
+            DayPlan.id == plan_id,
+            DayPlan.version == version,
+            DayPlan.finalized_at.is_(None)
+        ).update(
+            {"final_score": score},
+            synchronize_session=False
+        )
+        if updated:
+            return True
+
+    return False
+
+def api_ok(**data):
+    return jsonify({"ok": True, **data})
+
+def stream_ok(**data):
+    # like api_ok, but generator values are streamed as JSON arrays
+    return stream_json({"ok": True, **data})
+
+def api_error(message, status=400):
+    return jsonify({"ok": False, "error": message}), status
+
+def get_task_for_current_user(task_id):
+    return (
+        Task.query
+        .join(DayPlan)
+        .filter(
+            Task.id == task_id,
+            DayPlan.user_id == current_user.id
+        )
+        .first_or_404()
+    )
+
+def is_plan_locked(plan_date):
+    return plan_date <= user_today()
+
+@memoize
+def user_timezone(user_id):
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached.timezone
+    return db.session.query(User.timezone).filter(User.id == user_id).scalar()
+
+def today_for(user_id):
+    return timezones.local_today(user_timezone(user_id))
+
+def user_today():
+    return timezones.local_today(current_user.timezone)
+
+@memoize
+def user_stats(user_id):
+    return db.session.get(UserStats, user_id)
+
+@memoize
+def calculate_streak(user_id):
+    streak = 0
+    d = today_for(user_id)
+
+    # the rollover job already counted the run up to yesterday
+    stats = user_stats(user_id)
+    if stats and stats.as_of == d - timedelta(days=1):
+        p = DayPlan.query.filter_by(user_id=user_id, date=d).first()
+        if not p or p.final_score < 70:
+            return 0
+        return stats.streak + 1
+
+    # the run is the passing days counting back from today without a gap
+    for (day,) in db.session.query(DayPlan.date).filter(
+        DayPlan.user_id == user_id,
+        DayPlan.date <= d,
+        DayPlan.final_score >= 70
+    ).order_by(DayPlan.date.desc()).all():
+        if day != d:
+            break
+        streak += 1
+        d -= timedelta(days=1)
+
+    return streak
+
+def get_week_range(ref=None):
+    ref = ref or user_today()
+    start = ref - timedelta(days=ref.weekday())  # Monday
+    end = start + timedelta(days=6)
+    return start, end
+
+def get_period_range(period, ref=None):
+    today = ref or user_today()
+
+    if period == "day":
+        return today, today
+    if period == "month":
+        return today - timedelta(days=30), today
+    return get_week_range(today)
+
+@memoize
+def weekly_stats(user_id, start, end):
+    plans = DayPlan.query.filter(
+        DayPlan.user_id == user_id,
+        DayPlan.date >= start,
+        DayPlan.date <= end
+    ).all()
+
+    total_score = sum(p.final_score for p in plans)
+    completed_days = len([p for p in plans if p.final_score >= 70])
+
+    return {
+        "score": total_score,
+        "days": completed_days
+    }
+
+@memoize
+def calculate_xp(user_id):
+    # days folded in by the rollover job are summed already
+    # (a plan's score is the sum of its completed points, see
+    # update_plan_final_score)
+    stats = user_stats(user_id)
+    scores = db.session.query(DayPlan.final_score).filter(DayPlan.user_id == user_id)
+    if stats:
+        scores = scores.filter(DayPlan.date > stats.as_of)
+
+    xp = stats.xp if stats else 0
+    xp += sum(plan_xp(score or 0) for (score,) in scores)
+    xp += calculate_streak(user_id) * 5
+    return xp
+
+@memoize
+def friendships(user_id):
+    return Friend.query.filter(
+        Friend.status == "accepted",
+        or_(
+            Friend.user_id == user_id,
+            Friend.friend_id == user_id
+        )
+    ).all()
+
+def friend_ids(user_id):
+    return [
+        f.friend_id if f.user_id == user_id else f.user_id
+        for f in friendships(user_id)
+    ]
+
+def period_ranges(tz_names, period):
+    """[(timezone names, start, end)] for ranking.score_query.
+
+    Users are bucketed by the local date their timezone is on right now, so
+    each bucket becomes one date-range condition on day_plan.
+    """
+    return [
+        (names, *get_period_range(period, local_date))
+        for local_date, names in timezones.group_by_local_date(tz_names).items()
+    ]
+
+def player_stats(user_ids):
+    """{user id: (streak, xp)} as calculate_streak/calculate_xp compute them,
+    in three queries however many users there are (board rows)."""
+    if not user_ids:
+        return {}
+
+    tz_names = dict(db.session.query(User.id, User.timezone).filter(
+        User.id.in_(user_ids)
+    ))
+    stats = {
+        s.user_id: s for s in
+        UserStats.query.filter(UserStats.user_id.in_(user_ids))
+    }
+
+    # only the days the rollover job hasn't folded in yet
+    recent = {}
+    for user_id, d, score in db.session.query(
+        DayPlan.user_id, DayPlan.date, DayPlan.final_score
+    ).outerjoin(
+        UserStats, UserStats.user_id == DayPlan.user_id
+    ).filter(
+        DayPlan.user_id.in_(user_ids),
+        or_(UserStats.as_of.is_(None), DayPlan.date > UserStats.as_of)
+    ):
+        recent.setdefault(user_id, {})[d] = score or 0
+
+    result = {}
+    for user_id in user_ids:
+        s = stats.get(user_id)
+        plans = recent.get(user_id, {})
+
+        streak = 0
+        d = timezones.local_today(tz_names.get(user_id))
+        while plans.get(d, 0) >= 70:
+            streak += 1
+            d -= timedelta(days=1)
+        if s and d == s.as_of:
+            streak += s.streak  # the run continues into folded-in days
+
+        xp = (s.xp if s else 0) + sum(plan_xp(score) for score in plans.values())
+        result[user_id] = (streak, xp + streak * 5)
+
+    return result
+
+def add_player_stats(rows):
+    stats = player_stats([row["user_id"] for row in rows])
+    for row in rows:
+        row["streak"], row["xp"] = stats[row["user_id"]]
+        row["rank"] = get_rank(row["xp"])
+
+def get_rank(xp):
+    if xp >= 3000:
+        return "👑 Legend"
+    if xp >= 1500:
+        return "🔥 Elite"
+    if xp >= 700:
+        return "🧠 Strategist"
+    if xp >= 300:
+        return "⚔️ Warrior"
+    return "🪴 Beginner"
+
+# ---------------- LEADERBOARD CACHE ----------------
+FRIENDS_BOARD_TTL = 300   # invalidated explicitly on friend/score changes
+
+def leaderboard_cache():
+    return current_app.extensions["leaderboard_cache"]
+
+def invalidate_friend_boards(*user_ids):
+    # cached boards plus the template fragments built from friends' progress
+    for user_id in user_ids:
+        leaderboard_cache().invalidate(f"friends-{user_id}-*")
+        fragments.invalidate("friends", user_id)
+        fragments.invalidate("ranking", user_id)
+        fragments.invalidate("board", "friends", user_id)
+
+def scores_changed(user_id):
+    # the user's own board and every board they appear on
+    fragments.invalidate("heatmap", user_id)
+    invalidate_friend_boards(user_id, *friend_ids(user_id))
+
+# ---------------- PAYLOADS ----------------
+def task_payload(t):
+    return {
+        "id": t.id,
+        "plan_id": t.dayplan_id,
+        "title": t.title,
+        "desc": t.description,
+        "start": t.expected_start.strftime("%H:%M") if t.expected_start else None,
+        "end": t.expected_end.strftime("%H:%M") if t.expected_end else None,
+        "status": t.status,
+        "points": t.points,
+        "actual_start": t.actual_start.isoformat() if t.actual_start else None,
+        "actual_end": t.actual_end.isoformat() if t.actual_end else None,
+        "cancel_reason": t.cancel_reason,
+        "cancel_comment": t.cancel_comment,
+        "incomplete_reason": t.incomplete_reason,
+        "version": t.version
+    }
+
+def plan_payload(p):
+    return {
+        "id": p.id,
+        "date": p.date.isoformat(),
+        "final_score": p.final_score,
+        "version": p.version
+    }
+
+def template_payload(t):
+    return {
+        "id": t.id,
+        "weekdays": [d for d in range(7) if t.weekdays and t.weekdays & (1 << d)],
+        "every_days": t.every_days,
+        "starts_on": t.starts_on.isoformat(),
+        "ends_on": t.ends_on.isoformat() if t.ends_on else None,
+        "active": t.active,
+        "tasks": [tk.title for tk in t.tasks]
+    }
+
+def notification_payload(n):
+    return {
+        "id": n.id,
+        "message": n.message,
+        "type": n.type,
+        "related_id": n.related_id,
+        "is_read": n.is_read,
+        "version": n.version
+    }
@@ -0,0 +1,405 @@
+import csv
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dtime
+from functools import partial
+
+import click
+from sqlalchemy import insert
+
+import archive
+from helpers import scores_changed
+from models import db, User, DayPlan, Task, UserStats
+from recurring import insert_plan_ignoring_existing
+from rollover import UNFINISHED, DAY_ENDED, plan_xp
+from tasks import minutes_between
+from timezones import local_today
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+# Bulk import / restore of plan history in the /export format (CSV with task
+# columns, or JSONL with one day per line). The main process splits the file
+# into chunks of whole days; a process pool parses and validates them while
+# the main process writes finished chunks in order, one transaction each:
+# plans via INSERT ... ON CONFLICT (user_id, date) DO NOTHING RETURNING,
+# their tasks as one executemany. Days the user already has (hot or
+# archived) are skipped, so a restore can simply be run again, and a
+# checkpoint file records how many records are committed so an interrupted
+# import resumes after its last chunk.
+
+CHUNK_SIZE = 2000   # records (CSV rows / JSONL lines) per chunk
+WORKERS = os.cpu_count() or 1
+MAX_ERRORS = 100
+STATUSES = ("pending", "active", "completed", "cancelled", "incomplete")
+
+TASK_FIELDS = (
+    "title", "description", "start", "end", "points", "status",
+    "actual_start", "actual_end", "cancel_reason", "cancel_comment",
+    "incomplete_reason"
+)
+CSV_HEADER = ("date", "score") + TASK_FIELDS
+
+# ---------------- FORMAT ----------------
+def task_record(t):
+    """A task as written by /export (and read back by parse_task)."""
+    return {
+        "title": t.title,
+        "description": t.description,
+        "start": t.expected_start.strftime("%H:%M") if t.expected_start else None,
+        "end": t.expected_end.strftime("%H:%M") if t.expected_end else None,
+        "points": t.points,
+        "status": t.status,
+        "actual_start": t.actual_start.isoformat() if t.actual_start else None,
+        "actual_end": t.actual_end.isoformat() if t.actual_end else None,
+        "cancel_reason": t.cancel_reason,
+        "cancel_comment": t.cancel_comment,
+        "incomplete_reason": t.incomplete_reason
+    }
+
+def guess_format(filename):
+    return "jsonl" if filename.endswith((".jsonl", ".ndjson")) else "csv"
+
+# ---------------- PARSING (worker processes) ----------------
+def parse_time(value):
+    return dtime.fromisoformat(value) if value else None
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+def parse_task(raw):
+    title = (raw.get("title") or "").strip()
+    if not title:
+        raise ValueError("task title is required")
+    if len(title) > 100:
+        raise ValueError("task title is longer than 100 characters")
+
+    status = raw.get("status") or "pending"
+    if status not in STATUSES:
+        raise ValueError(f"unknown task status {status!r}")
+
+    points = int(raw.get("points") or 0)
+    if points < 0:
+        raise ValueError("task points must not be negative")
+
+    start, end = parse_time(raw.get("start")), parse_time(raw.get("end"))
+    actual_start = parse_datetime(raw.get("actual_start"))
+    actual_end = parse_datetime(raw.get("actual_end"))
+
+    # the same durations the complete action records
+    planned = actual = None
+    if status == "completed":
+        if start and end:
+            planned = minutes_between(start, end)
+        if actual_start and actual_end:
+            actual = minutes_between(actual_start, actual_end)
+
+    return {
+        "title": title,
+        "description": raw.get("description") or "",
+        "expected_start": start,
+        "expected_end": end,
+        "planned_duration_minutes": planned,
+        "actual_start": actual_start,
+        "actual_end": actual_end,
+        "actual_duration_minutes": actual,
+        "points": points,
+        "status": status,
+        "cancel_reason": raw.get("cancel_reason") or None,
+        "cancel_comment": raw.get("cancel_comment") or None,
+        "incomplete_reason": raw.get("incomplete_reason") or None
+    }
+
+def parse_plan(day, raw_tasks, before=None):
+    # the score column is informational: the stored score is re-summed from
+    # the completed tasks, as update_plan_final_score would
+    day = date.fromisoformat(day)
+    if before and day >= before:
+        raise ValueError(f"{day} is not over yet")
+
+    tasks = [parse_task(t) for t in raw_tasks]
+    if tasks and sum(t["points"] for t in tasks) != 100:
+        raise ValueError("task points must add up to 100")
+    done = [t for t in tasks if t["status"] == "completed"]
+
+    return {
+        "date": day,
+        "final_score": sum(t["points"] for t in done),
+        # frozen summary, used when the day is already over for the user
+        "completion_percent": len(done) * 100 // len(tasks) if tasks else 0,
+        "planned_minutes": sum(t["planned_duration_minutes"] or 0 for t in tasks),
+        "actual_minutes": sum(t["actual_duration_minutes"] or 0 for t in tasks),
+        "tasks": tasks
+    }
+
+def csv_days(records):
+    # consecutive rows of one date are one day; a row without a title is a
+    # day without tasks
+    for day, rows in itertools.groupby(records, key=lambda r: r[1]["date"]):
+        rows = list(rows)
+        yield rows[0][0], (day, [r for _, r in rows if r.get("title")])
+
+def jsonl_day(line):
+    day = orjson.loads(line) if orjson is not None else json.loads(line)
+    return day.get("date"), day.get("tasks") or []
+
+def parse_chunk(fmt, records, before=None):
+    """(plans, errors) for a chunk of (line number, record) pairs.
+
+    A day with any invalid field, or not before `before`, is left out whole.
+    """
+    if fmt == "csv":
+        days, load = csv_days(records), lambda day: day
+    else:
+        days, load = records, jsonl_day
+
+    plans, errors, seen = [], [], set()
+    for line_no, raw in days:
+        try:
+            plan = parse_plan(*load(raw), before=before)
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append(f"line {line_no}: {e}")
+            continue
+
+        if plan["date"] in seen:
+            errors.append(f"line {line_no}: {plan['date']} appears twice")
+            continue
+
+        seen.add(plan["date"])
+        plans.append(plan)
+
+    return plans, errors
+
+# ---------------- READING ----------------
+def read_records(stream, fmt):
+    """(line number, record) pairs: CSV rows as dicts, JSONL lines as text."""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_no, line
+        return
+
+    reader = csv.DictReader(stream)
+    if "date" not in (reader.fieldnames or ()):
+        raise ValueError("CSV header must include date")
+    for row in reader:
+        yield reader.line_num, row
+
+def day_chunks(records, size, fmt):
+    """Lists of about `size` records, cut only between two days."""
+    chunk, last_day = [], None
+    for record in records:
+        day = record[1]["date"] if fmt == "csv" else record[0]
+        if len(chunk) >= size and day != last_day:
+            yield chunk
+            chunk = []
+        chunk.append(record)
+        last_day = day
+
+    if chunk:
+        yield chunk
+
+def parsed_chunks(chunks, fmt, workers, before=None):
+    """(record count, plans, errors) per chunk, in file order."""
+    parse = partial(parse_chunk, fmt, before=before)
+    if workers <= 1:
+        for chunk in chunks:
+            yield (len(chunk), *parse(chunk))
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        # bounded read-ahead: workers stay busy while the caller writes,
+        # without the whole file ending up in memory
+        pending = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(parse, chunk)))
+            if len(pending) >= 2 * workers:
+                n, future = pending.popleft()
+                yield (n, *future.result())
+
+        while pending:
+            n, future = pending.popleft()
+            yield (n, *future.result())
+
+# ---------------- WRITING ----------------
+def existing_days(user_id, days):
+    P = archive.all_plans()
+    return {
+        d for (d,) in db.session.query(P.date).filter(
+            P.user_id == user_id,
+            P.date.in_(days)
+        )
+    }
+
+def write_plans(user_id, plans, today, now):
+    """Insert plans and their tasks; [(plan id, date)] actually created."""
+    rows = []
+    for p in plans:
+        # days already over are stored finalized, as the rollover job would
+        past = p["date"] < today
+        rows.append({
+            "user_id": user_id,
+            "date": p["date"],
+            "final_score": p["final_score"],
+            "finalized_at": now if past else None,
+            "completion_percent": p["completion_percent"] if past else None,
+            "planned_minutes": p["planned_minutes"] if past else None,
+            "actual_minutes": p["actual_minutes"] if past else None
+        })
+
+    created = db.session.execute(
+        insert_plan_ignoring_existing().returning(DayPlan.id, DayPlan.date),
+        rows
+    ).all()
+
+    by_date = {p["date"]: p for p in plans}
+    task_rows = []
+    for plan_id, day in created:
+        for t in by_date[day]["tasks"]:
+            row = {**t, "dayplan_id": plan_id}
+            if day < today and row["status"] in UNFINISHED:
+                row.update(status="incomplete", incomplete_reason=DAY_ENDED)
+            task_rows.append(row)
+
+    if task_rows:
+        db.session.execute(insert(Task), task_rows)
+
+    return created
+
+def fold_into_stats(user_id, scores):
+    # days behind the rollover watermark are never read again by it or by
+    # calculate_xp, so their XP is added to the frozen total here (the frozen
+    # streak is left alone)
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        return
+
+    xp = sum(plan_xp(score) for d, score in scores if d <= stats.as_of)
+    if xp:
+        UserStats.query.filter_by(user_id=user_id).update(
+            {"xp": UserStats.xp + xp},
+            synchronize_session=False
+        )
+
+# ---------------- CHECKPOINTS ----------------
+def load_checkpoint(path, source, user_id):
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("source") != source or state.get("user_id") != user_id:
+        raise ValueError(f"{path} belongs to a different import")
+    return state
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+# ---------------- IMPORT ----------------
+def run(stream, user_id, fmt="csv", dry_run=False, workers=WORKERS,
+        chunk_size=CHUNK_SIZE, checkpoint=None, source=None, echo=None,
+        past_only=False):
+    """Import plan history for one user from a text stream.
+
+    `checkpoint` is a file path that lets an interrupted import of the same
+    `source` resume; dry runs validate and count without writing anything.
+    With `past_only`, days that aren't over for the user are rejected.
+    """
+    tz_name = db.session.query(User.timezone).filter(User.id == user_id).scalar()
+    today = local_today(tz_name)
+    now = datetime.utcnow()
+
+    counts = {"records": 0, "plans": 0, "tasks": 0, "skipped": 0, "errors": 0}
+    if checkpoint and not dry_run:
+        state = load_checkpoint(checkpoint, source, user_id)
+        if state:
+            counts.update((k, state[k]) for k in counts)
+            if echo:
+                echo(f"  resuming after {counts['records']} records")
+    messages = []
+
+    records = itertools.islice(read_records(stream, fmt), counts["records"], None)
+    chunks = parsed_chunks(
+        day_chunks(records, chunk_size, fmt), fmt, workers,
+        before=today if past_only else None
+    )
+
+    for n, plans, errors in chunks:
+        existing = existing_days(user_id, [p["date"] for p in plans]) if plans else set()
+        new = [p for p in plans if p["date"] not in existing]
+
+        if dry_run or not new:
+            created = [(None, p["date"]) for p in new]
+        else:
+            created = write_plans(user_id, new, today, now)
+
+        by_date = {p["date"]: p for p in new}
+        counts["records"] += n
+        counts["plans"] += len(created)
+        counts["tasks"] += sum(len(by_date[d]["tasks"]) for _, d in created)
+        counts["skipped"] += len(plans) - len(created)
+        counts["errors"] += len(errors)
+        messages.extend(errors[:MAX_ERRORS - len(messages)])
+
+        if not dry_run:
+            fold_into_stats(user_id, [(d, by_date[d]["final_score"]) for _, d in created])
+            db.session.commit()
+            if checkpoint:
+                save_checkpoint(checkpoint, {"source": source, "user_id": user_id, **counts})
+
+        if echo:
+            echo(
+                f"  {counts['records']} records: {counts['plans']} plans, "
+                f"{counts['tasks']} tasks, {counts['skipped']} skipped"
+            )
+
+    if checkpoint and not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if counts["plans"] and not dry_run:
+        scores_changed(user_id)
+
+    return {**counts, "messages": messages}
+
+def init_app(app):
+    @app.cli.command("import-plans")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--user", "username", required=True,
+                  help="Username whose history the file is imported into.")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+                  help="Default: from the file extension.")
+    @click.option("--dry-run", is_flag=True, help="Validate and count only.")
+    @click.option("--workers", default=WORKERS, show_default=True)
+    @click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+    @click.option("--checkpoint", type=click.Path(dir_okay=False),
+                  help="Default: PATH.checkpoint")
+    def import_command(path, username, fmt, dry_run, workers, chunk_size, checkpoint):
+        """Import or restore plan history from an /export file."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f"No user named {username!r}")
+
+        with open(path, newline="", encoding="utf-8") as f:
+            try:
+                summary = run(
+                    f, user.id, fmt or guess_format(path), dry_run, workers,
+                    chunk_size, checkpoint or path + ".checkpoint",
+                    source=os.path.abspath(path), echo=click.echo
+                )
+            except ValueError as e:
+                raise click.ClickException(str(e))
+
+        for message in summary["messages"]:
+            click.echo(message, err=True)
+        click.echo(
+            f"{'Would import' if dry_run else 'Imported'} {summary['plans']} plans "
+            f"and {summary['tasks']} tasks; {summary['skipped']} days already "
+            f"existed, {summary['errors']} invalid"
+        )
@@ -0,0 +1,171 @@
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required, current_user
+
+import achievements
+import ranking
+from helpers import (
+    api_error, api_ok, get_period_range, period_ranges, friend_ids,
+    add_player_stats, leaderboard_cache, FRIENDS_BOARD_TTL
+)
+from models import db, User
+from user_cache import cache as user_cache
+
+bp = Blueprint("leaderboard", __name__)
+
+# ---------------- LEADERBOARD ----------------
+def leaderboard_query(scope, period, user_id=None):
+    if scope == "global":
+        user_ids = None
+        tz_names = db.session.query(User.timezone).filter(
+            User.show_global.is_(True)
+        ).distinct()
+    else:
+        user_ids = [user_id] + friend_ids(user_id)
+        tz_names = db.session.query(User.timezone).filter(
+            User.id.in_(user_ids)
+        ).distinct()
+
+    return ranking.score_query(
+        period_ranges([r[0] for r in tz_names], period),
+        user_ids=user_ids, global_only=scope == "global"
+    )
+
+def build_board(scope, period, sq):
+    limit = 100 if scope == "global" else None
+    board = ranking.top(sq, limit)
+    add_player_stats(board)
+
+    earned = achievements.earned_by([row["user_id"] for row in board])
+    for row in board:
+        row["achievements"] = bin(earned.get(row["user_id"], 0)).count("1")
+
+    # ---------------- BADGES ----------------
+    if board:
+        if period == "day":
+            board[0]["badge"] = "🥇 Daily Champion"
+        elif period == "month":
+            board[0]["badge"] = "🏆 Monthly Champion"
+        else:
+            board[0]["badge"] = "🥇 Weekly Champion"
+
+    return board
+
+def cached_board(scope, period, sq, start, end, user_id=None):
+    """The top of the board from the shared cache, built on a miss."""
+    if scope == "global":
+        return leaderboard_cache().get_or_compute(
+            f"global-{period}-{start}-{end}",
+            lambda: build_board(scope, period, sq)
+        )
+    return leaderboard_cache().get_or_compute(
+        f"friends-{user_id}-{period}-{start}-{end}",
+        lambda: build_board(scope, period, sq),
+        ttl=FRIENDS_BOARD_TTL
+    )
+
+@bp.route('/leaderboard')
+@login_required
+def leaderboard():
+    scope = "global" if request.args.get("scope") == "global" else "friends"
+    period = request.args.get("period", "week")
+    if period not in ("day", "week", "month"):
+        period = "week"
+
+    start, end = get_period_range(period)
+    sq = leaderboard_query(scope, period, current_user.id)
+
+    # ---------------- BUILD BOARD (shared cache) ----------------
+    board = cached_board(scope, period, sq, start, end, current_user.id)
+
+    # ---------------- POSITION & SELF ENTRY ----------------
+    my_entry = next(
+        (row for row in board if row["user_id"] == current_user.id), None
+    )
+    around = []
+
+    # rendered rows: one copy per board, plus one per user who is on it
+    if scope == "global":
+        board_fragment = (
+            "board", "global", period, start, end,
+            current_user.id if my_entry else "all"
+        )
+        board_ttl = leaderboard_cache().ttl
+    else:
+        board_fragment = ("board", "friends", current_user.id, period, start, end)
+        board_ttl = FRIENDS_BOARD_TTL
+
+    if my_entry is None and scope == "global":
+        # user NOT in top 100 → rank by COUNT(*) and show neighbours
+        entry = ranking.entry_for(sq, current_user.id)
+        if entry:
+            around = ranking.neighborhood(sq, entry)
+            add_player_stats(around)
+            my_entry = entry
+
+    # user IN board → mark for sticky UX
+    if my_entry and not around:
+        my_entry["is_me"] = True
+
+    return render_template(
+        "leaderboard.html",
+        board=board,
+        board_fragment=board_fragment,
+        board_ttl=board_ttl,
+        my_entry=my_entry if around else None,
+        around=around,
+        start=start,
+        end=end,
+        scope=scope,
+        period=period
+    )
+
+@bp.route('/api/leaderboard')
+@login_required
+def api_leaderboard():
+    scope = request.args.get("scope", "global")
+    period = request.args.get("period", "week")
+    limit = max(1, min(request.args.get("limit", 50, type=int), 100))
+    after = request.args.get("after")
+
+    start, end = get_period_range(period)
+    sq = leaderboard_query(scope, period, current_user.id)
+
+    try:
+        cursor = ranking.decode_cursor(after) if after else None
+    except ValueError:
+        return api_error("Invalid cursor")
+
+    rows = ranking.page_after(sq, cursor, limit)
+
+    me = None
+    around = []
+    entry = ranking.entry_for(sq, current_user.id)
+    if entry:
+        around = ranking.neighborhood(sq, entry)
+        me = entry
+
+    return api_ok(
+        start=start.isoformat(),
+        end=end.isoformat(),
+        rows=rows,
+        next=ranking.encode_cursor(rows[-1]) if len(rows) == limit else None,
+        me=me,
+        around=around
+    )
+
+@bp.route('/privacy/global', methods=['POST'])
+@login_required
+def toggle_global_privacy():
+    data = request.get_json()
+    value = data.get("show_global")
+
+    if value is None:
+        return jsonify(error="Invalid request"), 400
+
+    User.query.filter_by(id=current_user.id).update(
+        {"show_global": bool(value)}
+    )
+    db.session.commit()
+    user_cache.invalidate(current_user.id)
+
+    return jsonify(ok=True, show_global=bool(value))
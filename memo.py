@@ -0,0 +1,39 @@
+from functools import wraps
+
+from flask import g, has_app_context
+from sqlalchemy import event
+
+# Request-scoped memoization for the aggregate helpers (streak, XP, weekly
+# stats, friend lists). Results live on flask.g, so they never outlive the
+# request, and are dropped whenever the session commits or rolls back so a
+# write is always followed by a fresh read.
+
+def memoize(fn):
+    @wraps(fn)
+    def wrapper(*args):
+        if not has_app_context():
+            return fn(*args)
+
+        cache = g.setdefault("_memo", {})
+        key = (fn.__name__, args)
+        if key not in cache:
+            cache[key] = fn(*args)
+        return cache[key]
+
+    wrapper.uncached = fn
+    return wrapper
+
+def invalidate():
+    if has_app_context():
+        g.pop("_memo", None)
+
+def _after_commit(session):
+    invalidate()
+
+def _after_rollback(session, previous_transaction):
+    invalidate()
+
+def init_app(app, db):
+    if not event.contains(db.session, "after_commit", _after_commit):
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_soft_rollback", _after_rollback)
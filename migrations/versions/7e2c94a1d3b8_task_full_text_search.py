@@ -0,0 +1,94 @@
+"""task full text search
+
+Revision ID: 7e2c94a1d3b8
+Revises: 3b7d1e5f0a92
+Create Date: 2026-10-19 11:40:02.530817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c94a1d3b8'
+down_revision = '3b7d1e5f0a92'
+branch_labels = None
+depends_on = None
+
+# SQLite: external-content FTS5 table kept in sync with `task` by triggers.
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE task_fts USING fts5(
+        title, description, cancel_comment, incomplete_reason,
+        content='task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES (new.id, new.title, new.description, new.cancel_comment, new.incomplete_reason);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES ('delete', old.id, old.title, old.description, old.cancel_comment, old.incomplete_reason);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_au AFTER UPDATE OF title, description, cancel_comment, incomplete_reason ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES ('delete', old.id, old.title, old.description, old.cancel_comment, old.incomplete_reason);
+        INSERT INTO task_fts(rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES (new.id, new.title, new.description, new.cancel_comment, new.incomplete_reason);
+    END
+    """,
+    "INSERT INTO task_fts(task_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS task_fts_au",
+    "DROP TRIGGER IF EXISTS task_fts_ad",
+    "DROP TRIGGER IF EXISTS task_fts_ai",
+    "DROP TABLE IF EXISTS task_fts",
+]
+
+# PostgreSQL: generated tsvector column with a GIN index.
+POSTGRES_UPGRADE = [
+    """
+    ALTER TABLE task ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(cancel_comment, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(incomplete_reason, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX idx_task_search ON task USING GIN (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS idx_task_search",
+    "ALTER TABLE task DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    for sql in statements:
+        op.execute(sa.text(sql))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
@@ -0,0 +1,114 @@
+"""reserve plan and task ids
+
+Revision ID: c3e8a5d1f7b2
+Revises: b82d4f6a1e39
+Create Date: 2026-10-20 10:14:41.082193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a5d1f7b2'
+down_revision = 'b82d4f6a1e39'
+branch_labels = None
+depends_on = None
+
+# SQLite hands out max(rowid) + 1 unless a table is AUTOINCREMENT, so once
+# `flask archive` moved the newest rows out, new plans and tasks reused
+# archived ids and all_plans()/all_tasks() returned two rows under one id.
+# PostgreSQL ids come from sequences and never go back.
+#
+# This is the one migration that rewrites existing tables (see backfill.py):
+# SQLite can only turn AUTOINCREMENT on by rebuilding the table, and seeding
+# sqlite_sequence has no effect until it is on. Both rebuilds run in the
+# upgrade's transaction and hold the write lock for as long as copying
+# day_plan and task takes, so on SQLite run it in a maintenance window.
+TABLES = ("day_plan", "task")
+
+# rebuilding `task` drops the FTS triggers from 7e2c94a1d3b8
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES (new.id, new.title, new.description, new.cancel_comment, new.incomplete_reason);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES ('delete', old.id, old.title, old.description, old.cancel_comment, old.incomplete_reason);
+    END
+    """,
+    """
+    CREATE TRIGGER task_fts_au AFTER UPDATE OF title, description, cancel_comment, incomplete_reason ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES ('delete', old.id, old.title, old.description, old.cancel_comment, old.incomplete_reason);
+        INSERT INTO task_fts(rowid, title, description, cancel_comment, incomplete_reason)
+        VALUES (new.id, new.title, new.description, new.cancel_comment, new.incomplete_reason);
+    END
+    """,
+]
+
+
+def _rebuild(autoincrement):
+    bind = op.get_bind()
+    has_fts = bind.execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_fts'"
+    )).first() is not None
+
+    for table in TABLES:
+        with op.batch_alter_table(
+            table, recreate='always',
+            table_kwargs={'sqlite_autoincrement': autoincrement}
+        ):
+            pass
+
+    if has_fts:
+        for sql in FTS_TRIGGERS:
+            op.execute(sa.text(sql))
+
+
+def _archived_max_ids():
+    bind = op.get_bind()
+    attached = {row[1] for row in bind.execute(sa.text("PRAGMA database_list"))}
+    if 'archive' not in attached:
+        return {}
+
+    found = {}
+    for table in TABLES:
+        exists = bind.execute(sa.text(
+            "SELECT 1 FROM archive.sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": table}).first()
+        if exists:
+            found[table] = bind.execute(
+                sa.text(f"SELECT max(id) FROM archive.{table}")
+            ).scalar()
+    return found
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    _rebuild(True)
+
+    # start the sequences past every id handed out so far, archived ones too
+    bind = op.get_bind()
+    for table, max_id in _archived_max_ids().items():
+        if max_id is None:
+            continue
+        bind.execute(sa.text("DELETE FROM main.sqlite_sequence WHERE name = :name"),
+                     {"name": table})
+        bind.execute(sa.text(
+            f"INSERT INTO main.sqlite_sequence (name, seq) "
+            f"SELECT :name, max(coalesce((SELECT max(id) FROM main.{table}), 0), :seq)"
+        ), {"name": table, "seq": max_id})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    _rebuild(False)
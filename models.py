@@ -1,19 +1,41 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import literal_column
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Change tracking for offline sync: every write stamps updated_at and bumps
+# version, including bulk Query.update() calls (onupdate applies to those too).
+def updated_at_column():
+    return db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def version_column():
+    return db.Column(
+        db.Integer, nullable=False, default=1, server_default="1",
+        onupdate=literal_column("version + 1")
+    )
+
+def _casefold_username(context):
+    return context.get_current_parameters()["username"].casefold()
+
 # ---------------- USER ----------------
 class User(UserMixin, db.Model):
     __tablename__ = "user"
+    __table_args__ = (
+        db.Index("idx_user_timezone", "timezone"),
+        db.Index("idx_user_username_lower", "username_lower"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
+    # case-folded copy for indexed prefix search (typeahead)
+    username_lower = db.Column(db.String(50), default=_casefold_username)
     password_hash = db.Column(db.String(200), nullable=False)
 
     show_global = db.Column(db.Boolean, default=True)
+    timezone = db.Column(db.String(64))   # IANA name; NULL = server local
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -28,6 +50,9 @@ class DayPlan(db.Model):
     __table_args__ = (
         db.UniqueConstraint("user_id", "date", name="uq_user_day"),
         db.Index("idx_dayplan_user_date", "user_id", "date"),
+        db.Index("idx_dayplan_user_updated", "user_id", "updated_at"),
+        # never reuse ids of archived plans (see archive.py)
+        {"sqlite_autoincrement": True},
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -35,10 +60,38 @@ class DayPlan(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     final_score = db.Column(db.Integer, default=0)
 
+    updated_at = updated_at_column()
+    version = version_column()
+
+    # frozen by the day-rollover job once the date has passed
+    finalized_at = db.Column(db.DateTime)
+    completion_percent = db.Column(db.Integer)
+    planned_minutes = db.Column(db.Integer)
+    actual_minutes = db.Column(db.Integer)
+
+    tasks = db.relationship(
+        "Task", backref="dayplan", lazy="select", order_by="Task.expected_start"
+    )
+
+
+# ---------------- USER STATS ----------------
+class UserStats(db.Model):
+    __tablename__ = "user_stats"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    as_of = db.Column(db.Date, nullable=False)   # last day folded in
+    streak = db.Column(db.Integer, nullable=False, default=0)   # run ending on as_of
+    xp = db.Column(db.Integer, nullable=False, default=0)       # day XP up to as_of, no streak bonus
+
 
 # ---------------- TASK ----------------
 class Task(db.Model):
     __tablename__ = "task"
+    __table_args__ = (
+        db.Index("idx_task_dayplan", "dayplan_id"),
+        db.Index("idx_task_updated", "updated_at"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     dayplan_id = db.Column(db.Integer, db.ForeignKey("day_plan.id"), nullable=False)
@@ -63,6 +116,81 @@ class Task(db.Model):
 
     incomplete_reason = db.Column(db.String(1000))
 
+    updated_at = updated_at_column()
+    version = version_column()
+
+
+# ---------------- ACHIEVEMENTS ----------------
+# Running counters and high-water marks the rules in achievements.py read,
+# plus one bit per earned rule; updated once per event, never by rescanning.
+class AchievementProgress(db.Model):
+    __tablename__ = "achievement_progress"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+
+    best_streak = db.Column(db.Integer, nullable=False, default=0)
+    perfect_days = db.Column(db.Integer, nullable=False, default=0)
+    punctual_tasks = db.Column(db.Integer, nullable=False, default=0)
+    xp = db.Column(db.Integer, nullable=False, default=0)
+
+    earned = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = updated_at_column()
+    version = version_column()
+
+
+# ---------------- PLAN TEMPLATE ----------------
+# A recurring task list. Matching dates get a concrete DayPlan + Tasks copied
+# from it (see recurring.py); the template itself is never read by the
+# dashboard or scoring.
+class PlanTemplate(db.Model):
+    __tablename__ = "plan_template"
+    __table_args__ = (
+        db.Index("idx_template_user_active", "user_id", "active"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+    # recurrence: a weekday bitmask (Monday = 1) or every N days from starts_on
+    weekdays = db.Column(db.Integer)
+    every_days = db.Column(db.Integer)
+    starts_on = db.Column(db.Date, nullable=False)
+    ends_on = db.Column(db.Date)
+
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    tasks = db.relationship(
+        "PlanTemplateTask",
+        order_by="PlanTemplateTask.expected_start",
+        cascade="all, delete-orphan"
+    )
+
+    def matches(self, day):
+        if day < self.starts_on or (self.ends_on and day > self.ends_on):
+            return False
+        if self.weekdays:
+            return bool(self.weekdays & (1 << day.weekday()))
+        if self.every_days:
+            return (day - self.starts_on).days % self.every_days == 0
+        return False
+
+class PlanTemplateTask(db.Model):
+    __tablename__ = "plan_template_task"
+    __table_args__ = (
+        db.Index("idx_template_task_template", "template_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey("plan_template.id"), nullable=False)
+
+    title = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    expected_start = db.Column(db.Time)
+    expected_end = db.Column(db.Time)
+    points = db.Column(db.Integer)
+
 
 # ---------------- FRIEND ----------------
 class Friend(db.Model):
@@ -77,9 +205,46 @@ class Friend(db.Model):
     status = db.Column(db.String(20), default="pending")  # pending / accepted
 
 
+# ---------------- GROUP ----------------
+class Group(db.Model):
+    __tablename__ = "group"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GroupMember(db.Model):
+    __tablename__ = "group_member"
+    __table_args__ = (
+        db.Index("idx_group_member_user", "user_id"),
+    )
+
+    group_id = db.Column(db.Integer, db.ForeignKey("group.id"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    role = db.Column(db.String(20), nullable=False, default="member")  # owner / member
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------- FRIEND SUGGESTION ----------------
+class FriendSuggestion(db.Model):
+    __tablename__ = "friend_suggestion"
+    __table_args__ = (
+        db.Index("idx_suggestion_user_score", "user_id", "score"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    candidate_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    mutual = db.Column(db.Integer, nullable=False)   # accepted friends in common
+    score = db.Column(db.Integer, nullable=False)
+
+
 # ---------------- NOTIFICATION ----------------
 class Notification(db.Model):
     __tablename__ = "notification"
+    __table_args__ = (
+        db.Index("idx_notification_user_updated", "user_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -89,3 +254,36 @@ class Notification(db.Model):
     related_id = db.Column(db.Integer)       # Friend.id
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    updated_at = updated_at_column()
+    version = version_column()
+
+
+# ---------------- SYNC TOMBSTONE ----------------
+# A task or plan that left the synced tables (deleted, or moved to the
+# archive), kept so /api/sync can tell clients to drop it (see sync.py).
+class SyncTombstone(db.Model):
+    __tablename__ = "sync_tombstone"
+    __table_args__ = (
+        db.Index("idx_tombstone_user_deleted", "user_id", "deleted_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)     # task / plan
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# ---------------- BACKFILL ----------------
+# Checkpoint of one backfill job (see backfill.py); advanced in the same
+# transaction as the chunk it records.
+class BackfillState(db.Model):
+    __tablename__ = "backfill_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_key = db.Column(db.Integer, nullable=False, default=0)   # highest key done
+    rows = db.Column(db.Integer, nullable=False, default=0)       # keys visited
+    changed = db.Column(db.Integer, nullable=False, default=0)    # rows written
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
@@ -0,0 +1,185 @@
+from sqlalchemy import func, case, and_, or_, false, distinct
+
+from models import db, User, DayPlan, UserStats, Group, GroupMember
+
+# Board order: score, then completed days, then lowest user id wins ties.
+# Every row has a unique (score, days, user_id) key, so that key doubles as
+# a keyset cursor and as the basis for COUNT(*)-style rank lookups.
+
+NEIGHBORHOOD = 5
+
+def timezone_in(names):
+    clauses = []
+    named = [n for n in names if n]
+    if named:
+        clauses.append(User.timezone.in_(named))
+    if len(named) < len(names):
+        clauses.append(User.timezone.is_(None))
+    return or_(*clauses)
+
+def in_range(ranges):
+    return or_(false(), *(
+        and_(timezone_in(names), DayPlan.date >= start, DayPlan.date <= end)
+        for names, start, end in ranges
+    ))
+
+def completed_day():
+    return case((DayPlan.final_score >= 70, 1), else_=0)
+
+def score_query(ranges, user_ids=None, global_only=False):
+    """Aggregate scores per user.
+
+    `ranges` is [(timezone names, start, end)]: users in those timezones
+    are scored over day plans dated start..end.
+    """
+    q = db.session.query(
+        User.id.label("user_id"),
+        User.username.label("name"),
+        func.coalesce(func.sum(DayPlan.final_score), 0).label("score"),
+        func.coalesce(func.sum(completed_day()), 0).label("days")
+    ).outerjoin(
+        DayPlan,
+        and_(DayPlan.user_id == User.id, in_range(ranges))
+    )
+
+    if global_only:
+        q = q.filter(User.show_global.is_(True))
+    if user_ids is not None:
+        q = q.filter(User.id.in_(user_ids))
+
+    return q.group_by(User.id, User.username).subquery()
+
+def _ahead_of(sq, score, days, user_id):
+    return or_(
+        sq.c.score > score,
+        and_(sq.c.score == score, sq.c.days > days),
+        and_(sq.c.score == score, sq.c.days == days, sq.c.user_id < user_id)
+    )
+
+def _behind(sq, score, days, user_id):
+    return or_(
+        sq.c.score < score,
+        and_(sq.c.score == score, sq.c.days < days),
+        and_(sq.c.score == score, sq.c.days == days, sq.c.user_id > user_id)
+    )
+
+def _row(r):
+    return {
+        "user_id": r.user_id,
+        "name": r.name,
+        "score": int(r.score),
+        "days": int(r.days)
+    }
+
+def encode_cursor(row):
+    return f"{row['score']}:{row['days']}:{row['user_id']}"
+
+def decode_cursor(cursor):
+    score, days, user_id = (int(x) for x in cursor.split(":"))
+    return score, days, user_id
+
+def entry_for(sq, user_id):
+    r = db.session.query(sq).filter(sq.c.user_id == user_id).first()
+    return _row(r) if r else None
+
+def position_of(sq, entry):
+    ahead = db.session.query(func.count()).select_from(sq).filter(
+        _ahead_of(sq, entry["score"], entry["days"], entry["user_id"])
+    ).scalar()
+    return ahead + 1
+
+def page_after(sq, cursor=None, limit=100):
+    q = db.session.query(sq)
+    if cursor:
+        q = q.filter(_behind(sq, *cursor))
+
+    rows = q.order_by(
+        sq.c.score.desc(), sq.c.days.desc(), sq.c.user_id.asc()
+    ).limit(limit).all()
+    return [_row(r) for r in rows]
+
+def page_before(sq, cursor, limit):
+    rows = db.session.query(sq).filter(
+        _ahead_of(sq, *cursor)
+    ).order_by(
+        sq.c.score.asc(), sq.c.days.asc(), sq.c.user_id.desc()
+    ).limit(limit).all()
+    return [_row(r) for r in reversed(rows)]
+
+def top(sq, limit=100):
+    board = page_after(sq, limit=limit)
+    for idx, row in enumerate(board):
+        row["position"] = idx + 1
+    return board
+
+def neighborhood(sq, entry, radius=NEIGHBORHOOD):
+    """Rows around `entry` (itself included), with positions filled in."""
+    position = position_of(sq, entry)
+    cursor = (entry["score"], entry["days"], entry["user_id"])
+
+    above = page_before(sq, cursor, radius)
+    below = page_after(sq, cursor, radius)
+
+    rows = above + [entry] + below
+    first = position - len(above)
+    for idx, row in enumerate(rows):
+        row["position"] = first + idx
+    return rows
+
+# ---------------- GROUPS ----------------
+# Groups are ranked by average member score, so department size doesn't
+# decide the order. Scores are summed over members in one GROUP BY; XP and
+# active streaks come from the rollover job's UserStats rollup (as of
+# yesterday) rather than per-member calculations.
+def group_board(ranges, group_ids=None, limit=100):
+    plans = db.session.query(
+        GroupMember.group_id.label("group_id"),
+        func.count(distinct(GroupMember.user_id)).label("members"),
+        func.coalesce(func.sum(DayPlan.final_score), 0).label("score"),
+        func.coalesce(func.sum(completed_day()), 0).label("days")
+    ).join(
+        User, User.id == GroupMember.user_id
+    ).outerjoin(
+        DayPlan,
+        and_(DayPlan.user_id == User.id, in_range(ranges))
+    )
+    if group_ids is not None:
+        plans = plans.filter(GroupMember.group_id.in_(group_ids))
+    plans = plans.group_by(GroupMember.group_id).subquery()
+
+    stats = db.session.query(
+        GroupMember.group_id.label("group_id"),
+        func.sum(UserStats.xp).label("xp"),
+        func.sum(case((UserStats.streak > 0, 1), else_=0)).label("active_streaks")
+    ).join(
+        UserStats, UserStats.user_id == GroupMember.user_id
+    ).group_by(GroupMember.group_id).subquery()
+
+    avg_score = plans.c.score / plans.c.members
+    rows = db.session.query(
+        Group.id, Group.name, plans.c.members, plans.c.score, plans.c.days,
+        avg_score.label("avg_score"),
+        func.coalesce(stats.c.xp, 0).label("xp"),
+        func.coalesce(stats.c.active_streaks, 0).label("active_streaks")
+    ).join(
+        plans, plans.c.group_id == Group.id
+    ).outerjoin(
+        stats, stats.c.group_id == Group.id
+    ).order_by(
+        avg_score.desc(), plans.c.score.desc(), Group.id.asc()
+    ).limit(limit).all()
+
+    return [
+        {
+            "group_id": r.id,
+            "name": r.name,
+            "members": r.members,
+            "score": int(r.score),
+            "avg_score": int(r.avg_score),
+            "days": int(r.days),
+            "xp": int(r.xp),
+            "active_streaks": int(r.active_streaks),
+            "position": idx + 1
+        }
+        for idx, r in enumerate(rows)
+    ]
@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+import click
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from models import db, User, DayPlan, Task, PlanTemplate
+from ranking import timezone_in
+from timezones import group_by_local_date
+
+# Recurring plans. A PlanTemplate only turns into DayPlan/Task rows for a
+# concrete date, either ahead of time by the nightly `flask materialize`
+# job (bulk inserts per user chunk) or when the dashboard finds no plan for
+# today. Both paths insert the plan with ON CONFLICT (user_id, date) DO
+# NOTHING ... RETURNING, and copy tasks only into plans they created, so
+# concurrent workers and re-runs never produce a second plan for a day.
+
+CHUNK_SIZE = 500
+DAYS_AHEAD = 1
+
+def insert_plan_ignoring_existing():
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    return dialect_insert(DayPlan).on_conflict_do_nothing(
+        index_elements=["user_id", "date"]
+    )
+
+def pick_templates(user_ids, day):
+    """{user id: its newest active template that recurs on `day`}."""
+    templates = PlanTemplate.query.options(
+        selectinload(PlanTemplate.tasks)
+    ).filter(
+        PlanTemplate.user_id.in_(user_ids),
+        PlanTemplate.active.is_(True),
+        PlanTemplate.starts_on <= day
+    ).order_by(PlanTemplate.id.desc()).all()
+
+    chosen = {}
+    for t in templates:
+        if t.user_id not in chosen and t.matches(day):
+            chosen[t.user_id] = t
+    return chosen
+
+def materialize(user_ids, day):
+    """Create `day`'s plan from templates where missing; caller commits."""
+    chosen = pick_templates(user_ids, day)
+    if not chosen:
+        return 0
+
+    created = db.session.execute(
+        insert_plan_ignoring_existing().returning(DayPlan.id, DayPlan.user_id),
+        [{"user_id": user_id, "date": day, "final_score": 0} for user_id in chosen]
+    ).all()
+
+    task_rows = [
+        {
+            "dayplan_id": plan_id,
+            "title": t.title,
+            "description": t.description,
+            "expected_start": t.expected_start,
+            "expected_end": t.expected_end,
+            "points": t.points,
+            "status": "pending"
+        }
+        for plan_id, user_id in created
+        for t in chosen[user_id].tasks
+    ]
+    if task_rows:
+        db.session.execute(insert(Task), task_rows)
+
+    return len(created)
+
+def materialize_for(user_id, day):
+    """Lazy path for a single user's first read of `day`."""
+    created = materialize([user_id], day)
+    db.session.commit()
+    return created
+
+def next_user_chunk(tz_names, after_id, size):
+    return [
+        r[0] for r in db.session.query(PlanTemplate.user_id).join(
+            User, User.id == PlanTemplate.user_id
+        ).filter(
+            timezone_in(tz_names),
+            PlanTemplate.active.is_(True),
+            PlanTemplate.user_id > after_id
+        ).distinct().order_by(PlanTemplate.user_id).limit(size)
+    ]
+
+def run(days_ahead=DAYS_AHEAD, chunk_size=CHUNK_SIZE, echo=None):
+    """Materialize each user's local today through today + days_ahead."""
+    tz_names = [
+        r[0] for r in db.session.query(User.timezone).join(
+            PlanTemplate, PlanTemplate.user_id == User.id
+        ).filter(PlanTemplate.active.is_(True)).distinct()
+    ]
+
+    created = 0
+    for local_today, names in group_by_local_date(tz_names).items():
+        for offset in range(days_ahead + 1):
+            day = local_today + timedelta(days=offset)
+
+            last_id = 0
+            while True:
+                chunk = next_user_chunk(names, last_id, chunk_size)
+                if not chunk:
+                    break
+
+                created += materialize(chunk, day)
+                db.session.commit()
+
+                last_id = chunk[-1]
+                if echo:
+                    echo(f"  {day}: through user {last_id}, {created} plans created")
+
+    return created
+
+def init_app(app):
+    @app.cli.command("materialize")
+    @click.option("--days-ahead", default=DAYS_AHEAD, show_default=True)
+    @click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+    def materialize_command(days_ahead, chunk_size):
+        """Create upcoming plans from recurring plan templates."""
+        created = run(days_ahead, chunk_size, echo=click.echo)
+        click.echo(f"Created {created} plans from templates")
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import case, func, select, update
+
+from models import db, User, DayPlan, Task, UserStats
+from ranking import timezone_in
+from timezones import group_by_local_date
+
+# Nightly job (run it hourly once users span timezones): every plan whose
+# date has passed in its owner's timezone is finalized once. Unfinished
+# tasks become incomplete, the score and yesterday-summary numbers are frozen
+# on the plan, and per-user streak/XP stats are advanced past it. Users are
+# processed in keyset chunks, each in its own transaction.
+
+CHUNK_SIZE = 500
+UNFINISHED = ("pending", "active")
+DAY_ENDED = "Day ended"
+
+def plan_xp(score):
+    return score // 10 * 10 + (50 if score >= 70 else 0)
+
+def next_user_chunk(today, tz_names, after_id, size):
+    return [
+        r[0] for r in db.session.query(DayPlan.user_id).join(
+            User, User.id == DayPlan.user_id
+        ).filter(
+            timezone_in(tz_names),
+            DayPlan.date < today,
+            DayPlan.finalized_at.is_(None),
+            DayPlan.user_id > after_id
+        ).distinct().order_by(DayPlan.user_id).limit(size)
+    ]
+
+def finalize_plans(user_ids, today, now):
+    open_plans = select(DayPlan.id).where(
+        DayPlan.user_id.in_(user_ids),
+        DayPlan.date < today,
+        DayPlan.finalized_at.is_(None)
+    )
+
+    db.session.execute(
+        update(Task).where(
+            Task.dayplan_id.in_(open_plans),
+            Task.status.in_(UNFINISHED)
+        ).values(status="incomplete", incomplete_reason=DAY_ENDED),
+        execution_options={"synchronize_session": False}
+    )
+
+    def task_total(expr, *where):
+        return select(func.coalesce(func.sum(expr), 0)).where(
+            Task.dayplan_id == DayPlan.id, *where
+        ).scalar_subquery()
+
+    done = select(func.count()).where(
+        Task.dayplan_id == DayPlan.id, Task.status == "completed"
+    ).scalar_subquery()
+    total = select(func.count()).where(
+        Task.dayplan_id == DayPlan.id
+    ).scalar_subquery()
+
+    result = db.session.execute(
+        update(DayPlan).where(
+            DayPlan.user_id.in_(user_ids),
+            DayPlan.date < today,
+            DayPlan.finalized_at.is_(None)
+        ).values(
+            final_score=task_total(Task.points, Task.status == "completed"),
+            planned_minutes=task_total(Task.planned_duration_minutes),
+            actual_minutes=task_total(Task.actual_duration_minutes),
+            completion_percent=case((total > 0, done * 100 // total), else_=0),
+            finalized_at=now
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    return result.rowcount
+
+def advance_stats(user_ids, through):
+    stats = {
+        s.user_id: s for s in
+        UserStats.query.filter(UserStats.user_id.in_(user_ids)).all()
+    }
+
+    plans = db.session.query(
+        DayPlan.user_id, DayPlan.date, DayPlan.final_score
+    ).filter(
+        DayPlan.user_id.in_(user_ids),
+        DayPlan.date <= through
+    )
+    known = [s.as_of for s in stats.values()]
+    if known and len(known) == len(user_ids):
+        plans = plans.filter(DayPlan.date > min(known))
+
+    by_user = {}
+    for user_id, d, score in plans.order_by(DayPlan.user_id, DayPlan.date):
+        by_user.setdefault(user_id, []).append((d, score or 0))
+
+    for user_id in user_ids:
+        s = stats.get(user_id)
+        if s is not None and s.as_of >= through:
+            continue
+        if s is None:
+            s = UserStats(user_id=user_id, as_of=None, streak=0, xp=0)
+            db.session.add(s)
+
+        last = s.as_of
+        for d, score in by_user.get(user_id, []):
+            if last is not None and d <= last:
+                continue
+            if last is None or d - last > timedelta(days=1):
+                s.streak = 0  # a day without a plan breaks the run
+            s.streak = s.streak + 1 if score >= 70 else 0
+            s.xp += plan_xp(score)
+            last = d
+
+        if last is None or last < through:
+            s.streak = 0
+        s.as_of = through
+
+def run(today=None, chunk_size=CHUNK_SIZE, echo=None):
+    """Roll over every timezone whose local date is past the plans.
+
+    `today` overrides the local date for all users (backfills, tests).
+    """
+    now = datetime.utcnow()
+    tz_names = [r[0] for r in db.session.query(User.timezone).distinct()]
+
+    if today:
+        groups = {today: tz_names}
+    else:
+        groups = group_by_local_date(tz_names)
+
+    users = plans = 0
+    for local_today, names in groups.items():
+        through = local_today - timedelta(days=1)
+
+        last_id = 0
+        while True:
+            chunk = next_user_chunk(local_today, names, last_id, chunk_size)
+            if not chunk:
+                break
+
+            plans += finalize_plans(chunk, local_today, now)
+            advance_stats(chunk, through)
+            db.session.commit()
+
+            users += len(chunk)
+            last_id = chunk[-1]
+            if echo:
+                echo(f"  {users} users, {plans} plans finalized")
+
+    return users, plans
+
+def init_app(app):
+    @app.cli.command("rollover")
+    @click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+    def rollover_command(chunk_size):
+        """Finalize past plans and freeze scores, summaries and stats."""
+        users, plans = run(chunk_size=chunk_size, echo=click.echo)
+        click.echo(f"Rolled over {plans} plans for {users} users")
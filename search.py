@@ -0,0 +1,63 @@
+import re
+
+from sqlalchemy import text
+
+from models import db
+
+# The index itself (FTS5 table on SQLite, tsvector + GIN on PostgreSQL) is
+# created by migration 7e2c94a1d3b8 and maintained by the database.
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_SEARCH = text("""
+    SELECT task.id AS id, day_plan.date AS date, bm25(task_fts, 10.0, 5.0, 2.0, 2.0) AS rank
+    FROM task_fts
+    JOIN task ON task.id = task_fts.rowid
+    JOIN day_plan ON day_plan.id = task.dayplan_id
+    WHERE task_fts MATCH :query AND day_plan.user_id = :user_id
+    ORDER BY rank, task.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+POSTGRES_SEARCH = text("""
+    SELECT task.id AS id, day_plan.date AS date,
+           ts_rank(task.search_vector, query) AS rank
+    FROM task
+    JOIN day_plan ON day_plan.id = task.dayplan_id,
+         to_tsquery('simple', :query) AS query
+    WHERE task.search_vector @@ query AND day_plan.user_id = :user_id
+    ORDER BY rank DESC, task.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+def tokens(q):
+    return TOKEN_RE.findall(q or "")[:10]
+
+def build_query(words, dialect):
+    # Every word must match; the last one as a prefix so typing "repo"
+    # already finds "report". Words are quoted so user input can never be
+    # parsed as query syntax.
+    if dialect == "postgresql":
+        parts = [w.lower() for w in words]
+        parts[-1] += ":*"
+        return " & ".join(parts)
+
+    parts = [f'"{w}"' for w in words]
+    parts[-1] += "*"
+    return " AND ".join(parts)
+
+def search_tasks(user_id, q, limit=20, offset=0):
+    """Return [(task_id, date, rank)] best match first, or [] for empty input."""
+    words = tokens(q)
+    if not words:
+        return []
+
+    dialect = db.engine.dialect.name
+    stmt = POSTGRES_SEARCH if dialect == "postgresql" else SQLITE_SEARCH
+
+    return db.session.execute(stmt, {
+        "query": build_query(words, dialect),
+        "user_id": user_id,
+        "limit": limit,
+        "offset": offset
+    }).all()
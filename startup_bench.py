@@ -0,0 +1,96 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup benchmark: import cost (python -X importtime), cold start
+# (fresh interpreter -> create_app()) and worker spawn (fork of a preloaded
+# app -> first response, against building the app inside the worker).
+#
+#   python startup_bench.py --runs 5
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+COLD_START = (
+    "import time; t = time.perf_counter(); "
+    "from app import create_app; create_app(); "
+    "print(time.perf_counter() - t)"
+)
+
+def import_times(top):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+
+    total = sum(r[1] for r in rows)
+    return total, sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+def cold_start(runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_START],
+            cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout
+        times.append(float(out.strip().splitlines()[-1]))
+    return times
+
+def first_response(app):
+    if app is None:
+        from app import create_app
+        app = create_app()
+
+    with app.test_client() as client:
+        client.get("/login")
+
+def worker_spawn(runs, preload):
+    app = None
+    if preload:
+        from app import create_app
+        app = create_app()
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            first_response(app)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        times.append(time.perf_counter() - start)
+    return times
+
+def ms(values):
+    return f"median {statistics.median(values) * 1000:7.1f} ms   max {max(values) * 1000:7.1f} ms"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+
+    total, slowest = import_times(args.top)
+    print(f"imports: {total / 1000:.1f} ms total self time; slowest modules:")
+    for cumulative, self_us, name in slowest:
+        print(f"  {self_us / 1000:7.1f} ms self  {cumulative / 1000:7.1f} ms cumulative  {name}")
+
+    print(f"cold start (import + create_app):  {ms(cold_start(args.runs))}")
+    if hasattr(os, "fork"):
+        # without preload first: the parent must not have imported the app yet
+        print(f"worker spawn, app built in worker: {ms(worker_spawn(args.runs, False))}")
+        print(f"worker spawn, preload_app:         {ms(worker_spawn(args.runs, True))}")
+
+if __name__ == "__main__":
+    main()
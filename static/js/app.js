@@ -93,33 +93,116 @@ function openCancel(id) {
   openModal("cancelModal");
 }
 
-/* CONFIRM ACTIONS */
+/* OFFLINE QUEUE */
 
-function confirmStart() {
-  fetch(`/task/start/${currentTask}`, {
+const SYNC_QUEUE_KEY = "syncQueue";
+
+function localTimestamp(hhmm) {
+  const d = new Date();
+  const pad = n => String(n).padStart(2, "0");
+  const day = `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+  return `${day}T${hhmm || `${pad(d.getHours())}:${pad(d.getMinutes())}`}`;
+}
+
+function readSyncQueue() {
+  return JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY) || "[]");
+}
+
+function queueAction(op) {
+  const queue = readSyncQueue();
+  queue.push(op);
+  localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(queue));
+}
+
+let syncing = false;
+
+function flushSyncQueue() {
+  const sent = readSyncQueue();
+  if (!sent.length || syncing) return;
+  syncing = true;
+
+  fetch("/api/sync", {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
       "X-CSRFToken": csrfToken
     },
-    body: JSON.stringify({ time: startTime.value })
-  }).then(() => {
-    closeAll();
-    loadDashboard();
-  });
+    body: JSON.stringify({ actions: sent })
+  })
+    .then(r => r.json().then(d => ({ status: r.status, d })))
+    .then(({ status, d }) => {
+      // actions queued while this request was out come after the sent ones
+      const queued = readSyncQueue().slice(sent.length);
+      let keep = sent;
+
+      if (d.ok) {
+        // applied and rejected actions are done; conflicts are retried
+        keep = sent.filter((op, i) => d.results[i].status === "conflict");
+        d.results
+          .filter(r => r.status === "rejected")
+          .forEach(r => showToast(`⚠ Offline ${sent[r.index].action} not synced: ${r.error}`));
+        if (d.applied) showToast("🔄 Offline changes synced");
+      } else if (status === 400) {
+        // a malformed batch never applies as a whole
+        keep = [];
+        showToast(`⚠ ${sent.length} offline changes not synced: ${d.error}`);
+      }
+
+      localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(keep.concat(queued)));
+      if (document.getElementById("taskList")) loadDashboard();
+    })
+    .catch(() => {})
+    .finally(() => { syncing = false; });
 }
 
-function confirmComplete() {
-  fetch(`/task/complete/${currentTask}`, {
+window.addEventListener("online", flushSyncQueue);
+// conflicts and actions left from an earlier visit go out on the next load
+if (navigator.onLine) flushSyncQueue();
+
+function postTaskAction(action, body) {
+  const id = currentTask;
+
+  return fetch(`/task/${action}/${id}`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
       "X-CSRFToken": csrfToken
     },
-    body: JSON.stringify({ time: completeTime.value })
-  })
-    .then(r => r.json())
+    body: JSON.stringify(body)
+  }).then(r => {
+    // another tab or a double tap got there first; the reload shows the result
+    if (r.status === 409) showToast("⚠ Task was already updated");
+    if (r.ok) {
+      r.clone().json().then(d => (d.badges || []).forEach(b => showToast(`New badge: ${b}`)));
+    }
+    return r;
+  }).catch(() => {
+    const op = { id, action, ...body };
+    if (body.time) op.at = localTimestamp(body.time);
+    queueAction(op);
+    showToast("📴 Saved offline");
+    return null;
+  });
+}
+
+/* CONFIRM ACTIONS */
+
+function confirmStart() {
+  postTaskAction("start", { time: startTime.value }).then(() => {
+    closeAll();
+    loadDashboard();
+  });
+}
+
+function confirmComplete() {
+  postTaskAction("complete", { time: completeTime.value })
+    .then(r => r && r.json())
     .then(d => {
+      if (!d) {
+        closeAll();
+        return;
+      }
+
       if (d.ok) {
         closeAll();
         loadDashboard();   // ✅ ADD THIS
@@ -136,30 +219,16 @@ function confirmComplete() {
 }
 
 function confirmIncomplete() {
-  fetch(`/task/incomplete/${currentTask}`, {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-      "X-CSRFToken": csrfToken
-    },
-    body: JSON.stringify({ reason: incompleteReason.value })
-  }).then(() => {
+  postTaskAction("incomplete", { reason: incompleteReason.value }).then(() => {
     closeAll();
     loadDashboard();
   });
 }
 
 function confirmCancel() {
-  fetch(`/task/cancel/${currentTask}`, {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-      "X-CSRFToken": csrfToken
-    },
-    body: JSON.stringify({
-      reason: cancelReason.value,
-      comment: cancelComment.value
-    })
+  postTaskAction("cancel", {
+    reason: cancelReason.value,
+    comment: cancelComment.value
   }).then(() => {
     closeAll();
     loadDashboard();
@@ -303,6 +372,86 @@ function showToast(message) {
   setTimeout(() => toast.remove(), 2500);
 }
 
+function loadSuggestions() {
+  const box = document.getElementById("suggestions");
+  if (!box) return;
+
+  fetch("/api/friends/suggestions")
+    .then(r => r.json())
+    .then(d => {
+      box.innerHTML = "";
+      (d.suggestions || []).forEach(s => {
+        const row = document.createElement("div");
+        row.className = "task";
+        row.innerHTML = `<strong></strong> <small>${s.mutual} mutual</small> `;
+        row.querySelector("strong").innerText = s.username;
+
+        const btn = document.createElement("button");
+        btn.innerText = "➕";
+        btn.onclick = () => {
+          document.getElementById("friendUsername").value = s.username;
+          addFriend();
+          row.remove();
+        };
+        row.appendChild(btn);
+        box.appendChild(row);
+      });
+    });
+}
+
+let userSearch = { q: "", next: null, controller: null };
+
+function searchUsers(more = false) {
+  const input = document.getElementById("friendUsername");
+  const box = document.getElementById("userMatches");
+  if (!input || !box) return;
+
+  const q = input.value.trim();
+  if (!more) {
+    box.innerHTML = "";
+    userSearch.next = null;
+  }
+  userSearch.q = q;
+  if (!q) return;
+
+  // only the latest keystroke's request is allowed to render
+  if (userSearch.controller) userSearch.controller.abort();
+  userSearch.controller = new AbortController();
+
+  const params = new URLSearchParams({ q });
+  if (more && userSearch.next) params.set("after", userSearch.next);
+
+  fetch(`/api/users/search?${params}`, { signal: userSearch.controller.signal })
+    .then(r => r.json())
+    .then(d => {
+      if (!d.ok || userSearch.q !== q) return;
+      box.querySelector(".more")?.remove();
+
+      d.users.forEach(u => {
+        const row = document.createElement("div");
+        row.className = "task";
+        row.innerText = u.username;
+        row.onclick = () => {
+          input.value = u.username;
+          box.innerHTML = "";
+        };
+        box.appendChild(row);
+      });
+
+      userSearch.next = d.next;
+      if (d.next) {
+        const btn = document.createElement("button");
+        btn.className = "more";
+        btn.innerText = "More";
+        btn.onclick = () => searchUsers(true);
+        box.appendChild(btn);
+      }
+    })
+    .catch(() => {});
+}
+
+const searchUsersDebounced = debounce(() => searchUsers(), 250);
+
 function addFriend() {
   const input = document.getElementById("friendUsername");
   const username = input.value.trim();
@@ -360,10 +509,35 @@ function animateNumber(el, from, to, duration = 700) {
   requestAnimationFrame(frame);
 }
 
+function syncTimezone() {
+  const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+  if (!tz || localStorage.getItem("timezone") === tz) return;
+
+  fetch("/settings/timezone", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-CSRFToken": csrfToken
+    },
+    body: JSON.stringify({ timezone: tz })
+  })
+    .then(r => r.json())
+    .then(d => {
+      if (d.ok) localStorage.setItem("timezone", tz);
+    })
+    .catch(() => {});
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   if (document.getElementById("taskList")) {
     loadDashboard();
   }
+  loadSuggestions();
+  document
+    .getElementById("friendUsername")
+    ?.addEventListener("input", searchUsersDebounced);
+  if (csrfToken) syncTimezone();
+  if (navigator.onLine) flushSyncQueue();
 });
 
 function renderHeatmap() {
@@ -401,3 +575,33 @@ function renderLeaderboard() {
     `;
   });
 }
+
+function postGroup(url, body) {
+  return fetch(url, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-CSRFToken": csrfToken
+    },
+    body: JSON.stringify(body || {})
+  }).then(r => r.json());
+}
+
+function createGroup() {
+  const input = document.getElementById("groupName");
+  postGroup("/api/groups", { name: input.value })
+    .then(d => {
+      if (d.ok) window.location = `/groups/${d.group_id}`;
+      else showToast(d.error);
+    });
+}
+
+function joinGroup(id) {
+  postGroup(`/api/groups/${id}/join`)
+    .then(d => d.ok ? window.location.reload() : showToast(d.error));
+}
+
+function leaveGroup(id) {
+  postGroup(`/api/groups/${id}/leave`)
+    .then(d => d.ok ? window.location.reload() : showToast(d.error));
+}
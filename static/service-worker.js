@@ -1,4 +1,11 @@
-const CACHE_NAME = "daily-goals-v1";
+const CACHE_NAME = "daily-goals-v3";
+const API_CACHE = "daily-goals-api-v1";
+
+// API reads the app needs offline; everything else under /api/ (search,
+// typeahead, leaderboards) is never stored. /api/sync deltas aren't cached
+// either: an old one replayed would move the client's cursor backwards.
+const OFFLINE_API = ["/api/dashboard", "/api/history"];
+const MAX_API_ENTRIES = 50;
 
 const STATIC_ASSETS = [
     "/",
@@ -21,22 +28,59 @@ self.addEventListener("activate", event => {
     event.waitUntil(
         caches.keys().then(keys =>
             Promise.all(
-                keys.filter(k => k !== CACHE_NAME).map(k => caches.delete(k))
+                keys.filter(k => k !== CACHE_NAME && k !== API_CACHE)
+                    .map(k => caches.delete(k))
             )
         )
     );
     self.clients.claim();
 });
 
+async function cacheApiResponse(req, res) {
+    const cache = await caches.open(API_CACHE);
+    await cache.put(req, res);
+
+    // keys() lists entries oldest first
+    const keys = await cache.keys();
+    await Promise.all(
+        keys.slice(0, Math.max(0, keys.length - MAX_API_ENTRIES)).map(k => cache.delete(k))
+    );
+}
+
 // FETCH
 self.addEventListener("fetch", event => {
     const req = event.request;
+    const path = new URL(req.url).pathname;
+
+    // the next user of this browser must not see this one's data
+    if (path === "/logout") {
+        event.respondWith(
+            Promise.all([caches.delete(API_CACHE), caches.delete(CACHE_NAME)])
+                .then(() => fetch(req))
+        );
+        return;
+    }
 
     // ❗ Never cache API / POST requests
     if (req.method !== "GET" || req.url.includes("/task") || req.url.includes("/friend")) {
         return;
     }
 
+    // API reads: always try the network, fall back to the last copy offline
+    if (path.startsWith("/api/")) {
+        if (!OFFLINE_API.includes(path)) return;
+
+        event.respondWith(
+            fetch(req).then(res => {
+                if (res.status === 200) {
+                    event.waitUntil(cacheApiResponse(req, res.clone()));
+                }
+                return res;
+            }).catch(() => caches.match(req, { cacheName: API_CACHE }))
+        );
+        return;
+    }
+
     event.respondWith(
         caches.match(req).then(cached =>
             cached ||
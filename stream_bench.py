@@ -0,0 +1,114 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Streaming benchmark: seeds a temporary database with one user who has
+# --friends accepted friends and --days of plan history, then fetches the streamed endpoints as that
+# user through the test client and reports time to first byte, total time,
+# response size and peak Python memory (tracemalloc) per request, plus the
+# process's peak RSS at the end.
+#
+#   python stream_bench.py --friends 20000 --days 1000
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PATHS = ("/followers", "/api/dashboard", "/export?period=all&format=csv&tasks=1")
+
+def seed(friends, days):
+    from datetime import date, time as dtime, timedelta
+
+    from sqlalchemy import insert
+
+    from models import db, User, DayPlan, Task, Friend
+
+    me = User(username="bench")
+    me.set_password("bench")
+    db.session.add(me)
+    db.session.commit()
+
+    db.session.execute(insert(User.__table__), [
+        {"username": f"friend{i}", "password_hash": "-"} for i in range(friends)
+    ])
+    ids = [r[0] for r in db.session.query(User.id).filter(User.id != me.id)]
+    db.session.execute(insert(Friend.__table__), [
+        {"user_id": me.id, "friend_id": friend_id, "status": "accepted"}
+        for friend_id in ids
+    ])
+
+    today = date.today()
+    db.session.execute(insert(DayPlan.__table__), [
+        {"user_id": me.id, "date": today - timedelta(days=i), "final_score": 60}
+        for i in range(days)
+    ])
+    db.session.execute(insert(Task.__table__), [
+        {"dayplan_id": plan_id, "title": f"task {n}", "points": points,
+         "status": "completed" if n else "pending",
+         "expected_start": dtime(9 + n), "expected_end": dtime(10 + n)}
+        for (plan_id,) in db.session.query(DayPlan.id)
+        for n, points in enumerate((40, 30, 30))
+    ])
+    db.session.commit()
+
+def fetch(client, path):
+    """(seconds to first chunk, total seconds, bytes, peak traced bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    response = client.get(path, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks, b""))
+    first = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, size, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--friends", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=1000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    from app import create_app
+    from models import db
+
+    with tempfile.TemporaryDirectory(prefix="stream-bench-") as tmp:
+        app = create_app({
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'app.db')}",
+            "ARCHIVE_DATABASE_PATH": os.path.join(tmp, "archive.db"),
+            "LEADERBOARD_CACHE_DIR": os.path.join(tmp, "leaderboard"),
+            "TEMPLATE_CACHE_DIR": os.path.join(tmp, "templates"),
+        })
+        with app.app_context():
+            db.create_all()
+            seed(args.friends, args.days)
+
+        client = app.test_client()
+        client.post("/login", data={
+            "username": "bench", "password": "bench", "mode": "login"
+        })
+
+        print(f"{args.friends} friends, {args.days} days")
+        for path in PATHS:
+            first, total, size, peak = fetch(client, path)
+            print(
+                f"{path:40} TTFB {first * 1000:8.1f} ms   total {total * 1000:8.1f} ms   "
+                f"{size / 1024:8.1f} KiB   peak {peak / 2**20:6.1f} MiB"
+            )
+
+    # ru_maxrss is in KiB on Linux
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
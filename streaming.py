@@ -0,0 +1,77 @@
+import json
+import zlib
+from types import GeneratorType
+
+from flask import Response, request, stream_with_context
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+# Incremental JSON responses. Dict values that are generators are written as
+# arrays one element at a time, so a large list never exists as one Python
+# object or one encoded string. Output is grouped into CHUNK_SIZE writes and
+# gzip-compressed (sync-flushed per chunk) when the client accepts it.
+
+CHUNK_SIZE = 16 * 1024
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+def iter_json(value):
+    if isinstance(value, dict):
+        yield b"{"
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                yield b","
+            yield dumps(key) + b":"
+            yield from iter_json(item)
+        yield b"}"
+
+    elif isinstance(value, GeneratorType):
+        yield b"["
+        for i, item in enumerate(value):
+            if i:
+                yield b","
+            yield dumps(item)
+        yield b"]"
+
+    else:
+        yield dumps(value)
+
+def buffered(chunks, size=CHUNK_SIZE):
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) >= size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+def gzipped(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield z.compress(chunk) + z.flush(zlib.Z_SYNC_FLUSH)
+    yield z.flush()
+
+def stream_response(chunks, mimetype="application/json", headers=None):
+    """Stream byte or str chunks, gzip-encoded when the client accepts it."""
+    headers = dict(headers or {})
+    chunks = (c.encode() if isinstance(c, str) else c for c in chunks)
+    chunks = buffered(chunks)
+
+    if request.accept_encodings["gzip"]:
+        chunks = gzipped(chunks)
+        headers["Content-Encoding"] = "gzip"
+    headers["Vary"] = "Accept-Encoding"
+
+    return Response(
+        stream_with_context(chunks), mimetype=mimetype, headers=headers
+    )
+
+def stream_json(value, **kwargs):
+    return stream_response(iter_json(value), **kwargs)
@@ -0,0 +1,141 @@
+import click
+from sqlalchemy import and_, case, delete, exists, func, insert, or_, select, union_all
+from sqlalchemy.orm import aliased
+
+from models import db, User, Friend, FriendSuggestion, UserStats
+
+# "People you may know": candidates are friends of friends, ranked by how
+# many accepted friends they share with the user, with a bonus for similar
+# activity (same XP band, close streaks). Candidate sets are rebuilt in
+# batch by `flask refresh-suggestions` and read back per user from the
+# friend_suggestion table.
+
+CHUNK_SIZE = 1000
+KEEP_PER_USER = 20
+XP_BAND = 500
+
+MUTUAL_WEIGHT = 10
+SAME_BAND_BONUS = 3
+CLOSE_STREAK_BONUS = 2
+
+def accepted_edges(name):
+    """Accepted friendships as directed edges in both directions."""
+    forward = select(
+        Friend.user_id.label("src"), Friend.friend_id.label("dst")
+    ).where(Friend.status == "accepted")
+    backward = select(
+        Friend.friend_id.label("src"), Friend.user_id.label("dst")
+    ).where(Friend.status == "accepted")
+    return union_all(forward, backward).subquery(name)
+
+def known_pair(a, b):
+    # any friend row, pending or accepted, between the two users
+    return exists().where(or_(
+        and_(Friend.user_id == a, Friend.friend_id == b),
+        and_(Friend.user_id == b, Friend.friend_id == a)
+    ))
+
+def ranked_candidates(user_ids):
+    e1 = accepted_edges("e1")
+    e2 = accepted_edges("e2")
+
+    mutual = select(
+        e1.c.src.label("user_id"),
+        e2.c.dst.label("candidate_id"),
+        func.count().label("mutual")
+    ).select_from(
+        e1.join(e2, e1.c.dst == e2.c.src)
+    ).where(
+        e1.c.src.in_(user_ids),
+        e2.c.dst != e1.c.src,
+        ~known_pair(e1.c.src, e2.c.dst)
+    ).group_by(e1.c.src, e2.c.dst).subquery("mutual")
+
+    mine = aliased(UserStats)
+    theirs = aliased(UserStats)
+
+    my_xp = func.coalesce(mine.xp, 0)
+    their_xp = func.coalesce(theirs.xp, 0)
+    streak_gap = func.abs(
+        func.coalesce(mine.streak, 0) - func.coalesce(theirs.streak, 0)
+    )
+
+    score = (
+        mutual.c.mutual * MUTUAL_WEIGHT
+        + case((my_xp // XP_BAND == their_xp // XP_BAND, SAME_BAND_BONUS), else_=0)
+        + case((streak_gap <= 3, CLOSE_STREAK_BONUS), else_=0)
+    )
+
+    scored = select(
+        mutual.c.user_id,
+        mutual.c.candidate_id,
+        mutual.c.mutual,
+        score.label("score"),
+        func.row_number().over(
+            partition_by=mutual.c.user_id,
+            order_by=(score.desc(), mutual.c.candidate_id)
+        ).label("rn")
+    ).select_from(
+        mutual
+        .outerjoin(mine, mine.user_id == mutual.c.user_id)
+        .outerjoin(theirs, theirs.user_id == mutual.c.candidate_id)
+    ).subquery("scored")
+
+    return select(
+        scored.c.user_id, scored.c.candidate_id, scored.c.mutual, scored.c.score
+    ).where(scored.c.rn <= KEEP_PER_USER)
+
+def refresh_chunk(user_ids):
+    db.session.execute(
+        delete(FriendSuggestion).where(FriendSuggestion.user_id.in_(user_ids))
+    )
+    db.session.execute(
+        insert(FriendSuggestion).from_select(
+            ["user_id", "candidate_id", "mutual", "score"],
+            ranked_candidates(user_ids)
+        )
+    )
+    db.session.commit()
+
+def refresh(chunk_size=CHUNK_SIZE, echo=None):
+    users = 0
+    last_id = 0
+    while True:
+        chunk = [
+            r[0] for r in db.session.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(chunk_size)
+        ]
+        if not chunk:
+            break
+
+        refresh_chunk(chunk)
+        users += len(chunk)
+        last_id = chunk[-1]
+        if echo:
+            echo(f"  {users} users refreshed")
+
+    return users
+
+def for_user(user_id, limit=10):
+    # friendships made since the last refresh are filtered out at read time
+    return db.session.query(
+        FriendSuggestion.candidate_id,
+        User.username,
+        FriendSuggestion.mutual
+    ).join(
+        User, User.id == FriendSuggestion.candidate_id
+    ).filter(
+        FriendSuggestion.user_id == user_id,
+        ~known_pair(user_id, FriendSuggestion.candidate_id)
+    ).order_by(
+        FriendSuggestion.score.desc(), FriendSuggestion.candidate_id
+    ).limit(limit).all()
+
+def init_app(app):
+    @app.cli.command("refresh-suggestions")
+    @click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+    def refresh_suggestions_command(chunk_size):
+        """Rebuild friend-of-friend suggestions for every user."""
+        users = refresh(chunk_size, echo=click.echo)
+        click.echo(f"Refreshed suggestions for {users} users")
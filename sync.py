@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, literal, select
+
+from models import db, DayPlan, Task, SyncTombstone
+
+# Incremental sync bookkeeping for GET /api/sync.
+#
+# Changed rows are found by updated_at, which is stamped when a row is
+# flushed, not when its transaction commits: a row stamped just before a
+# pull's cursor can become visible just after it. Pulls therefore re-read
+# OVERLAP before the client's cursor, and clients apply rows by id and
+# version, so seeing one twice is harmless.
+#
+# Rows that leave the synced tables (deleted tasks, plans moved to the
+# archive with their tasks) leave a tombstone. Tombstones are kept for
+# TOMBSTONE_DAYS; a client whose cursor is older than that gets a full
+# reset instead of a delta.
+
+OVERLAP = timedelta(minutes=5)
+TOMBSTONE_DAYS = 30
+
+def tombstone_tasks(user_id, task_ids):
+    db.session.execute(insert(SyncTombstone), [
+        {"user_id": user_id, "kind": "task", "row_id": task_id}
+        for task_id in task_ids
+    ])
+
+def tombstone_plans(plan_ids):
+    """Tombstones for plans (any users) and their tasks, before they go."""
+    now = datetime.utcnow()
+    columns = ["user_id", "kind", "row_id", "deleted_at"]
+
+    db.session.execute(insert(SyncTombstone).from_select(columns, select(
+        DayPlan.user_id, literal("plan"), DayPlan.id, literal(now)
+    ).where(DayPlan.id.in_(plan_ids))))
+    db.session.execute(insert(SyncTombstone).from_select(columns, select(
+        DayPlan.user_id, literal("task"), Task.id, literal(now)
+    ).join_from(Task, DayPlan).where(Task.dayplan_id.in_(plan_ids))))
+
+def deleted_since(user_id, since):
+    """({"plans": [ids], "tasks": [ids]}, [stamps]) removed after `since`."""
+    deleted, stamps = {"plans": [], "tasks": []}, []
+    for kind, row_id, deleted_at in db.session.query(
+        SyncTombstone.kind, SyncTombstone.row_id, SyncTombstone.deleted_at
+    ).filter(
+        SyncTombstone.user_id == user_id,
+        SyncTombstone.deleted_at > since
+    ):
+        deleted[kind + "s"].append(row_id)
+        stamps.append(deleted_at)
+    return deleted, stamps
+
+def expired(since):
+    # tombstones this old may already be pruned
+    return since < datetime.utcnow() - timedelta(days=TOMBSTONE_DAYS)
+
+def prune(days=TOMBSTONE_DAYS):
+    removed = SyncTombstone.query.filter(
+        SyncTombstone.deleted_at < datetime.utcnow() - timedelta(days=days)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
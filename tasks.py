@@ -0,0 +1,346 @@
+from datetime import datetime, date, time as dtime, timedelta
+
+from flask import Blueprint, request
+from flask_login import login_required, current_user
+
+import achievements
+import sync
+from helpers import (
+    api_ok, api_error, user_today, get_task_for_current_user,
+    update_plan_final_score, calculate_xp, scores_changed,
+    task_payload, plan_payload, notification_payload
+)
+from models import db, DayPlan, Task, Notification
+
+bp = Blueprint("tasks", __name__)
+
+# ---------------- TASK ACTIONS ----------------
+def parse_action_time(data):
+    # Offline clients send the full local timestamp ("at"); the live UI only
+    # sends the clock time picked in the modal.
+    if data.get("at"):
+        return datetime.fromisoformat(data["at"])
+
+    h, m = map(int, data["time"].split(':'))
+    return datetime.combine(user_today(), dtime(h, m))
+
+def minutes_between(start, end):
+    """Whole minutes from start to end.
+
+    Bare times wrap past midnight (a 23:00-01:00 slot is two hours);
+    datetimes carry their date, so an end before the start is an error.
+    """
+    if isinstance(start, datetime):
+        if end < start:
+            raise ValueError("end is before start")
+    else:
+        start = datetime.combine(date.min, start)
+        end = datetime.combine(date.min, end)
+        if end < start:
+            end += timedelta(days=1)
+
+    return int((end - start).total_seconds()) // 60
+
+# Every action is a compare-and-swap on the task row: the UPDATE only
+# matches while the task still has the version that was read and a status
+# the action may leave, so double taps and concurrent tabs get a 409 instead
+# of overwriting each other. No row is locked while the request runs.
+def start_values(task, data):
+    return {"actual_start": parse_action_time(data)}
+
+def complete_values(task, data):
+    actual_end = parse_action_time(data)
+
+    planned = None
+    if task.expected_start and task.expected_end:
+        planned = minutes_between(task.expected_start, task.expected_end)
+
+    # rows completed before start times were recorded have no actual_start
+    actual = None
+    if task.actual_start:
+        actual = minutes_between(task.actual_start, actual_end)
+
+    return {
+        "actual_end": actual_end,
+        "planned_duration_minutes": planned,
+        "actual_duration_minutes": actual
+    }
+
+def cancel_values(task, data):
+    return {
+        "cancel_reason": data.get("reason"),
+        "cancel_comment": data.get("comment")
+    }
+
+def incomplete_values(task, data):
+    return {"incomplete_reason": data.get("reason")}
+
+# action: (statuses it may leave, status it enters, column values)
+TRANSITIONS = {
+    "start": (("pending",), "active", start_values),
+    "complete": (("active",), "completed", complete_values),
+    "cancel": (("pending",), "cancelled", cancel_values),
+    "incomplete": (("active",), "incomplete", incomplete_values),
+}
+
+def transition(task, action, data):
+    """Move `task` through `action`; False if it changed underneath us.
+
+    Clients may send the `version` they last saw; otherwise the version
+    read in this request is the one that must still be current.
+    """
+    allowed, status, values = TRANSITIONS[action]
+    version = data.get("version", task.version)
+
+    updated = Task.query.filter(
+        Task.id == task.id,
+        Task.version == version,
+        Task.status.in_(allowed)
+    ).update(
+        {**values(task, data), "status": status},
+        synchronize_session=False
+    )
+
+    # the row (and its version) changed in the database, reload on next read
+    db.session.expire(task)
+    return updated == 1
+
+MAX_BATCH_ACTIONS = 200
+
+def action_miss(task, action):
+    # the compare-and-swap matched nothing; `task` was expired, so this
+    # reads the row as it is now
+    if task.status not in TRANSITIONS[action][0]:
+        return "rejected", f"Cannot {action} a {task.status} task"
+    return "conflict", "Task was changed elsewhere"
+
+def apply_task_batch(actions):
+    """Apply [{id, action, time|at, reason, comment, version}] in order.
+
+    Ownership of every id is checked with a single query and each touched
+    plan is re-scored once. Every action gets a result: "applied",
+    "conflict" (the task changed since the client read it; re-read and
+    retry) or "rejected" (it can't apply: unknown task, a status the action
+    can't leave, a bad payload). A failed action writes nothing, so the
+    applied ones commit together.
+
+    Returns (results, tasks, None), or (None, None, (error, status)) for a
+    malformed batch or when re-scoring kept racing.
+    """
+    if not isinstance(actions, list) or not all(isinstance(a, dict) for a in actions):
+        return None, None, ("Invalid request data", 400)
+    if len(actions) > MAX_BATCH_ACTIONS:
+        return None, None, (f"At most {MAX_BATCH_ACTIONS} actions per batch", 400)
+
+    # shape first: the ids go into a set and an IN (...) list
+    for idx, a in enumerate(actions):
+        task_id, action = a.get("id"), a.get("action")
+        if (not isinstance(task_id, int) or isinstance(task_id, bool)
+                or not isinstance(action, str) or action not in TRANSITIONS):
+            return None, None, (f"Invalid action at index {idx}", 400)
+
+    ids = {a["id"] for a in actions}
+    tasks = {
+        t.id: t for t in Task.query.join(DayPlan).filter(
+            Task.id.in_(ids),
+            DayPlan.user_id == current_user.id
+        ).all()
+    }
+
+    results, touched_plans, completed = [], set(), []
+    for idx, a in enumerate(actions):
+        result = {"index": idx, "id": a["id"], "status": "applied"}
+        results.append(result)
+
+        task = tasks.get(a["id"])
+        if not task:
+            result.update(status="rejected", error="Task not found")
+            continue
+
+        try:
+            changed = transition(task, a["action"], a)
+        except (KeyError, TypeError, ValueError):
+            # raised while building the UPDATE, before it ran
+            result.update(status="rejected", error="Invalid action payload")
+            continue
+
+        if not changed:
+            result["status"], result["error"] = action_miss(task, a["action"])
+            continue
+
+        touched_plans.add(task.dayplan_id)
+        if a["action"] == "complete":
+            completed.append(task.id)
+
+    for plan_id in touched_plans:
+        if not update_plan_final_score(plan_id):
+            db.session.rollback()
+            return None, None, ("Conflict updating plan score", 409)
+
+    # one achievements event for the whole batch
+    if completed and achievements.tasks_completed(current_user.id, completed) is None:
+        db.session.rollback()
+        return None, None, ("Conflict updating achievements", 409)
+
+    db.session.commit()
+
+    if touched_plans:
+        scores_changed(current_user.id)
+    return results, list(tasks.values()), None
+
+def run_task_action(task_id, action):
+    task = get_task_for_current_user(task_id)
+    data = request.get_json(silent=True) or {}
+
+    if task.status not in TRANSITIONS[action][0]:
+        return api_error(f"Cannot {action} a {task.status} task", 409)
+
+    try:
+        changed = transition(task, action, data)
+    except (KeyError, TypeError, ValueError):
+        db.session.rollback()
+        return api_error("Invalid action payload")
+
+    # start doesn't touch the score
+    if not changed or (action != "start" and not update_plan_final_score(task.dayplan_id)):
+        db.session.rollback()
+        return api_error("Task was changed elsewhere", 409)
+
+    new_badges = 0
+    if action == "complete":
+        new_badges = achievements.tasks_completed(current_user.id, [task.id])
+        if new_badges is None:
+            db.session.rollback()
+            return api_error("Task was changed elsewhere", 409)
+
+    db.session.commit()
+    scores_changed(current_user.id)  # friends' cards show the task status too
+    return api_ok(
+        xp=calculate_xp(current_user.id),
+        badges=achievements.titles(new_badges)
+    )
+
+@bp.route('/api/tasks/batch', methods=['POST'])
+@login_required
+def batch_tasks():
+    data = request.get_json(silent=True) or {}
+    results, tasks, error = apply_task_batch(data.get("operations"))
+
+    if error:
+        return api_error(*error)
+
+    return api_ok(
+        results=results,
+        tasks=[task_payload(t) for t in tasks],
+        xp=calculate_xp(current_user.id)
+    )
+
+@bp.route('/task/start/<int:id>', methods=['POST'])
+@login_required
+def start_task(id):
+    return run_task_action(id, "start")
+
+@bp.route('/task/complete/<int:id>', methods=['POST'])
+@login_required
+def complete_task(id):
+    return run_task_action(id, "complete")
+
+@bp.route('/task/delete/<int:id>', methods=['POST'])
+@login_required
+def delete_task(id):
+    task = get_task_for_current_user(id)
+    if task.status != "pending":
+        return api_error("Cannot delete started task", 400)
+    plan_id = task.dayplan_id
+
+    # same compare-and-swap as the transitions: only a still-pending task
+    deleted = Task.query.filter(
+        Task.id == task.id,
+        Task.version == task.version,
+        Task.status == "pending"
+    ).delete(synchronize_session=False)
+    db.session.expunge(task)
+
+    if not deleted or not update_plan_final_score(plan_id):
+        db.session.rollback()
+        return api_error("Task was changed elsewhere", 409)
+
+    sync.tombstone_tasks(current_user.id, [id])
+    db.session.commit()
+    scores_changed(current_user.id)
+    return api_ok(xp=calculate_xp(current_user.id))
+
+@bp.route('/task/cancel/<int:id>', methods=['POST'])
+@login_required
+def cancel_task(id):
+    return run_task_action(id, "cancel")
+
+@bp.route('/task/incomplete/<int:id>', methods=['POST'])
+@login_required
+def incomplete_task(id):
+    return run_task_action(id, "incomplete")
+
+# ---------------- OFFLINE SYNC ----------------
+@bp.route('/api/sync', methods=['GET'])
+@login_required
+def sync_pull():
+    """Rows changed and removed since the client's cursor (see sync.py).
+
+    Without a cursor, or with one older than the tombstones go back, the
+    response is everything and `reset` tells the client to replace what it
+    holds.
+    """
+    since = request.args.get("since")
+
+    try:
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return api_error("Invalid cursor")
+
+    plans = DayPlan.query.filter(DayPlan.user_id == current_user.id)
+    tasks = Task.query.join(DayPlan).filter(DayPlan.user_id == current_user.id)
+    notifications = Notification.query.filter(
+        Notification.user_id == current_user.id
+    )
+
+    reset = since is None or sync.expired(since)
+    deleted, stamps = {"plans": [], "tasks": []}, []
+    if not reset:
+        after = since - sync.OVERLAP
+        plans = plans.filter(DayPlan.updated_at > after)
+        tasks = tasks.filter(Task.updated_at > after)
+        notifications = notifications.filter(Notification.updated_at > after)
+        deleted, stamps = sync.deleted_since(current_user.id, after)
+
+    plans = plans.all()
+    tasks = tasks.all()
+    notifications = notifications.all()
+
+    # the overlap re-reads rows the client already has; never move it back
+    stamps += [r.updated_at for r in (*plans, *tasks, *notifications) if r.updated_at]
+    cursor = max(stamps + [since] if since else stamps, default=None)
+
+    return api_ok(
+        cursor=cursor.isoformat() if cursor else None,
+        reset=reset,
+        plans=[plan_payload(p) for p in plans],
+        tasks=[task_payload(t) for t in tasks],
+        notifications=[notification_payload(n) for n in notifications],
+        deleted=deleted
+    )
+
+@bp.route('/api/sync', methods=['POST'])
+@login_required
+def sync_push():
+    data = request.get_json(silent=True) or {}
+    results, tasks, error = apply_task_batch(data.get("actions"))
+
+    if error:
+        return api_error(*error)
+
+    return api_ok(
+        applied=sum(r["status"] == "applied" for r in results),
+        results=results,
+        tasks=[task_payload(t) for t in tasks],
+        xp=calculate_xp(current_user.id)
+    )
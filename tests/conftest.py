@@ -0,0 +1,107 @@
+import contextvars
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, time as dtime
+
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import typeahead  # noqa: E402
+from app import create_app  # noqa: E402
+from user_cache import cache as user_cache  # noqa: E402
+from models import db, User, DayPlan, Task  # noqa: E402
+
+
+class IsolatedClient(FlaskClient):
+    """Runs each request outside the test's app context, as a server would,
+    so requests don't share flask.g (the logged-in user, memoized reads) or
+    a database session with the test or each other."""
+
+    def open(self, *args, **kwargs):
+        # buffered: streamed bodies are read while the request is still active
+        kwargs["buffered"] = True
+        return contextvars.Context().run(super().open, *args, **kwargs)
+
+
+@pytest.fixture
+def app(tmp_path):
+    # process-wide caches would otherwise carry rows between test databases
+    user_cache.clear()
+    typeahead.cache.clear()
+
+    app = create_app({
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+        "ARCHIVE_DATABASE_PATH": str(tmp_path / "archive.db"),
+        "LEADERBOARD_CACHE_DIR": str(tmp_path / "cache" / "leaderboard"),
+        "TEMPLATE_CACHE_DIR": str(tmp_path / "cache" / "templates"),
+    })
+    app.test_client_class = IsolatedClient
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def make_user(username, password="pw", **fields):
+    user = User(username=username, **fields)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_plan(user, day=None, tasks=(), **fields):
+    """A plan with one pending 09:00-10:00 task per (title, points)."""
+    plan = DayPlan(user_id=user.id, date=day or date.today(), **fields)
+    db.session.add(plan)
+    db.session.flush()
+
+    for title, points in tasks:
+        db.session.add(Task(
+            dayplan_id=plan.id, title=title, points=points,
+            expected_start=dtime(9), expected_end=dtime(10)
+        ))
+    db.session.commit()
+    return plan
+
+
+@contextmanager
+def count_queries():
+    """Collects the SQL statements run inside the block."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_execute)
+
+
+def login(app, username, password="pw"):
+    client = app.test_client()
+    response = client.post("/login", data={
+        "username": username, "password": password, "mode": "login"
+    })
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def user(app):
+    return make_user("alice")
+
+
+@pytest.fixture
+def client(app, user):
+    return login(app, "alice")
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules only the `flask` CLI uses, with what they pull in
+CLI_ONLY = ("backfill", "dataset", "importer", "flask_migrate", "alembic", "pyarrow")
+
+
+def test_create_app_loads_no_cli_modules_and_opens_no_database(tmp_path):
+    db_path = tmp_path / "app.db"
+    script = (
+        "import sys, app\n"
+        f"app.create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite:///{db_path}'}})\n"
+        f"print(','.join(m for m in {CLI_ONLY!r} if m in sys.modules))\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "FLASK_RUN_FROM_CLI"}
+
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+
+    assert out.strip() == ""
+    assert not db_path.exists()
@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta
+
+import archive
+from models import db, DayPlan, Task, UserStats
+from conftest import make_plan
+
+
+def archive_old_plans(user, count):
+    plans = [
+        make_plan(
+            user, day=date.today() - timedelta(days=200 - i),
+            tasks=[("old", 10)], finalized_at=datetime.utcnow()
+        )
+        for i in range(count)
+    ]
+    db.session.add(UserStats(user_id=user.id, as_of=date.today()))
+    db.session.commit()
+    return plans
+
+
+def test_enabled_notices_archive_created_later(app, user):
+    assert not archive.enabled()
+    assert archive.all_plans() is DayPlan
+
+    archive_old_plans(user, 1)
+    archive.run()
+
+    assert archive.enabled()
+    assert archive.all_plans() is not DayPlan
+
+
+def test_new_rows_never_reuse_archived_ids(app, user):
+    old = archive_old_plans(user, 3)
+    old_plan_ids = {p.id for p in old}
+    old_task_ids = {p.tasks[0].id for p in old}
+
+    assert archive.run() == 3
+    assert DayPlan.query.count() == 0
+
+    plan = make_plan(user, tasks=[("new", 10)])
+    assert plan.id > max(old_plan_ids)
+    assert plan.tasks[0].id > max(old_task_ids)
+
+    P, T = archive.all_plans(), archive.all_tasks()
+    assert db.session.query(P).filter(P.id == plan.id).count() == 1
+    assert db.session.query(T).filter(T.id == plan.tasks[0].id).count() == 1
+    assert db.session.query(T).filter(T.dayplan_id.in_(old_plan_ids)).count() == 3
+    assert Task.query.count() == 1
@@ -0,0 +1,201 @@
+import itertools
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+
+import achievements
+import backfill
+from models import db, User, DayPlan, Task, AchievementProgress, BackfillState
+from conftest import make_plan
+
+ROWS = 23
+CHUNK = 5
+INTERRUPT_AFTER = 2
+
+
+class Interrupted(Exception):
+    """Stands in for the process dying between chunks."""
+
+
+def tracked(monkeypatch, name, fail_after=None):
+    """Wrap a job's apply; the key chunks it applied, in order."""
+    key, apply, description = backfill.JOBS[name]
+    chunks = []
+
+    def apply_tracked(keys):
+        if fail_after is not None and len(chunks) == fail_after:
+            raise Interrupted
+        chunks.append(list(keys))
+        return apply(keys)
+
+    monkeypatch.setitem(backfill.JOBS, name, (key, apply_tracked, description))
+    return chunks
+
+
+def run_interrupted(monkeypatch, name):
+    """Run `name` until it dies after INTERRUPT_AFTER chunks, check the
+    checkpoint, resume it to the end; every chunk applied, in order."""
+    original = backfill.JOBS[name]
+
+    first = tracked(monkeypatch, name, fail_after=INTERRUPT_AFTER)
+    with pytest.raises(Interrupted):
+        backfill.run(name, chunk_size=CHUNK, pause=0)
+    db.session.rollback()
+
+    state = db.session.get(BackfillState, name)
+    assert state.rows == INTERRUPT_AFTER * CHUNK
+    assert state.last_key == first[-1][-1]
+    assert state.finished_at is None
+
+    monkeypatch.setitem(backfill.JOBS, name, original)
+    rest = tracked(monkeypatch, name)
+    state = backfill.run(name, chunk_size=CHUNK, pause=0)
+
+    assert state.finished_at is not None
+    assert state.rows == ROWS
+    assert rest[0][0] > first[-1][-1]   # resumed after the checkpoint
+    return first + rest, state
+
+
+def applied_once(chunks, table):
+    keys = [k for chunk in chunks for k in chunk]
+    assert keys == sorted(db.session.scalars(select(table.c.id)))
+    assert len(keys) == len(set(keys)) == ROWS
+
+
+def seed_users(**fields):
+    db.session.execute(insert(User.__table__), [
+        {"username": f"user{i}", "password_hash": "x", "show_global": True, **fields}
+        for i in range(ROWS)
+    ])
+    db.session.commit()
+    return sorted(db.session.scalars(select(User.id)))
+
+
+def test_updated_at_resumes_without_skips_or_repeats(app, monkeypatch):
+    user_id = seed_users()[0]
+    db.session.execute(insert(DayPlan.__table__), [
+        {"user_id": user_id, "date": date.today() - timedelta(days=i),
+         "final_score": 0, "updated_at": None}
+        for i in range(ROWS)
+    ])
+    db.session.commit()
+
+    chunks, state = run_interrupted(monkeypatch, "day-plan-updated-at")
+
+    applied_once(chunks, DayPlan.__table__)
+    assert state.changed == ROWS
+    assert DayPlan.query.filter(DayPlan.updated_at.is_(None)).count() == 0
+
+
+def test_username_lower_resumes_without_skips_or_repeats(app, monkeypatch):
+    db.session.execute(insert(User.__table__), [
+        # every third name was lowered by SQL lower(), which leaves "É" alone
+        {"username": f"Émile{i}", "password_hash": "x",
+         "username_lower": f"Émile{i}" if i % 3 == 0 else f"émile{i}"}
+        for i in range(ROWS)
+    ])
+    db.session.commit()
+
+    chunks, state = run_interrupted(monkeypatch, "username-lower")
+
+    applied_once(chunks, User.__table__)
+    assert state.changed == len(range(0, ROWS, 3))
+    assert all(u.username_lower == u.username.casefold() for u in User.query)
+
+
+def test_achievements_resume_without_skips_or_repeats(app, monkeypatch):
+    ids = seed_users()
+    today = date.today()
+    for n, user_id in enumerate(ids):
+        for d in range(n % 5):
+            plan = DayPlan(
+                user_id=user_id, date=today - timedelta(days=d + 1),
+                final_score=100 if d % 2 == 0 else 70
+            )
+            db.session.add(plan)
+            db.session.flush()
+            db.session.add(Task(
+                dayplan_id=plan.id, title="t", points=10, status="completed",
+                expected_start=dtime(9), actual_start=datetime.combine(plan.date, dtime(9, 2))
+            ))
+    db.session.commit()
+    expected = achievements.history_metrics(ids)
+
+    chunks, state = run_interrupted(monkeypatch, "achievements")
+
+    applied_once(chunks, User.__table__)
+    assert state.changed == ROWS
+    progress = {p.user_id: p for p in AchievementProgress.query}
+    assert len(progress) == ROWS
+    for user_id, metrics in expected.items():
+        p = progress[user_id]
+        assert {m: getattr(p, m) for m in achievements.METRICS} == metrics
+        assert p.earned == achievements.unlocked(metrics)
+    assert any(p.best_streak == 4 for p in progress.values())
+
+
+def test_app_keeps_serving_during_a_backfill(app, user, client, monkeypatch):
+    rows = 3000
+    mine = make_plan(user, tasks=[(f"t{i}", 5) for i in range(20)])
+    task_ids = [t.id for t in mine.tasks]
+    other = DayPlan(user_id=seed_users()[-1], date=date.today(), final_score=0)
+    db.session.add(other)
+    db.session.commit()
+    db.session.execute(insert(Task.__table__), [
+        {"dayplan_id": other.id, "title": f"old{i}", "points": 0,
+         "status": "pending", "updated_at": None}
+        for i in range(rows)
+    ])
+    db.session.commit()
+    total = Task.query.count()
+
+    # every chunk overruns CHUNK_SECONDS, so the job shrinks its chunks, and
+    # one chunk loses a lock race and is retried
+    key, apply, description = backfill.JOBS["task-updated-at"]
+    sizes, locked = [], []
+
+    def slow_apply(keys):
+        if len(sizes) == 3 and not locked:
+            locked.append(list(keys))
+            raise OperationalError("UPDATE task", {}, Exception("database is locked"))
+        sizes.append(len(keys))
+        time.sleep(0.01)
+        return apply(keys)
+
+    monkeypatch.setitem(backfill.JOBS, "task-updated-at", (key, slow_apply, description))
+    monkeypatch.setattr(backfill, "CHUNK_SECONDS", 0.005)
+    monkeypatch.setattr(backfill, "MIN_CHUNK_SIZE", 25)
+
+    result = {}
+
+    def job():
+        with app.app_context():
+            state = backfill.run("task-updated-at", chunk_size=200, pause=0.001)
+            result["rows"], result["finished"] = state.rows, state.finished_at
+
+    thread = threading.Thread(target=job)
+    thread.start()
+
+    served, during = [], 0
+    for task_id in itertools.cycle(task_ids):
+        if not thread.is_alive():
+            break
+        during += 1
+        served.append(client.get("/").status_code)
+        served.append(client.post(f"/task/start/{task_id}", json={"time": "09:00"}).status_code)
+        served.append(client.post(f"/task/complete/{task_id}", json={"time": "09:30"}).status_code)
+        if len(served) >= 3 * len(task_ids):
+            break
+    thread.join()
+
+    assert during >= 3
+    assert set(served) == {200}
+    assert result["rows"] == total and result["finished"] is not None
+    assert sizes[:4] == [200, 100, 50, 25] and len(locked[0]) == 25
+    assert sum(sizes) == total
+    assert Task.query.filter(Task.updated_at.is_(None)).count() == 0
@@ -0,0 +1,113 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from models import db, DayPlan, Task
+from conftest import make_plan, login
+
+THREADS = 8
+
+
+def hammer(clients, bodies):
+    """POST each body to /api/tasks/batch from its own client, all at once."""
+    barrier = threading.Barrier(len(clients))
+    responses = [None] * len(clients)
+
+    def run(i):
+        barrier.wait()
+        responses[i] = clients[i].post("/api/tasks/batch", json=bodies[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(clients))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def outcomes(responses):
+    counts = Counter()
+    for response in responses:
+        assert response.status_code == 200, response.get_json()
+        for result in response.get_json()["results"]:
+            counts[(result["index"], result["status"])] += 1
+    return counts
+
+
+def reload(model, id):
+    db.session.expire_all()
+    return db.session.get(model, id)
+
+
+def test_batch_reports_each_action(app, user, client):
+    plan = make_plan(user, tasks=[("a", 10), ("b", 20), ("c", 30)])
+    a, b, c = (t.id for t in plan.tasks)
+
+    response = client.post("/api/tasks/batch", json={"operations": [
+        {"id": a, "action": "start", "time": "09:00"},
+        {"id": a, "action": "complete", "time": "09:30"},
+        {"id": b, "action": "complete", "time": "09:30"},
+        {"id": c, "action": "start", "time": "09:00", "version": 99},
+        {"id": 10**6, "action": "start", "time": "09:00"},
+        {"id": c, "action": "start"},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [
+        "applied", "applied", "rejected", "conflict", "rejected", "rejected"
+    ]
+    assert results[2]["error"] == "Cannot complete a pending task"
+
+    assert reload(Task, a).status == "completed"
+    assert reload(Task, c).status == "pending"
+    assert reload(DayPlan, plan.id).final_score == 10
+
+
+@pytest.mark.parametrize("round", range(3))
+def test_concurrent_batches_on_one_task(app, user, round):
+    plan = make_plan(user, tasks=[("write", 40)])
+    task = plan.tasks[0]
+    version = task.version
+    clients = [login(app, "alice") for _ in range(THREADS)]
+
+    body = {"operations": [
+        {"id": task.id, "action": "start", "time": "09:00"},
+        {"id": task.id, "action": "complete", "time": "09:45"},
+    ]}
+    counts = outcomes(hammer(clients, [body] * THREADS))
+
+    # exactly one start and one complete win, whichever batches they were in
+    assert counts[(0, "applied")] == 1
+    assert counts[(1, "applied")] == 1
+    assert sum(counts.values()) == 2 * THREADS
+
+    task = reload(Task, task.id)
+    assert task.status == "completed"
+    assert task.version == version + 2
+    assert task.actual_duration_minutes == 45
+    assert reload(DayPlan, plan.id).final_score == 40
+
+
+def test_concurrent_batches_on_one_plan(app, user):
+    plan = make_plan(user, tasks=[(f"t{i}", 10 + i) for i in range(THREADS)] + [("shared", 5)])
+    *ids, shared = (t.id for t in plan.tasks)
+    versions = {t.id: t.version for t in plan.tasks}
+    clients = [login(app, "alice") for _ in range(THREADS)]
+
+    # every client completes its own task, and all of them race to cancel one
+    bodies = [{"operations": [
+        {"id": ids[i], "action": "start", "time": "09:00"},
+        {"id": ids[i], "action": "complete", "time": "09:30"},
+        {"id": shared, "action": "cancel", "reason": "race"},
+    ]} for i in range(THREADS)]
+    counts = outcomes(hammer(clients, bodies))
+
+    assert counts[(0, "applied")] == counts[(1, "applied")] == THREADS
+    assert counts[(2, "applied")] == 1
+
+    assert reload(DayPlan, plan.id).final_score == sum(10 + i for i in range(THREADS))
+    assert reload(Task, shared).status == "cancelled"
+    assert reload(Task, shared).version == versions[shared] + 1
+    assert all(reload(Task, i).version == versions[i] + 2 for i in ids)
@@ -0,0 +1,64 @@
+import os
+import time
+
+import board_cache
+from board_cache import BoardCache
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_get_or_compute_caches(tmp_path):
+    cache = BoardCache(str(tmp_path), ttl=60, stale_ttl=30)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_compute("k", compute) == {"n": 1}
+    assert cache.get_or_compute("k", compute) == {"n": 1}
+    assert len(calls) == 1
+
+
+def test_lock_files_are_striped(tmp_path):
+    cache = BoardCache(str(tmp_path), ttl=0, stale_ttl=0)
+    for i in range(500):
+        cache.get_or_compute(f"friends-{i}-2026-10-19", lambda: i)
+
+    locks = os.listdir(tmp_path / "locks")
+    assert len(locks) <= board_cache.LOCK_STRIPES
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".lock")]
+
+
+def test_evict_removes_only_expired_entries(tmp_path):
+    cache = BoardCache(str(tmp_path), ttl=60, stale_ttl=30)
+    cache.get_or_compute("old", lambda: 1)
+    cache.get_or_compute("fresh", lambda: 2)
+    cache.get_or_compute("long", lambda: 3, ttl=600)
+    (tmp_path / "gone.json.lock").touch()
+
+    # an entry is kept for the longest ttl any caller used, plus stale_ttl
+    age(tmp_path / "long.json", 120)
+    age(tmp_path / "old.json", 700)
+    age(tmp_path / "gone.json.lock", 700)
+
+    assert cache.evict() == 2
+    assert sorted(n for n in os.listdir(tmp_path) if n != "locks") == [
+        "fresh.json", "long.json"
+    ]
+
+
+def test_writes_evict_periodically(tmp_path, monkeypatch):
+    cache = BoardCache(str(tmp_path), ttl=60, stale_ttl=30)
+    cache.get_or_compute("old", lambda: 1)
+    age(tmp_path / "old.json", 120)
+
+    cache.get_or_compute("a", lambda: 1)
+    assert (tmp_path / "old.json").exists()
+
+    monkeypatch.setattr(board_cache, "EVICT_INTERVAL", 0)
+    cache.get_or_compute("b", lambda: 1)
+    assert not (tmp_path / "old.json").exists()
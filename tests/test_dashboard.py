@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import pytest
+
+import leaderboard
+import memo
+from models import db, User, Friend
+from conftest import make_user, make_plan, count_queries
+
+
+def add_friends(user, count, start=0):
+    for i in range(start, start + count):
+        friend = make_user(f"friend{i}")
+        plan = make_plan(friend, tasks=[("run", 30), ("read", 20)])
+        plan.tasks[0].status = "completed"
+        db.session.add(Friend(user_id=user.id, friend_id=friend.id, status="accepted"))
+    db.session.commit()
+
+
+def dashboard_queries(client):
+    with count_queries() as statements:
+        data = client.get("/api/dashboard").get_json()
+    return data, len(statements)
+
+
+def test_api_dashboard_friends(app, user, client):
+    make_plan(user, tasks=[("write", 50)])
+    add_friends(user, 2)
+
+    data, _ = dashboard_queries(client)
+
+    assert len(data["heatmap"]) == 30
+    rows = {row["name"]: row for row in data["leaderboard"]}
+    assert rows["alice"]["is_me"] and rows["alice"]["score"] == 0
+    assert rows["friend0"]["score"] == 30 and not rows["friend0"]["is_me"]
+    assert rows["friend1"]["streak"] == 0
+
+
+def test_api_dashboard_queries_do_not_grow_with_friends(app, user, client):
+    add_friends(user, 2)
+    dashboard_queries(client)   # the first request also loads the user record
+    _, few = dashboard_queries(client)
+
+    add_friends(user, 10, start=2)
+    data, many = dashboard_queries(client)
+
+    assert len(data["leaderboard"]) == 13
+    assert many == few
+
+
+def test_dashboard_page_shows_friends(app, user, client):
+    add_friends(user, 2)
+
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert b"friend1" in response.data
+
+
+@pytest.mark.parametrize("limit, size", [(0, 1), (-1, 1), (1000, 3)])
+def test_history_limit_is_clamped(app, user, client, limit, size):
+    for days_ago in range(1, 4):
+        make_plan(user, day=date.today() - timedelta(days=days_ago))
+
+    response = client.get(f"/api/history?limit={limit}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body["days"]) == size
+    assert bool(body["next"]) == (size == 1)
+
+
+def add_history(user, days, start=0):
+    # passing days back from today: each one adds to the streak and the XP
+    for i in range(start, start + days):
+        make_plan(user, day=date.today() - timedelta(days=i), final_score=80)
+
+
+def test_dashboard_queries_do_not_grow_with_history(app, user, client):
+    add_friends(user, 2)
+    add_history(user, 2)
+    dashboard_queries(client)   # the first request also loads the user record
+    data, few = dashboard_queries(client)
+    assert data["user"]["streak"] == 2
+
+    add_history(user, 20, start=2)
+    data, many = dashboard_queries(client)
+
+    assert data["user"]["streak"] == 22
+    assert data["user"]["xp"] == 22 * (80 + 50) + 22 * 5
+    assert many == few
+
+
+def test_friend_board_queries_do_not_grow_with_history(app, user):
+    add_friends(user, 3)
+    friends = User.query.filter(User.username.startswith("friend")).all()
+
+    def board_queries():
+        # the board as the friends leaderboard builds it on a cache miss
+        memo.invalidate()
+        with count_queries() as statements:
+            sq = leaderboard.leaderboard_query("friends", "week", user.id)
+            board = leaderboard.build_board("friends", "week", sq)
+        return board, len(statements)
+
+    _, few = board_queries()
+    for friend in friends:
+        add_history(friend, 20, start=1)
+    board, many = board_queries()
+
+    assert many == few
+    xp = {row["name"]: row["xp"] for row in board}
+    assert xp["friend0"] == 20 * (80 + 50) and xp["alice"] == 0
@@ -0,0 +1,33 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import dataset
+from models import db, DayPlan
+from conftest import make_plan
+
+
+def test_incremental_run_rereads_the_overlap(app, user, tmp_path):
+    plan = make_plan(user, tasks=[("write", 100)])
+    out = str(tmp_path / "dataset")
+    assert dataset.run(out, workers=1)["day_plan"] == 1
+
+    # a plan stamped just before the last run started, committed after it
+    # read the table
+    state_path = os.path.join(out, dataset.STATE_FILE)
+    with open(state_path) as f:
+        state = json.load(f)
+    started = datetime.utcnow() - timedelta(minutes=10)
+    state["started_at"] = started.isoformat()
+    with open(state_path, "w") as f:
+        json.dump(state, f)
+    db.session.execute(update(DayPlan).where(DayPlan.id == plan.id).values(
+        updated_at=started - timedelta(minutes=1)
+    ))
+    db.session.commit()
+
+    counts = dataset.run(out, workers=1)
+
+    assert counts.get("day_plan") == 1
@@ -0,0 +1,53 @@
+import os
+import time
+from collections import Counter
+
+import dashboard
+import fragments
+from conftest import make_plan
+
+
+def count_loads(monkeypatch):
+    calls = Counter()
+    for name in ("friend_progress", "heatmap_scores"):
+        loader = getattr(dashboard, name)
+
+        def counted(*args, _name=name, _loader=loader):
+            calls[_name] += 1
+            return _loader(*args)
+
+        monkeypatch.setattr(dashboard, name, counted)
+    return calls
+
+
+def test_dashboard_fragments_render_once(app, user, client, monkeypatch):
+    make_plan(user, tasks=[("write", 50)])
+    calls = count_loads(monkeypatch)
+
+    first = client.get("/").data
+    second = client.get("/").data
+
+    # the friends and ranking blocks both read friend_progress, once each,
+    # and the second render is served from the cache
+    assert first == second
+    assert calls == {"friend_progress": 2, "heatmap_scores": 1}
+
+    with app.test_request_context():
+        fragments.invalidate("friends", user.id)
+    client.get("/")
+
+    assert calls == {"friend_progress": 3, "heatmap_scores": 1}
+
+
+def test_expired_fragments_are_evicted(app, user, client):
+    client.get("/")
+    cache = app.extensions["fragment_cache"]
+    keys = [n for n in os.listdir(cache.directory) if n.endswith(".json")]
+    assert keys
+
+    old = time.time() - cache.ttl - cache.stale_ttl - 1
+    for name in keys:
+        os.utime(os.path.join(cache.directory, name), (old, old))
+
+    assert cache.evict() == len(keys)
+    assert client.get("/").status_code == 200
@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import make_user
+
+
+def search_all(client, q, limit):
+    found, after = [], None
+    while True:
+        params = {"q": q, "limit": limit}
+        if after:
+            params["after"] = after
+        data = client.get("/api/users/search", query_string=params).get_json()
+        found += [u["username"] for u in data["users"]]
+        after = data["next"]
+        if not after:
+            return found
+
+
+def test_user_search_pages_through_equal_folded_names(app, user, client):
+    names = ["bob", "Bob", "BOB", "bOb", "boB", "BoB", "bobby"]
+    for name in names:
+        make_user(name)
+
+    found = search_all(client, "bo", 2)
+
+    assert sorted(found) == sorted(names)
+
+
+def test_user_search_rejects_bad_cursor(app, user, client):
+    response = client.get("/api/users/search", query_string={"q": "bo", "after": "x:bob"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_user_search_limit_is_clamped(app, user, client, limit):
+    for name in ("bob", "bobby"):
+        make_user(name)
+
+    data = client.get("/api/users/search", query_string={"q": "bo", "limit": limit}).get_json()
+
+    assert [u["username"] for u in data["users"]] == ["bob"]
+    assert data["next"]
@@ -0,0 +1,76 @@
+import pytest
+
+from models import db, User, GroupMember
+from conftest import make_user, make_plan, login, count_queries
+
+
+def names(response):
+    return [row["name"] for row in response.get_json()["rows"]]
+
+
+def test_group_board_hides_private_members_from_outsiders(app, user, client):
+    group_id = client.post("/api/groups", json={"name": "runners"}).get_json()["group_id"]
+    make_user("private", show_global=False)
+    make_user("public", show_global=True)
+    make_user("outsider")
+    for name in ("private", "public"):
+        assert login(app, name).post(f"/api/groups/{group_id}/join").status_code == 200
+
+    member_view = client.get(f"/api/groups/{group_id}/leaderboard")
+    outsider = login(app, "outsider")
+    outsider_view = outsider.get(f"/api/groups/{group_id}/leaderboard")
+
+    assert sorted(names(member_view)) == ["alice", "private", "public"]
+    assert "private" not in names(outsider_view)
+    assert "public" in names(outsider_view)
+
+    page = outsider.get(f"/groups/{group_id}")
+    assert page.status_code == 200
+    assert b"public" in page.data and b"private" not in page.data
+    assert b"private" in client.get(f"/groups/{group_id}").data
+
+
+def add_members(group_id, count, start=0):
+    # no password hashing: these users never log in
+    members = [
+        User(username=f"member{i}", password_hash="-")
+        for i in range(start, start + count)
+    ]
+    db.session.add_all(members)
+    db.session.commit()
+    for member in members:
+        db.session.add(GroupMember(group_id=group_id, user_id=member.id))
+        plan = make_plan(member, tasks=[("run", 30), ("read", 70)], final_score=30)
+        plan.tasks[0].status = "completed"
+    db.session.commit()
+
+
+def board_queries(client, group_id, **args):
+    with count_queries() as statements:
+        response = client.get(f"/api/groups/{group_id}/leaderboard", query_string=args)
+    assert response.status_code == 200
+    return response.get_json(), len(statements)
+
+
+def test_group_board_queries_do_not_grow_with_members(app, user, client):
+    group_id = client.post("/api/groups", json={"name": "runners"}).get_json()["group_id"]
+    add_members(group_id, 3)
+    board_queries(client, group_id)   # the first request also loads the user record
+    _, few = board_queries(client, group_id)
+
+    add_members(group_id, 150, start=3)
+    data, many = board_queries(client, group_id, limit=100)
+
+    assert len(data["rows"]) == 100 and data["next"]
+    assert data["rows"][0]["score"] == 30 and "streak" in data["rows"][0]
+    assert many == few
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_group_board_limit_is_clamped(app, user, client, limit):
+    group_id = client.post("/api/groups", json={"name": "runners"}).get_json()["group_id"]
+    add_members(group_id, 3)
+
+    data, _ = board_queries(client, group_id, limit=limit)
+
+    assert len(data["rows"]) == 1 and data["next"]
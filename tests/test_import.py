@@ -0,0 +1,53 @@
+import io
+import json
+from datetime import date, timedelta
+
+from models import DayPlan
+
+
+def upload(client, lines):
+    body = "".join(json.dumps(line) + "\n" for line in lines)
+    return client.post("/import", data={
+        "file": (io.BytesIO(body.encode()), "history.jsonl")
+    }, content_type="multipart/form-data")
+
+
+def day(days_ago, score, statuses):
+    return {
+        "date": (date.today() - timedelta(days=days_ago)).isoformat(),
+        "score": score,
+        "tasks": [
+            {"title": f"t{i}", "points": 50, "status": status,
+             "start": "09:00", "end": "10:00"}
+            for i, status in enumerate(statuses)
+        ]
+    }
+
+
+def test_import_scores_from_completed_tasks(app, user, client):
+    response = upload(client, [
+        day(3, 100, ["completed", "pending"]),
+        day(2, 100, []),
+    ])
+
+    assert response.get_json()["plans"] == 2
+    scores = dict(DayPlan.query.with_entities(DayPlan.date, DayPlan.final_score))
+    assert scores == {
+        date.today() - timedelta(days=3): 50,
+        date.today() - timedelta(days=2): 0,
+    }
+
+
+def test_import_rejects_unfinished_days_and_bad_points(app, user, client):
+    bad_points = day(4, 100, ["completed"])
+    response = upload(client, [
+        day(0, 100, ["completed", "completed"]),
+        day(-1, 100, ["completed", "completed"]),
+        bad_points,
+    ]).get_json()
+
+    assert response["plans"] == 0
+    assert response["errors"] == 3
+    assert "not over yet" in response["messages"][0]
+    assert "add up to 100" in response["messages"][2]
+    assert DayPlan.query.count() == 0
@@ -0,0 +1,21 @@
+import pytest
+
+from models import db, User
+from conftest import make_plan
+
+
+@pytest.mark.parametrize("limit, size", [(0, 1), (-1, 1), (1000, 100)])
+def test_leaderboard_limit_is_clamped(app, user, client, limit, size):
+    # no password hashing: these users never log in
+    players = [User(username=f"player{i}", password_hash="-") for i in range(105)]
+    db.session.add_all(players)
+    db.session.commit()
+    for player in players:
+        make_plan(player, tasks=[("t", 100)])
+
+    response = client.get(f"/api/leaderboard?scope=global&period=week&limit={limit}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body["rows"]) == size
+    assert body["next"]
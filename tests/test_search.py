@@ -0,0 +1,77 @@
+import importlib.util
+import os
+
+import pytest
+from sqlalchemy import text
+
+from models import db
+from conftest import make_plan, make_user
+
+MIGRATION = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "migrations", "versions", "7e2c94a1d3b8_task_full_text_search.py"
+)
+
+
+@pytest.fixture
+def search_index(app):
+    # create_all() doesn't know the FTS table; build it as the migration does
+    spec = importlib.util.spec_from_file_location("task_fts_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    for sql in migration.SQLITE_UPGRADE:
+        db.session.execute(text(sql))
+    db.session.commit()
+
+
+def titles(client, q, **args):
+    response = client.get("/api/search", query_string={"q": q, **args})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_search_ranks_title_matches_first(app, user, client, search_index):
+    plan = make_plan(user, tasks=[("groceries", 10), ("write report", 10), ("gym", 10)])
+    plan.tasks[0].description = "report receipts"
+    make_plan(make_user("bob"), tasks=[("report", 10)])   # someone else's
+    db.session.commit()
+
+    results = titles(client, "report")["results"]
+
+    assert [r["title"] for r in results] == ["write report", "groceries"]
+    assert results[0]["rank"] <= results[1]["rank"]
+
+
+def test_search_matches_the_last_word_as_a_prefix(app, user, client, search_index):
+    make_plan(user, tasks=[("quarterly report", 10), ("repot plants", 10)])
+
+    assert [r["title"] for r in titles(client, "quarterly rep")["results"]] == [
+        "quarterly report"
+    ]
+    assert {r["title"] for r in titles(client, "rep")["results"]} == {
+        "quarterly report", "repot plants"
+    }
+    assert titles(client, '"rep" OR *')["results"] == []
+
+
+def test_search_follows_task_edits(app, user, client, search_index):
+    plan = make_plan(user, tasks=[("gym", 10), ("swim", 10)])
+    gym, swim = (t.id for t in plan.tasks)
+
+    response = client.post(f"/task/cancel/{gym}", json={
+        "reason": "other", "comment": "knee injury"
+    })
+    assert response.status_code == 200
+    assert [r["id"] for r in titles(client, "knee")["results"]] == [gym]
+
+    assert client.post(f"/task/delete/{swim}").status_code == 200
+    assert titles(client, "swim")["results"] == []
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_search_limit_is_clamped(app, user, client, search_index, limit):
+    make_plan(user, tasks=[("report one", 10), ("report two", 10)])
+
+    data = titles(client, "report", limit=limit)
+
+    assert len(data["results"]) == 1 and data["has_more"] is True
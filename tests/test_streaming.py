@@ -0,0 +1,44 @@
+import json
+import zlib
+
+import streaming
+
+
+def rows(n, seen):
+    for i in range(n):
+        seen.append(i)
+        yield {"id": i, "name": f"user{i}"}
+
+
+def test_stream_json_writes_chunks_as_it_goes(app):
+    seen = []
+    with app.test_request_context("/"):
+        response = streaming.stream_json({"ok": True, "rows": rows(5000, seen)})
+        chunks = iter(response.response)
+
+        first = next(chunks)
+        # only about one chunk's worth of rows has been produced so far
+        assert len(first) >= streaming.CHUNK_SIZE
+        assert len(seen) < 1000
+        body = first + b"".join(chunks)
+
+    assert "Content-Encoding" not in response.headers
+    data = json.loads(body)
+    assert data["ok"] is True and len(data["rows"]) == 5000 == len(seen)
+
+
+def test_stream_json_gzips_each_chunk(app):
+    with app.test_request_context("/", headers={"Accept-Encoding": "gzip"}):
+        response = streaming.stream_json({"rows": rows(5000, [])})
+        chunks = list(response.response)
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(chunks) > 2
+
+    # every chunk is sync-flushed, so a client can decode it on arrival
+    z = zlib.decompressobj(31)
+    head = z.decompress(chunks[0])
+    assert head.startswith(b'{"rows":[{"id":0')
+
+    body = head + z.decompress(b"".join(chunks[1:])) + z.flush()
+    assert len(json.loads(body)["rows"]) == 5000
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+import archive
+import sync
+from models import db, Task, UserStats, SyncTombstone
+from conftest import make_plan
+
+
+def pull(client, since=None):
+    response = client.get("/api/sync", query_string={"since": since} if since else {})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_first_pull_is_a_reset(app, user, client):
+    make_plan(user, tasks=[("write", 50)])
+
+    data = pull(client)
+
+    assert data["reset"] is True
+    assert len(data["plans"]) == 1 and len(data["tasks"]) == 1
+    assert data["deleted"] == {"plans": [], "tasks": []}
+
+
+def test_deleted_task_is_reported(app, user, client):
+    plan = make_plan(user, tasks=[("write", 50), ("read", 20)])
+    doomed = plan.tasks[0].id
+    cursor = pull(client)["cursor"]
+
+    assert client.post(f"/task/delete/{doomed}").status_code == 200
+    data = pull(client, cursor)
+
+    assert data["reset"] is False
+    assert data["deleted"]["tasks"] == [doomed]
+    assert data["cursor"] > cursor
+
+
+def test_archived_plans_are_reported(app, user, client):
+    plan = make_plan(
+        user, day=date.today() - timedelta(days=200), tasks=[("old", 10)],
+        finalized_at=datetime.utcnow()
+    )
+    plan_id, task_id = plan.id, plan.tasks[0].id
+    db.session.add(UserStats(user_id=user.id, as_of=date.today()))
+    db.session.commit()
+    cursor = pull(client)["cursor"]
+
+    assert archive.run() == 1
+    data = pull(client, cursor)
+
+    assert data["deleted"] == {"plans": [plan_id], "tasks": [task_id]}
+
+
+def test_row_stamped_before_cursor_but_committed_after_is_pulled(app, user, client):
+    plan = make_plan(user, tasks=[("write", 50), ("read", 20)])
+    late = plan.tasks[1].id
+    cursor = pull(client)["cursor"]
+
+    # a transaction that stamped its row a minute before the cursor and
+    # only committed now
+    stamped = datetime.fromisoformat(cursor) - timedelta(minutes=1)
+    db.session.execute(
+        update(Task).where(Task.id == late).values(title="late", updated_at=stamped)
+    )
+    db.session.commit()
+
+    data = pull(client, cursor)
+
+    assert [t["title"] for t in data["tasks"] if t["id"] == late] == ["late"]
+    assert data["cursor"] == cursor   # never moves back
+
+
+def test_cursor_older_than_tombstones_resets(app, user, client):
+    make_plan(user, tasks=[("write", 50)])
+    since = (datetime.utcnow() - timedelta(days=sync.TOMBSTONE_DAYS + 1)).isoformat()
+
+    data = pull(client, since)
+
+    assert data["reset"] is True
+    assert len(data["tasks"]) == 1
+
+
+def test_prune_drops_old_tombstones(app, user):
+    sync.tombstone_tasks(user.id, [1, 2])
+    db.session.add(SyncTombstone(
+        user_id=user.id, kind="task", row_id=3,
+        deleted_at=datetime.utcnow() - timedelta(days=sync.TOMBSTONE_DAYS + 1)
+    ))
+    db.session.commit()
+
+    assert sync.prune() == 1
+    assert sorted(r.row_id for r in SyncTombstone.query) == [1, 2]
+
+
+def test_push_reports_results(app, user, client):
+    plan = make_plan(user, tasks=[("write", 50)])
+    task_id = plan.tasks[0].id
+
+    response = client.post("/api/sync", json={"actions": [
+        {"id": task_id, "action": "start", "at": "2026-10-19T09:00"},
+        {"id": task_id, "action": "cancel"},
+    ]})
+
+    data = response.get_json()
+    assert data["applied"] == 1
+    assert [r["status"] for r in data["results"]] == ["applied", "rejected"]
@@ -0,0 +1,60 @@
+from datetime import datetime, time as dtime
+
+import pytest
+
+from models import db, Task
+from tasks import minutes_between
+from conftest import make_plan
+
+
+def test_minutes_between_times_wrap_past_midnight():
+    assert minutes_between(dtime(9), dtime(10, 30)) == 90
+    assert minutes_between(dtime(23), dtime(1)) == 120
+
+
+def test_minutes_between_datetimes():
+    start = datetime(2026, 10, 19, 23, 30)
+    assert minutes_between(start, datetime(2026, 10, 20, 0, 15)) == 45
+    assert minutes_between(start, start) == 0
+
+
+def test_minutes_between_rejects_datetime_end_before_start():
+    with pytest.raises(ValueError):
+        minutes_between(datetime(2026, 10, 19, 10), datetime(2026, 10, 19, 9, 30))
+
+
+def test_complete_before_start_is_rejected(app, user, client):
+    plan = make_plan(user, tasks=[("write", 50)])
+    task_id = plan.tasks[0].id
+
+    assert client.post(f"/task/start/{task_id}", json={"time": "10:00"}).status_code == 200
+    response = client.post(f"/task/complete/{task_id}", json={"time": "09:30"})
+
+    assert response.status_code == 400
+    db.session.expire_all()
+    task = db.session.get(Task, task_id)
+    assert task.status == "active"
+    assert task.actual_duration_minutes is None
+
+
+@pytest.mark.parametrize("operations", [
+    [{"id": [1, 2], "action": "start"}],
+    [{"id": {"a": 1}, "action": "start"}],
+    [{"id": "1", "action": "start"}],
+    [{"id": True, "action": "start"}],
+    [{"action": "start"}],
+    [{"id": 1, "action": "explode"}],
+    [{"id": 1, "action": ["start"]}],
+    ["start 1"],
+    [[1, "start"]],
+    {"id": 1, "action": "start"},
+])
+def test_batch_rejects_malformed_actions(app, user, client, operations):
+    plan = make_plan(user, tasks=[("write", 50)])
+
+    response = client.post("/api/tasks/batch", json={"operations": operations})
+
+    assert response.status_code == 400
+    assert response.get_json()["ok"] is False
+    db.session.expire_all()
+    assert db.session.get(Task, plan.tasks[0].id).status == "pending"
@@ -0,0 +1,47 @@
+import os
+from datetime import date, timedelta, time as dtime
+
+import pytest
+
+import warmup
+from models import db, DayPlan, PlanTemplate, PlanTemplateTask
+from conftest import make_plan
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(warmup, "state", {"ready": True, "steps": {}})
+
+
+def test_ready_without_warmup(app):
+    response = app.test_client().get("/ready")
+    assert response.status_code == 200
+    assert response.get_json()["ready"] is True
+
+
+def test_hold_until_marked_ready(app):
+    client = app.test_client()
+    warmup.hold()
+    assert client.get("/ready").status_code == 503
+
+    warmup.mark_ready()
+    assert client.get("/ready").status_code == 200
+
+
+def test_dashboards_warm_up_without_writing_plans(app, user):
+    # active lately, with a daily template that a visit would materialize
+    make_plan(user, day=date.today() - timedelta(days=1), tasks=[("old", 10)])
+    template = PlanTemplate(user_id=user.id, every_days=1,
+                            starts_on=date.today() - timedelta(days=30))
+    template.tasks.append(PlanTemplateTask(
+        title="daily", points=10, expected_start=dtime(9), expected_end=dtime(10)
+    ))
+    db.session.add(template)
+    db.session.commit()
+
+    steps = warmup.warm(app, ["dashboards"])
+
+    assert steps["dashboards"][0] == 1
+    assert DayPlan.query.filter_by(user_id=user.id).count() == 1
+    fragment_dir = app.extensions["fragment_cache"].directory
+    assert [n for n in os.listdir(fragment_dir) if n.endswith(".json")]
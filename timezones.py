@@ -0,0 +1,34 @@
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Users without a timezone keep the old behaviour: server-local time.
+
+@lru_cache(maxsize=1024)
+def zone(name):
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+def is_valid(name):
+    return zone(name) is not None
+
+def local_now(tz_name):
+    """Wall-clock time in the user's zone, naive like the stored datetimes."""
+    z = zone(tz_name)
+    if z is None:
+        return datetime.now()
+    return datetime.now(z).replace(tzinfo=None)
+
+def local_today(tz_name):
+    return local_now(tz_name).date()
+
+def group_by_local_date(tz_names):
+    """{local date: [tz names]}, at most a handful of dates at any instant."""
+    groups = {}
+    for name in tz_names:
+        groups.setdefault(local_today(name), []).append(name)
+    return groups
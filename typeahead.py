@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import and_, func, or_
+
+from models import db, User
+
+# Username typeahead. Matching is a range scan on the indexed, case-folded
+# user.username_lower column (prefix <= name < prefix + U+FFFF), which every
+# backend can answer from the index. PostgreSQL additionally has a trigram
+# index, used for fuzzy matches when a prefix finds too few names.
+#
+# Hot prefixes are kept in memory. A cached entry that holds *every* match
+# for its prefix also answers any longer prefix by filtering, so typing
+# "a", "an", "ann" costs one query.
+#
+# username_lower is not unique (case folding merges names), so pages are
+# ordered on (username_lower, id) and the cursor carries both.
+
+CACHE_ROWS = 50
+CACHE_SIZE = 2048
+CACHE_TTL = 60
+
+def prefix_range(prefix):
+    return User.username_lower >= prefix, User.username_lower < prefix + "\uffff"
+
+class PrefixCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, prefix):
+        """(rows, complete) for `prefix` or a complete shorter prefix."""
+        now = time.monotonic()
+        with self._lock:
+            for n in range(len(prefix), 0, -1):
+                p = prefix[:n]
+                item = self._data.get(p)
+                if item is None:
+                    continue
+
+                rows, complete, expires = item
+                if expires < now:
+                    del self._data[p]
+                    continue
+                if n < len(prefix) and not complete:
+                    continue
+
+                self._data.move_to_end(p)
+                if n < len(prefix):
+                    rows = [r for r in rows if r[2].startswith(prefix)]
+                return rows, complete
+        return None
+
+    def store(self, prefix, rows, complete):
+        with self._lock:
+            self._data[prefix] = (rows, complete, time.monotonic() + self.ttl)
+            self._data.move_to_end(prefix)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+cache = PrefixCache()
+
+def encode_cursor(row):
+    return f"{row[0]}:{row[2]}"
+
+def decode_cursor(cursor):
+    """(id, username_lower); ValueError for anything else."""
+    user_id, _, name = cursor.partition(":")
+    return int(user_id), name
+
+def _query(prefix, exclude, after, limit):
+    q = db.session.query(
+        User.id, User.username, User.username_lower
+    ).filter(*prefix_range(prefix))
+
+    if exclude:
+        q = q.filter(~User.id.in_(exclude))
+    if after:
+        after_id, after_name = after
+        q = q.filter(or_(
+            User.username_lower > after_name,
+            and_(User.username_lower == after_name, User.id > after_id)
+        ))
+
+    return [tuple(r) for r in q.order_by(User.username_lower, User.id).limit(limit)]
+
+def _fuzzy(term, exclude, limit):
+    if db.engine.dialect.name != "postgresql":
+        return []
+
+    similarity = func.similarity(User.username_lower, term)
+    q = db.session.query(
+        User.id, User.username, User.username_lower
+    ).filter(User.username_lower.op("%")(term))
+    if exclude:
+        q = q.filter(~User.id.in_(exclude))
+
+    return [tuple(r) for r in q.order_by(similarity.desc()).limit(limit)]
+
+def search(term, exclude=(), after=None, limit=10):
+    """([(id, username)], next cursor or None) for a typed prefix.
+
+    Raises ValueError for a malformed `after` cursor.
+    """
+    prefix = (term or "").strip().casefold()
+    if not prefix:
+        return [], None
+    exclude = set(exclude)
+    after = decode_cursor(after) if after else None
+
+    if not after:
+        hit = cache.lookup(prefix)
+        if hit is None:
+            rows = _query(prefix, (), None, CACHE_ROWS + 1)
+            hit = (rows[:CACHE_ROWS], len(rows) <= CACHE_ROWS)
+            cache.store(prefix, *hit)
+
+        rows, complete = hit
+        rows = [r for r in rows if r[0] not in exclude]
+        if complete and len(rows) <= limit:
+            # every prefix match is here: top up with fuzzy matches, no paging
+            seen = {r[0] for r in rows}
+            rows += [r for r in _fuzzy(prefix, exclude, limit) if r[0] not in seen]
+            return [r[:2] for r in rows[:limit]], None
+        if len(rows) > limit:
+            return [r[:2] for r in rows[:limit]], encode_cursor(rows[limit - 1])
+
+    rows = _query(prefix, exclude, after, limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return [r[:2] for r in rows], encode_cursor(rows[-1]) if more else None
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+# Lightweight stand-in for User used as current_user, so authenticated
+# requests don't have to hit the user table just to restore the session.
+
+class CachedUser(UserMixin):
+    def __init__(self, id, username, show_global, timezone=None):
+        self.id = id
+        self.username = username
+        self.show_global = show_global
+        self.timezone = timezone
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.username!r}>"
+
+class UserCache:
+    """Thread-safe LRU of CachedUser records with a TTL.
+
+    The TTL bounds how long another worker process can serve a stale
+    record after a change it did not see invalidated locally.
+    """
+
+    def __init__(self, maxsize=2048, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+
+            user, expires = item
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+
+            self._data.move_to_end(user_id)
+            return user
+
+    def put(self, user):
+        with self._lock:
+            self._data[user.id] = (user, time.monotonic() + self.ttl)
+            self._data.move_to_end(user.id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+cache = UserCache()
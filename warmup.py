@@ -0,0 +1,191 @@
+import time
+from datetime import timedelta
+
+import click
+from flask import current_app, jsonify
+from flask_login import login_user
+from sqlalchemy import func, text
+
+import timezones
+from helpers import get_period_range
+from models import db, User, DayPlan
+from user_cache import CachedUser, cache as user_cache
+
+# Warm-up for fresh processes, so the first requests after a deploy or a
+# worker recycle don't pay for cold connections, template compilation and
+# empty caches. Warm-up only reads and fills caches; it never writes user
+# data.
+#
+# Under gunicorn the master runs SHARED_STEPS once in `when_ready`, before
+# any worker is forked: workers inherit its compiled templates copy-on-write,
+# and the boards and dashboard fragments (the friends/ranking/heatmap parts
+# that cost a query per friend) land in the file caches every worker reads.
+# Each worker then runs WORKER_STEPS in `post_fork`, before it accepts a
+# connection. `flask warmup` runs the shared steps ahead of a deploy so the
+# disk caches (boards, fragments, Jinja bytecode) are already filled when
+# workers start.
+#
+# /ready answers 200 unless a server holds it: gunicorn.conf.py calls hold()
+# in the master and each worker calls mark_ready() once it has warmed up.
+# Servers without those hooks never warm up and are ready from the start.
+
+ACTIVE_DAYS = 7
+PERIODS = ("day", "week", "month")
+
+SHARED_STEPS = ("templates", "leaderboards", "friend-boards", "dashboards")
+WORKER_STEPS = ("connections", "leaderboards", "active-users")
+
+# per process; a forked worker starts with a copy of the master's
+state = {"ready": True, "steps": {}}
+
+# ---------------- STEPS ----------------
+def prime_connections(connections=1):
+    # open the pool's connections now, not on the first requests
+    conns = [db.engine.connect() for _ in range(connections)]
+    for conn in conns:
+        conn.execute(text("SELECT 1"))
+        conn.close()
+    return len(conns)
+
+def compile_templates():
+    env = current_app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+def local_dates():
+    tz_names = [r[0] for r in db.session.query(User.timezone).distinct()]
+    return list(timezones.group_by_local_date(tz_names))
+
+def prefetch_leaderboards():
+    # board keys carry the viewer's dates, so fill one per date users are on
+    import leaderboard
+
+    boards = 0
+    for today in local_dates():
+        for period in PERIODS:
+            start, end = get_period_range(period, today)
+            sq = leaderboard.leaderboard_query("global", period)
+            leaderboard.cached_board("global", period, sq, start, end)
+            boards += 1
+    return boards
+
+def active_users():
+    # the WARMUP_USERS users with the most plans lately
+    limit = current_app.config["WARMUP_USERS"]
+    since = timezones.local_today(None) - timedelta(days=ACTIVE_DAYS)
+    return [r[0] for r in db.session.query(DayPlan.user_id).filter(
+        DayPlan.date >= since
+    ).group_by(DayPlan.user_id).order_by(
+        func.count().desc(), DayPlan.user_id
+    ).limit(limit)]
+
+def load_active_users():
+    # the same records extensions.load_user would fetch on their first hit
+    rows = db.session.query(
+        User.id, User.username, User.show_global, User.timezone
+    ).filter(User.id.in_(active_users())).all()
+    for row in rows:
+        user_cache.put(CachedUser(*row))
+    return len(rows)
+
+def prefetch_friend_boards():
+    import leaderboard
+
+    rows = db.session.query(User.id, User.timezone).filter(
+        User.id.in_(active_users())
+    ).all()
+    for user_id, tz_name in rows:
+        start, end = get_period_range("week", timezones.local_today(tz_name))
+        sq = leaderboard.leaderboard_query("friends", "week", user_id)
+        leaderboard.cached_board("friends", "week", sq, start, end, user_id)
+    return len(rows)
+
+def prefetch_dashboards():
+    # render each dashboard once as its user, which fills its fragments;
+    # unlike a visit this never materializes a recurring plan
+    import dashboard
+
+    app = current_app._get_current_object()
+    rows = db.session.query(
+        User.id, User.username, User.show_global, User.timezone
+    ).filter(User.id.in_(active_users())).all()
+    for row in rows:
+        with app.app_context(), app.test_request_context("/"):
+            login_user(CachedUser(*row))
+            today = timezones.local_today(row.timezone)
+            plan = DayPlan.query.filter_by(user_id=row.id, date=today).first()
+            dashboard.render_dashboard(plan, today)
+    return len(rows)
+
+STEPS = {
+    "connections": prime_connections,
+    "templates": compile_templates,
+    "leaderboards": prefetch_leaderboards,
+    "active-users": load_active_users,
+    "friend-boards": prefetch_friend_boards,
+    "dashboards": prefetch_dashboards,
+}
+
+# ---------------- RUN ----------------
+def warm(app, steps, connections=1, echo=None):
+    """Run warm-up steps; {step: (items, seconds)}.
+
+    A failing step is logged and skipped: warm-up only saves time, it must
+    never keep a worker from serving.
+    """
+    with app.app_context():
+        for name in steps:
+            t = time.perf_counter()
+            try:
+                if name == "connections":
+                    items = prime_connections(connections)
+                else:
+                    items = STEPS[name]()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("warm-up step %s failed", name)
+                items = None
+
+            state["steps"][name] = (items, round(time.perf_counter() - t, 3))
+            if echo:
+                echo(f"  {name}: {items} in {state['steps'][name][1]}s")
+        db.session.remove()
+
+    return state["steps"]
+
+def hold():
+    # /ready reports 503 until mark_ready()
+    state["ready"] = False
+
+def mark_ready():
+    state["ready"] = True
+
+def ready():
+    body = {
+        "ok": state["ready"],
+        "ready": state["ready"],
+        "steps": {
+            name: {"items": items, "seconds": seconds}
+            for name, (items, seconds) in state["steps"].items()
+        }
+    }
+    return jsonify(body), 200 if state["ready"] else 503
+
+def init_app(app):
+    app.add_url_rule("/ready", "ready", ready)
+
+    @app.cli.command("warmup")
+    @click.option("--steps", default=",".join(SHARED_STEPS), show_default=True,
+                  help="Comma-separated steps: " + ", ".join(STEPS))
+    def warmup_command(steps):
+        """Fill the shared caches (boards, template bytecode) before a deploy."""
+        names = [s.strip() for s in steps.split(",") if s.strip()]
+        unknown = [name for name in names if name not in STEPS]
+        if unknown:
+            raise click.BadParameter(f"unknown step {', '.join(unknown)}")
+
+        t = time.perf_counter()
+        warm(current_app._get_current_object(), names, echo=click.echo)
+        click.echo(f"Warmed up in {time.perf_counter() - t:.2f}s")